@@ -0,0 +1,9 @@
+"""
+Benchmarks of the parser and the ingest path, and a load test against a fake station site.
+
+    python -m benchmarks micro --sizes 10,1000,10000 --output micro.json
+    python -m benchmarks ingest --rows 2000 --ticks 20 --drop-tables --output ingest.json
+    python -m benchmarks load --rows 2000 --pages 4 --interval 5 --ticks 720 --error-rate 0.02 --drop-tables
+    python -m benchmarks.fake_site --rows 5000 --port 8765
+    python -m benchmarks.generator --rows 1000 --output page.html
+"""
@@ -0,0 +1,75 @@
+import argparse
+import asyncio
+import sys
+
+from . import ingest, load_test, micro
+from .fake_site import Faults
+from .report import compare, write_report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Runs the benchmarks.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    micro_parser = commands.add_parser("micro", help="Text extraction, parser and CSV export")
+    micro_parser.add_argument("--sizes", default="10,100,1000,10000", help="Comma-separated page sizes in rows")
+    micro_parser.add_argument("--engines", default="bs4,lxml", help="Comma-separated parser engines")
+    micro_parser.add_argument("--repeat", type=int, default=5, help="Rounds per benchmark")
+    micro_parser.add_argument("--csv-max-rows", type=int, default=1000, help="Largest page exported to CSV")
+    micro_parser.add_argument("--output", help="JSON report file, stdout by default")
+
+    ingest_parser = commands.add_parser("ingest", help="End-to-end ingest into a throwaway database")
+    ingest_parser.add_argument("--rows", type=int, default=1000, help="Stations per page")
+    ingest_parser.add_argument("--ticks", type=int, default=10, help="Scrapes ingested per configuration")
+    ingest_parser.add_argument("--changed", type=float, default=0.05, help="Share of stations changing per tick")
+    ingest_parser.add_argument("--modes", default="row,bulk", help="Comma-separated ingest modes")
+    ingest_parser.add_argument("--drop-tables", action="store_true", help="Confirms the database may be wiped")
+    ingest_parser.add_argument("--output", help="JSON report file, stdout by default")
+
+    load_parser = commands.add_parser("load", help="Sustained load test against the fake station site")
+    load_parser.add_argument("--rows", type=int, default=2000, help="Stations per page")
+    load_parser.add_argument("--pages", type=int, default=4, help="Pages, each scraped as a source")
+    load_parser.add_argument("--ticks", type=int, default=120, help="Number of ticks")
+    load_parser.add_argument("--interval", type=float, default=5.0, help="Seconds between ticks")
+    load_parser.add_argument("--runner", choices=["staged", "coordinator"], default="staged", help="Tick runner")
+    load_parser.add_argument("--engine", choices=["bs4", "lxml"], default="lxml", help="Parser engine")
+    load_parser.add_argument("--incremental", action="store_true", help="Parse only changed rows")
+    load_parser.add_argument("--latency", type=float, default=0.0, help="Mean response delay in seconds")
+    load_parser.add_argument("--error-rate", type=float, default=0.0, help="Share of 5xx responses")
+    load_parser.add_argument("--truncate-rate", type=float, default=0.0, help="Share of truncated pages")
+    load_parser.add_argument("--drop-tables", action="store_true", help="Confirms the database may be wiped")
+    load_parser.add_argument("--output", help="JSON report file, stdout by default")
+
+    compare_parser = commands.add_parser("compare", help="Compares two reports")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="Relative slowdown to fail on")
+
+    args = parser.parse_args()
+    if args.command == "micro":
+        results = micro.run(
+            [int(size) for size in args.sizes.split(",")], args.engines.split(","), args.repeat, args.csv_max_rows
+        )
+        write_report("micro", results, args.output)
+    elif args.command == "ingest":
+        if not args.drop_tables:
+            parser.error("the ingest benchmark drops all tables of the configured database, pass --drop-tables")
+        results = asyncio.run(ingest.run(args.rows, args.ticks, args.changed, args.modes.split(",")))
+        write_report("ingest", results, args.output)
+    elif args.command == "load":
+        if not args.drop_tables:
+            parser.error("the load test drops all tables of the configured database, pass --drop-tables")
+        faults = Faults(args.latency, args.error_rate, args.truncate_rate)
+        results = asyncio.run(load_test.run(
+            args.rows, args.pages, args.ticks, args.interval, args.runner, args.engine, args.incremental, faults
+        ))
+        write_report("load", results, args.output)
+    else:
+        regressions = compare(args.baseline, args.current, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regressions", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+A local fake of the station site for sustained load tests. It serves pages of synthetic stations
+whose socket statuses evolve over time as a Markov chain, and can inject latency, 5xx errors
+and truncated HTML.
+
+    python -m benchmarks.fake_site --rows 5000 --pages 4 --step 60 --error-rate 0.02 --truncate-rate 0.01
+
+Page `i` of the site is served at `/?page=i` and lists stations `i * rows + 1` to `(i + 1) * rows`.
+"""
+import argparse
+import itertools
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from .generator import STATUS_MIX, render_page, render_row, station_attributes
+
+logger = logging.getLogger(__name__)
+
+# Status -> probabilities of the status of a socket one step later
+TRANSITIONS: Dict[str, Dict[str, float]] = {
+    "Свободен": {"Свободен": 0.94, "Занят": 0.05, "Неисправен": 0.01},
+    "Занят": {"Свободен": 0.15, "Занят": 0.845, "Неисправен": 0.005},
+    "Неисправен": {"Свободен": 0.05, "Неисправен": 0.95},
+}
+ERROR_STATUSES = (500, 502, 503, 504)
+
+
+@dataclass(slots=True)
+class Faults:
+    """
+    Faults injected into the responses of the fake site.
+
+    Attributes:
+        latency (float): Mean delay of a response in seconds, exponentially distributed.
+        error_rate (float): Share of requests answered with a 5xx error.
+        truncate_rate (float): Share of pages cut off at a random point.
+    """
+    latency: float = 0.0
+    error_rate: float = 0.0
+    truncate_rate: float = 0.0
+
+
+class StationModel:
+    """
+    Socket statuses of all stations of the fake site. Every step, each socket moves to its next status
+    with the probabilities of the transition matrix.
+
+    Attributes:
+        stations (int): Number of stations, numbered from 1.
+        sockets (tuple): Minimum and maximum number of sockets of a station.
+        statuses (List[List[str]]): Status of every socket of every station.
+        step (int): Number of steps taken.
+    """
+
+    def __init__(
+        self,
+        stations: int,
+        sockets: Tuple[int, int] = (1, 3),
+        transitions: Dict[str, Dict[str, float]] | None = None,
+        seed: int = 0,
+    ):
+        transitions = transitions or TRANSITIONS
+        self.stations = stations
+        self.sockets = sockets
+        self.step = 0
+        self.rng = random.Random(seed)
+        self.choices = {
+            status: (list(weights), list(itertools.accumulate(weights.values())))
+            for status, weights in transitions.items()
+        }
+        mix = {status: STATUS_MIX.get(status, 1.0) for status in transitions}
+        self.statuses = [
+            self.rng.choices(list(mix), weights=list(mix.values()), k=len(station_attributes(number, sockets)[4]))
+            for number in range(1, stations + 1)
+        ]
+
+    def advance(self) -> None:
+        """
+        Moves every socket one step along the Markov chain.
+        """
+        for statuses in self.statuses:
+            for index, status in enumerate(statuses):
+                population, cum_weights = self.choices[status]
+                statuses[index] = self.rng.choices(population, cum_weights=cum_weights)[0]
+        self.step += 1
+
+    def render(self, first: int, count: int) -> str:
+        """
+        Renders the page of `count` stations starting at station number `first`.
+        """
+        last = min(first + count, self.stations + 1)
+        return render_page(render_row(number, self.sockets, self.statuses[number - 1]) for number in range(first, last))
+
+
+class FakeSite:
+    """
+    State of the fake site: the station model, advanced every `step_seconds` of wall time, and the pages
+    rendered for the current step. Pages carry the step as their ETag, so an unchanged page is answered
+    with 304 Not Modified like a well-behaved origin.
+
+    Attributes:
+        model (StationModel): Socket statuses of all pages.
+        rows (int): Stations per page.
+        pages (int): Number of pages.
+        step_seconds (float): Seconds between two steps of the model.
+        faults (Faults): Faults injected into the responses.
+        counters (dict): Number of responses by outcome.
+    """
+
+    def __init__(
+        self,
+        rows: int,
+        pages: int = 1,
+        step_seconds: float = 60.0,
+        faults: Faults | None = None,
+        seed: int = 0,
+    ):
+        self.model = StationModel(rows * pages, seed=seed)
+        self.rows = rows
+        self.pages = pages
+        self.step_seconds = step_seconds
+        self.faults = faults or Faults()
+        self.counters: Dict[str, int] = {"ok": 0, "not_modified": 0, "error": 0, "truncated": 0}
+        self.rng = random.Random(seed)
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+        self.rendered: Dict[int, str] = {}
+
+    def page(self, index: int) -> Tuple[int, str]:
+        """
+        Returns the current step and the page, first advancing the model by the steps due since the last request.
+        """
+        with self.lock:
+            due = int((time.monotonic() - self.started) // self.step_seconds)
+            if due > self.model.step:
+                while self.model.step < due:
+                    self.model.advance()
+                self.rendered.clear()
+            if index not in self.rendered:
+                self.rendered[index] = self.model.render(index * self.rows + 1, self.rows)
+            return self.model.step, self.rendered[index]
+
+    def count(self, outcome: str) -> None:
+        with self.lock:
+            self.counters[outcome] += 1
+
+
+class FakeSiteHandler(BaseHTTPRequestHandler):
+    server: "FakeSiteServer"
+
+    def do_GET(self) -> None:  # noqa: N802
+        site, faults = self.server.site, self.server.site.faults
+        try:
+            index = int(parse_qs(urlsplit(self.path).query).get("page", ["0"])[0])
+        except ValueError:
+            index = -1
+        if not 0 <= index < site.pages:
+            self.send_error(404)
+            return
+        if faults.latency:
+            time.sleep(site.rng.expovariate(1 / faults.latency))
+        if site.rng.random() < faults.error_rate:
+            site.count("error")
+            self.send_error(site.rng.choice(ERROR_STATUSES))
+            return
+
+        step, page = site.page(index)
+        etag = f'"{step}-{index}"'
+        if self.headers.get("If-None-Match") == etag:
+            site.count("not_modified")
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        body = page.encode("utf-8")
+        if site.rng.random() < faults.truncate_rate:
+            site.count("truncated")
+            body = body[:int(len(body) * site.rng.uniform(0.1, 0.9))]
+            etag = f'"{step}-{index}-truncated"'
+        else:
+            site.count("ok")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+class FakeSiteServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, site: FakeSite, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), FakeSiteHandler)
+        self.site = site
+
+    def urls(self) -> List[str]:
+        """
+        Returns the URLs of all pages of the site.
+        """
+        host, port = self.server_address[:2]
+        return [f"http://{host}:{port}/?page={index}" for index in range(self.site.pages)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serves synthetic station pages with evolving statuses.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    parser.add_argument("--rows", type=int, default=1000, help="Stations per page")
+    parser.add_argument("--pages", type=int, default=1, help="Number of pages")
+    parser.add_argument("--step", type=float, default=60.0, help="Seconds between status changes")
+    parser.add_argument("--latency", type=float, default=0.0, help="Mean response delay in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of 5xx responses")
+    parser.add_argument("--truncate-rate", type=float, default=0.0, help="Share of truncated pages")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the statuses and the faults")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    faults = Faults(args.latency, args.error_rate, args.truncate_rate)
+    server = FakeSiteServer(FakeSite(args.rows, args.pages, args.step, faults, args.seed), args.host, args.port)
+    logger.info(f"Serving {', '.join(server.urls())}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        logger.info(f"Responses: {server.site.counters}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Generates synthetic station pages with the markup `StationDataParser` expects.
+"""
+import argparse
+import random
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from src.parser.engines import (ADDRESS_CELL, NAME_CELL, NUMBER_CELL,
+                                STATUS_CELL)
+
+STATUS_MIX: Dict[str, float] = {"Свободен": 0.6, "Занят": 0.3, "Неисправен": 0.1}
+SOCKET_TYPES = ("Type 2", "CCS", "CHAdeMO", "GB/T")
+CITIES = ("Алматы", "Астана", "Шымкент", "Усть-Каменогорск", "Караганда")
+STREETS = ("Абая", "Достык", "Сатпаева", "Толе би", "Кабанбай батыра")
+PLACES = ("ТРЦ Мега", "АЗС Helios", "БЦ Нурлы Тау", "Парковка", "Гостиница Казахстан")
+POWERS = ("7.4", "22", "50", "60", "120")
+
+
+def station_attributes(number: int, sockets: Tuple[int, int]) -> Tuple[str, str, str, str, List[str]]:
+    """
+    Returns the city, street, place, power and socket types of a station. They depend only on the station number,
+    so pages generated with different seeds list the same stations with different statuses.
+    """
+    station = random.Random(number)
+    city, street, place = station.choice(CITIES), station.choice(STREETS), station.choice(PLACES)
+    socket_types = [station.choice(SOCKET_TYPES) for _ in range(station.randint(*sockets))]
+    return city, street, place, station.choice(POWERS), socket_types
+
+
+def render_row(number: int, sockets: Tuple[int, int], statuses: Sequence[str]) -> str:
+    """
+    Renders one station row.
+
+    Args:
+        number (int): Station number.
+        sockets (tuple): Minimum and maximum number of sockets of a station.
+        statuses (list): Status of every socket of the station.
+
+    Returns:
+        str: The markup of the `<tr>` row.
+    """
+    city, street, place, power, socket_types = station_attributes(number, sockets)
+    spans = "".join(
+        f'<span class="badge badge-pill">\n {status} {socket_type}\n</span><br>'
+        for status, socket_type in zip(statuses, socket_types)
+    )
+    return (
+        "<tr>\n"
+        f'  <td class="{NUMBER_CELL}">\n № {number}\r\n</td>\n'
+        f'  <td class="{ADDRESS_CELL}"> г. {city}, ул. {street} {number % 300 + 1} </td>\n'
+        f'  <td class="{NAME_CELL}"> {place} <b>{number}</b>, {power} kWh </td>\n'
+        f'  <td class="{STATUS_CELL}">{spans}</td>\n'
+        "</tr>"
+    )
+
+
+def render_page(rows: Iterable[str]) -> str:
+    """
+    Wraps station rows into a page.
+    """
+    body = "\n".join(rows)
+    return (
+        '<html><head><meta charset="utf-8"><title>Станции</title></head><body>'
+        '<table class="table"><thead><tr><th>№</th><th>Адрес</th><th>Название</th><th>Статус</th></tr></thead>'
+        f"<tbody>\n{body}\n</tbody></table></body></html>"
+    )
+
+
+def station_row(number: int, sockets: Tuple[int, int], status_mix: Dict[str, float], rng: random.Random) -> str:
+    """
+    Renders one station row with random statuses.
+
+    Args:
+        number (int): Station number.
+        sockets (tuple): Minimum and maximum number of sockets of a station.
+        status_mix (dict): Status -> weight.
+        rng (random.Random): Source of the statuses of the station.
+
+    Returns:
+        str: The markup of the `<tr>` row.
+    """
+    count = len(station_attributes(number, sockets)[4])
+    return render_row(number, sockets, rng.choices(list(status_mix), weights=list(status_mix.values()), k=count))
+
+
+def generate_page(
+    rows: int,
+    sockets: Tuple[int, int] = (1, 3),
+    status_mix: Dict[str, float] | None = None,
+    seed: int = 0,
+    changed: float = 0.0,
+) -> str:
+    """
+    Generates a station page.
+
+    Args:
+        rows (int): Number of stations.
+        sockets (tuple): Minimum and maximum number of sockets of a station.
+        status_mix (dict | None): Status -> weight, defaults to `STATUS_MIX`.
+        seed (int): Seed of the statuses; the stations are the same for every seed.
+        changed (float): Share of the stations, from the top of the page, whose statuses are drawn
+                         with the next seed; 0.01 changes about 1% of the rows of the `seed` page.
+
+    Returns:
+        str: The HTML of the page.
+    """
+    mix = status_mix or STATUS_MIX
+    return render_page(
+        station_row(number, sockets, mix, random.Random(f"{seed + (number <= rows * changed)}-{number}"))
+        for number in range(1, rows + 1)
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generates a synthetic station page.")
+    parser.add_argument("--rows", type=int, default=1000, help="Number of stations")
+    parser.add_argument("--sockets", type=int, nargs=2, default=(1, 3), help="Minimum and maximum sockets")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the statuses")
+    parser.add_argument("--output", default="page.html", help="Output file")
+    args = parser.parse_args()
+    with open(args.output, "w", encoding="utf-8") as file:
+        file.write(generate_page(args.rows, tuple(args.sockets), seed=args.seed))
+
+
+if __name__ == "__main__":
+    main()
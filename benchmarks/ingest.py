@@ -0,0 +1,86 @@
+"""
+End-to-end ingest benchmarks against a throwaway Postgres/TimescaleDB database.
+
+The database configured by the environment (POSTGRES_*, DB_HOST, DB_PORT) is wiped: all tables
+are dropped and created again before every configuration.
+"""
+import datetime
+import itertools
+import time
+from typing import Any, Dict, List
+
+from src import metrics
+from src.database import StationOrmMethod
+from src.database.cache import dimension_cache, status_cache
+from src.database.queries import OrmMethods
+from src.parser import StationDataParser
+
+from .generator import generate_page
+from .report import summarize
+
+CONFIGURATIONS = [
+    {"mode": "row", "status_writer": "insert", "storage": "snapshot"},
+    *(
+        {"mode": "bulk", "status_writer": writer, "storage": storage}
+        for writer, storage in itertools.product(("insert", "copy"), ("snapshot", "delta"))
+    ),
+]
+
+
+async def bench_configuration(
+    rows: int, ticks: int, changed: float, mode: str, status_writer: str, storage: str
+) -> List[Dict[str, Any]]:
+    """
+    Ingests `ticks` consecutive scrapes of a page with `rows` stations into empty tables. The first tick
+    creates the stations and sockets; the following ones are the steady state of a running scraper,
+    in which the statuses of a `changed` share of the stations change every tick.
+
+    Returns:
+        The timings of the first tick and of the steady-state ticks, with the status rows written per second
+        and the database round trips of a tick.
+    """
+    await OrmMethods.delete_tables()
+    await OrmMethods.create_tables()
+    dimension_cache.clear()
+    status_cache.clear()
+    orm = StationOrmMethod(mode=mode, status_writer=status_writer, storage=storage)
+
+    start = datetime.datetime(2024, 1, 1)
+    scrapes = [
+        StationDataParser(
+            generate_page(rows, changed=changed if tick % 2 else 0.0),
+            engine="lxml",
+            status_timestamp=start + datetime.timedelta(minutes=tick),
+        ).parse_data()
+        for tick in range(ticks)
+    ]
+    timings, round_trips = [], []
+    for observations in scrapes:
+        round_trips_before = metrics.db_round_trips.value()
+        started = time.perf_counter()
+        await orm.add_stations(observations)
+        timings.append(time.perf_counter() - started)
+        round_trips.append(metrics.db_round_trips.value() - round_trips_before)
+
+    params = {"rows": rows, "sockets": len(scrapes[0]), "changed": changed, "mode": mode,
+              "status_writer": status_writer, "storage": storage}
+    results = [summarize("ingest_first_tick", timings[:1], **params)]
+    results[0]["db_round_trips"] = round_trips[0]
+    if len(timings) > 1:
+        steady = summarize("ingest_tick", timings[1:], **params)
+        steady["status_rows_per_second"] = len(scrapes[0]) / steady["median"]
+        steady["db_round_trips"] = max(round_trips[1:])
+        results.append(steady)
+    return results
+
+
+async def run(rows: int, ticks: int, changed: float, modes: List[str]) -> List[Dict[str, Any]]:
+    """
+    Runs the ingest benchmark for every configuration of the given ingest modes.
+    """
+    results = []
+    for configuration in CONFIGURATIONS:
+        if configuration["mode"] in modes:
+            results.extend(await bench_configuration(rows, ticks, changed, **configuration))
+    await OrmMethods.delete_tables()
+    return results
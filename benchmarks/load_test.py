@@ -0,0 +1,213 @@
+"""
+Sustained load test of the scraper against the fake station site, storing into a throwaway database.
+
+Ticks are fired every `interval` seconds, usually much faster than the one-minute schedule, and stamped
+with consecutive minutes. The latency of a tick is the time from firing it until the snapshots of all
+sources are written; a tick is missed if a source never writes its snapshot, because the tick was
+dropped or skipped, or the source failed.
+"""
+import asyncio
+import datetime
+import logging
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Literal
+
+from src import ScrapeCoordinator, Source, StagedScraper, metrics
+from src.database import StationOrmMethod
+from src.database.cache import dimension_cache, status_cache
+from src.database.queries import OrmMethods
+from src.fingerprint import FingerprintStore
+from src.parser import make_parser_pool
+from src.pipeline import Snapshot
+from src.web_loader import WebPageLoader
+
+from .fake_site import FakeSite, FakeSiteServer, Faults
+from .report import summarize
+
+logger = logging.getLogger(__name__)
+
+Runner = Literal["coordinator", "staged"]
+
+# Seconds the staged pipeline may take to write the ticks still queued after the last one was fired
+DRAIN_TIMEOUT = 60.0
+
+
+def _serve(rows: int, pages: int, step_seconds: float, faults: Faults, seed: int, urls: multiprocessing.Queue) -> None:
+    """
+    Runs the fake site in its own process, so serving pages does not compete with the scraper for the GIL.
+    """
+    server = FakeSiteServer(FakeSite(rows, pages, step_seconds, faults, seed))
+    urls.put(server.urls())
+    server.serve_forever()
+
+
+class TickRecorder:
+    """
+    Records when each tick was fired and when the snapshot of each source for it was written.
+
+    Attributes:
+        sources (List[str]): Names of the sources expected to write every tick.
+        fired (dict): Tick timestamp -> time it was fired (`time.perf_counter`).
+        written (dict): Tick timestamp -> source -> time its snapshot was written.
+    """
+
+    def __init__(self, sources: List[str]):
+        self.sources = sources
+        self.fired: Dict[datetime.datetime, float] = {}
+        self.written: Dict[datetime.datetime, Dict[str, float]] = {}
+
+    def fire(self, timestamp: datetime.datetime) -> None:
+        self.fired[timestamp] = time.perf_counter()
+
+    def wrap(self, name: str, write: Callable) -> Callable:
+        """
+        Wraps the `write` of a source pipeline to record the ticks of the snapshots it commits.
+        """
+        async def recording_write(snapshots: List[Snapshot]) -> None:
+            await write(snapshots)
+            written_at = time.perf_counter()
+            for snapshot in snapshots:
+                self.written.setdefault(snapshot.timestamp, {})[name] = written_at
+
+        return recording_write
+
+    def latencies(self) -> List[float | None]:
+        """
+        Returns the latency of every fired tick in seconds, None for a missed tick.
+        """
+        latencies = []
+        for timestamp, fired in self.fired.items():
+            written = self.written.get(timestamp, {})
+            complete = all(name in written for name in self.sources)
+            latencies.append(max(written.values()) - fired if complete else None)
+        return latencies
+
+
+async def _run_coordinator(scraper: ScrapeCoordinator, recorder: TickRecorder, ticks: List[datetime.datetime],
+                           interval: float) -> None:
+    """
+    Runs the ticks one at a time like the scheduler did before the staged pipeline: a tick fired while
+    the previous one is still running is skipped.
+    """
+    running: asyncio.Task | None = None
+    started = time.perf_counter()
+    for index, timestamp in enumerate(ticks):
+        await asyncio.sleep(max(started + index * interval - time.perf_counter(), 0))
+        recorder.fire(timestamp)
+        if running is not None and not running.done():
+            logger.warning(f"Tick {timestamp:%H:%M} skipped, the previous tick is still running")
+            continue
+        running = asyncio.create_task(scraper.run(timestamp))
+    if running is not None:
+        await running
+
+
+async def _run_staged(scraper: StagedScraper, recorder: TickRecorder, ticks: List[datetime.datetime],
+                      interval: float) -> None:
+    """
+    Submits the ticks to the staged pipeline and waits for it to drain after the last one.
+    """
+    await scraper.start()
+    started = time.perf_counter()
+    try:
+        for index, timestamp in enumerate(ticks):
+            await asyncio.sleep(max(started + index * interval - time.perf_counter(), 0))
+            recorder.fire(timestamp)
+            scraper.submit(timestamp)
+        await asyncio.wait_for(scraper.join(), DRAIN_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning("The pipeline did not drain after the last tick")
+    finally:
+        await scraper.stop()
+
+
+def _report(latencies: List[float | None], **params) -> Dict[str, Any]:
+    """
+    Builds the result of a run: latency percentiles of the completed ticks and the number of missed ticks.
+    """
+    completed = [latency for latency in latencies if latency is not None]
+    result = summarize("tick_latency", completed or [0.0], **params)
+    if len(completed) > 1:
+        percentiles = statistics.quantiles(completed, n=100, method="inclusive")
+        result.update(p50=percentiles[49], p90=percentiles[89], p99=percentiles[98])
+    result.update(ticks=len(latencies), completed=len(completed), missed=len(latencies) - len(completed))
+    return result
+
+
+async def run(
+    rows: int,
+    pages: int,
+    ticks: int,
+    interval: float,
+    runner: Runner = "staged",
+    engine: str = "lxml",
+    incremental: bool = False,
+    faults: Faults | None = None,
+    seed: int = 0,
+) -> List[Dict[str, Any]]:
+    """
+    Starts the fake site and runs `ticks` ticks of the scraper against it into freshly created tables.
+
+    Args:
+        rows (int): Stations per page of the fake site.
+        pages (int): Pages of the fake site, each scraped as its own source.
+        ticks (int): Number of ticks.
+        interval (float): Seconds between ticks; statuses on the site change at the same pace.
+        runner (str): "staged" for the staged pipeline, "coordinator" for one tick at a time.
+        engine (str): Parser engine, "bs4" or "lxml".
+        incremental (bool): Whether only changed rows are parsed.
+        faults (Faults | None): Faults injected by the fake site.
+        seed (int): Seed of the statuses and the faults.
+
+    Returns:
+        The result of the run.
+    """
+    faults = faults or Faults()
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    site = context.Process(target=_serve, args=(rows, pages, interval, faults, seed, queue), daemon=True)
+    site.start()
+    urls = await asyncio.to_thread(queue.get, timeout=60)
+
+    await OrmMethods.delete_tables()
+    await OrmMethods.create_tables()
+    dimension_cache.clear()
+    status_cache.clear()
+    await StationOrmMethod.warm_up()
+
+    sources = [Source(f"fake-{index}", url, engine, incremental) for index, url in enumerate(urls)]
+    pool = make_parser_pool()
+    with tempfile.TemporaryDirectory() as directory:
+        options = {"timeout": interval, "fingerprints": FingerprintStore(os.path.join(directory, "fingerprints.json")),
+                   "pool": pool}
+        scraper = StagedScraper(sources, **options) if runner == "staged" else ScrapeCoordinator(sources, **options)
+        recorder = TickRecorder([source.name for source in sources])
+        for name, pipeline in scraper.pipelines.items():
+            pipeline.write = recorder.wrap(name, pipeline.write)
+
+        start = datetime.datetime(2024, 1, 1)
+        timestamps = [start + datetime.timedelta(minutes=tick) for tick in range(ticks)]
+        try:
+            if runner == "staged":
+                await _run_staged(scraper, recorder, timestamps, interval)
+            else:
+                await _run_coordinator(scraper, recorder, timestamps, interval)
+        finally:
+            site.terminate()
+            await WebPageLoader.close_client()
+            if pool is not None:
+                pool.shutdown()
+
+    await OrmMethods.delete_tables()
+    result = _report(
+        recorder.latencies(), rows=rows, pages=pages, interval=interval, runner=runner, engine=engine,
+        incremental=incremental, latency=faults.latency, error_rate=faults.error_rate,
+        truncate_rate=faults.truncate_rate,
+    )
+    # Fetch, parse and database counters of the whole run, as exposed by the metrics endpoint
+    result["metrics"] = metrics.registry.summary()
+    return [result]
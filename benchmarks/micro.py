@@ -0,0 +1,116 @@
+"""
+Micro-benchmarks of the text extraction, the parser and the CSV export.
+"""
+import datetime
+import os
+import tempfile
+from typing import Any, Dict, List
+
+from src.parser import RowCache, StationDataParser
+from src.parser.text_processing import TextDataExtractor, extract_field
+from src.save_to_csv import LongCsvWriter, save_to_csv
+
+from .generator import generate_page
+from .report import measure
+
+# Ticks already in the long-format export when its appends are timed
+CSV_HISTORY_TICKS = 60
+
+CELLS = {
+    "station_number": ("\n № 1234\r\n", r"№ (\d+)", int),
+    "city": (" г. Усть-Каменогорск, ул. Абая 12 ", r"г\. ([\w\s-]+),", None),
+    "power": (" ТРЦ Мега <b>12</b>, 22 kWh ", r", (\d+(\.\d+)?) kWh", float),
+}
+EXTRACTIONS = 10_000
+
+
+def bench_text_extraction(repeat: int) -> List[Dict[str, Any]]:
+    """
+    Times the extraction of every field from a typical cell, through `TextDataExtractor`
+    and through the field registry used by the parser.
+    """
+    results = []
+    for field, (text, pattern, data_type) in CELLS.items():
+        results.append(measure(
+            "text_extractor", lambda: TextDataExtractor(text).extract_data(pattern, data_type),
+            repeat=repeat, number=EXTRACTIONS, field=field,
+        ))
+        results.append(measure(
+            "extract_field", lambda: extract_field(field, text), repeat=repeat, number=EXTRACTIONS, field=field,
+        ))
+    return results
+
+
+def bench_parse(sizes: List[int], engines: List[str], repeat: int) -> List[Dict[str, Any]]:
+    """
+    Times `parse_data` of whole pages, and of a page with 1% changed rows in incremental mode,
+    with the rows of the previous page already cached.
+    """
+    results = []
+    timestamp = datetime.datetime(2024, 1, 1)
+    for rows in sizes:
+        page = generate_page(rows, seed=0)
+        changed = generate_page(rows, seed=0, changed=0.01)
+        for engine in engines:
+            results.append(measure(
+                "parse_data", lambda: StationDataParser(page, engine=engine, status_timestamp=timestamp).parse_data(),
+                repeat=repeat, rows=rows, engine=engine,
+            ))
+            results.append(measure(
+                "parse_data_incremental",
+                _incremental_parse(page, changed, engine, timestamp),
+                repeat=repeat, rows=rows, engine=engine,
+            ))
+    return results
+
+
+def _incremental_parse(page: str, changed: str, engine: str, timestamp: datetime.datetime):
+    warm = RowCache()
+    StationDataParser(page, engine=engine, status_timestamp=timestamp, row_cache=warm).parse_data()
+
+    def parse():
+        row_cache = RowCache()
+        row_cache.rows = dict(warm.rows)
+        StationDataParser(changed, engine=engine, status_timestamp=timestamp, row_cache=row_cache).parse_data()
+
+    return parse
+
+
+def bench_save_to_csv(sizes: List[int], repeat: int) -> List[Dict[str, Any]]:
+    """
+    Times writing a new CSV file and adding a column to an existing one, and appending a tick
+    to a long-format export that already holds `CSV_HISTORY_TICKS` ticks.
+    """
+    results = []
+    for rows in sizes:
+        observations = StationDataParser(generate_page(rows), engine="lxml").parse_data()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "stations.csv")
+
+            def create():
+                if os.path.exists(path):
+                    os.remove(path)
+                save_to_csv(observations, path)
+
+            results.append(measure("save_to_csv_create", create, repeat=repeat, rows=rows))
+            create()
+            results.append(measure("save_to_csv_append", lambda: save_to_csv(observations, path),
+                                   repeat=repeat, rows=rows))
+
+            writer = LongCsvWriter(os.path.join(directory, "long"))
+            for _ in range(CSV_HISTORY_TICKS):
+                writer.append(observations)
+            results.append(measure("csv_long_append", lambda: writer.append(observations), repeat=repeat,
+                                   rows=rows, history_ticks=CSV_HISTORY_TICKS))
+    return results
+
+
+def run(sizes: List[int], engines: List[str], repeat: int, csv_max_rows: int) -> List[Dict[str, Any]]:
+    """
+    Runs all micro-benchmarks. `save_to_csv` is only run for page sizes up to `csv_max_rows`.
+    """
+    return [
+        *bench_text_extraction(repeat),
+        *bench_parse(sizes, engines, repeat),
+        *bench_save_to_csv([rows for rows in sizes if rows <= csv_max_rows], repeat),
+    ]
@@ -0,0 +1,112 @@
+"""
+Measurement helpers and the JSON report shared by all benchmarks.
+"""
+import datetime
+import json
+import platform
+import statistics
+import subprocess
+import time
+from typing import Any, Callable, Dict, List
+
+
+def measure(name: str, func: Callable[[], Any], repeat: int = 5, number: int = 1, **params) -> Dict[str, Any]:
+    """
+    Times `func`, called `number` times per round for `repeat` rounds.
+
+    Args:
+        name (str): Name of the benchmark.
+        func (callable): The code to time.
+        repeat (int): Number of rounds.
+        number (int): Calls per round.
+        **params: Parameters of the benchmark, stored with the result.
+
+    Returns:
+        dict: Name, parameters and seconds per call (min, median, mean, max over the rounds).
+    """
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - started) / number)
+    return summarize(name, timings, number=number, **params)
+
+
+def summarize(name: str, timings: List[float], number: int = 1, **params) -> Dict[str, Any]:
+    """
+    Builds the result of a benchmark from its timings in seconds per call.
+    """
+    return {
+        "name": name,
+        "params": params,
+        "repeat": len(timings),
+        "number": number,
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings),
+        "max": max(timings),
+    }
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_report(suite: str, results: List[Dict[str, Any]], path: str | None) -> Dict[str, Any]:
+    """
+    Writes the results with the commit and the environment they were measured on as JSON,
+    to `path` or to stdout.
+    """
+    report = {
+        "suite": suite,
+        "commit": _commit(),
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if path:
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(text)
+    else:
+        print(text)
+    return report
+
+
+def _key(result: Dict[str, Any]) -> str:
+    return f"{result['name']} {json.dumps(result['params'], sort_keys=True)}"
+
+
+def compare(baseline_path: str, current_path: str, threshold: float = 0.1) -> List[str]:
+    """
+    Compares the median timings of two reports.
+
+    Args:
+        baseline_path (str): Report of the baseline commit.
+        current_path (str): Report of the commit under test.
+        threshold (float): Relative slowdown reported as a regression.
+
+    Returns:
+        List[str]: The benchmarks slower than the baseline by more than the threshold.
+    """
+    with open(baseline_path, encoding="utf-8") as file:
+        baseline = {_key(result): result for result in json.load(file)["results"]}
+    with open(current_path, encoding="utf-8") as file:
+        current = json.load(file)["results"]
+    regressions = []
+    for result in current:
+        before = baseline.get(_key(result))
+        if before is None:
+            continue
+        change = result["median"] / before["median"] - 1
+        print(f"{_key(result):80} {before['median']:.6f}s -> {result['median']:.6f}s {change:+.1%}")
+        if change > threshold:
+            regressions.append(_key(result))
+    return regressions
@@ -5,29 +5,34 @@ import os
 from dotenv import load_dotenv
 
 import src
+from src.parser import make_parser_pool
 
 load_dotenv()
 logging.basicConfig(level=logging.WARNING)
+# The JSON metric summaries of every tick
+logging.getLogger(src.metrics.__name__).setLevel(logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-async def job_function():
+async def main():
     """
-    Asynchronously fetches a web page, parses station data from it, and updates the database with the new data.
-
-    This function performs the following steps:
-    1. Retrieves the URL from environment variables.
-    2. Uses a web page loader to fetch the page at the given URL.
-    3. If the page is successfully fetched, it parses the station data from the page.
-    4. Adds the parsed station data to the database using an ORM method designed for station data.
+    Loads the source registry, warms up the database layer's dimension key cache, starts the fetch, parse
+    and store stages and lets the scheduler enqueue a tick every minute.
     """
-    url = os.getenv("URL")
-    page = src.WebPageLoader(url).fetch_page()
-    if page:
-        stations_data = src.StationDataParser(page).parse_data()
-        await src.StationOrmMethod().add_stations(stations_data)
-        logger.debug("In progress ...")
+    src.start_metrics_server()
+    pool = make_parser_pool()
+    spool = src.Spool() if os.getenv("SPOOL_ENABLED", "False").lower() == "true" else None
+    scraper = src.StagedScraper(src.load_sources(), pool=pool, spool=spool)
+    await src.StationOrmMethod.warm_up()
+    await scraper.start()
+    try:
+        await src.run_scheduler(scraper.submit)
+    finally:
+        await scraper.stop()
+        await src.WebPageLoader.close_client()
+        if pool is not None:
+            pool.shutdown()
 
 
 if __name__ == "__main__":
-    asyncio.run(src.run_scheduler(job_function))
+    asyncio.run(main())
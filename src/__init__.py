@@ -1,4 +1,10 @@
+from .coordinator import ScrapeCoordinator, SourceTiming
 from .database import StationOrmMethod
+from .metrics import start_metrics_server
 from .parser import StationDataParser
+from .pipeline import Snapshot, SourcePipeline
 from .scheduler import run_scheduler
+from .sources import Source, load_sources
+from .spool import Spool, SpoolDrainer
+from .stages import StagedScraper
 from .web_loader import WebPageLoader
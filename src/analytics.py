@@ -0,0 +1,393 @@
+"""
+Occupancy and revenue analytics over the stored status series.
+
+Statuses are loaded from `station_status` in columnar batches of sockets, turned into per-socket durations
+by category (occupied, free, broken) with vectorized interval arithmetic and priced with a tariff table
+keyed by socket power and type. `OccupancyLedger` keeps hourly durations on disk and extends them from a
+watermark, so a report does not rescan the whole history.
+
+Usage:
+    python -m src.analytics update
+    python -m src.analytics report --start 2024-01-01T00:00 --end 2024-02-01T00:00 [--exact] [--output revenue.csv]
+"""
+import argparse
+import asyncio
+import datetime
+import gzip
+import json
+import logging
+import os
+import sys
+from typing import AsyncIterator, Dict
+
+import numpy
+import pandas
+from sqlalchemy import select, true
+
+from .database.cache import as_utc
+from .database.config import settings
+from .database.database import session_factory
+from .database.models import (SocketTypeOrm, StationInfoOrm, StationSocketOrm,
+                              StationStatusOrm, StatusCodeOrm)
+from .database.reads import STATUS_CATEGORIES
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_DIR = os.getenv("ANALYTICS_DIR", os.path.join(os.getenv("STATE_DIR", "data"), "analytics"))
+TARIFFS_FILE = os.getenv("TARIFFS_FILE", "tariffs.json")
+# Sockets whose statuses are loaded and processed together
+ANALYTICS_BATCH_SOCKETS = int(os.getenv("ANALYTICS_BATCH_SOCKETS", 2000))
+# Longest time a snapshot status is assumed to last without a newer one, e.g. while the scraper was down.
+# In delta storage a status lasts until the next change.
+ANALYTICS_MAX_HOLD = float(os.getenv("ANALYTICS_MAX_HOLD", 300))
+# Statuses younger than this may still be replayed from the spool, `update` stops before them
+ANALYTICS_SETTLE = float(os.getenv("ANALYTICS_SETTLE", 300))
+
+CATEGORIES = ["occupied", "free", "broken", "other"]
+STATUS_COLUMNS = ["station_socket_id", "status", "timestamp"]
+HOURLY_COLUMNS = ["station_socket_id", "hour", "category", "seconds"]
+WILDCARD = "*"
+
+
+def _utc64(timestamp: datetime.datetime) -> numpy.datetime64:
+    return numpy.datetime64(as_utc(timestamp).replace(tzinfo=None), "ns")
+
+
+def hourly_durations(
+    statuses: pandas.DataFrame,
+    start: datetime.datetime,
+    end: datetime.datetime,
+    max_hold: datetime.timedelta | None = None,
+) -> pandas.DataFrame:
+    """
+    Computes how long every socket spent in each status category within a window, split by hour.
+
+    Every status lasts until the next status of its socket, the end of the window or `max_hold`
+    after it was observed, whichever comes first. The intervals are clipped to the window and cut at
+    hour boundaries with array operations, without a Python loop over the rows.
+
+    Args:
+        statuses: Rows with "station_socket_id", "status" and "timestamp", sorted by socket and time.
+                  It may hold one row per socket from before `start`, the status the socket entered the window with.
+        start: Start of the window.
+        end: End of the window, exclusive.
+        max_hold: Longest time a status lasts without a newer one, None for no limit.
+
+    Returns:
+        pandas.DataFrame: "station_socket_id", "hour" (naive UTC), "category" and "seconds",
+                          one row per socket, hour and category with a positive duration.
+    """
+    if statuses.empty:
+        return pandas.DataFrame(columns=HOURLY_COLUMNS)
+    sockets = statuses["station_socket_id"].to_numpy()
+    begins = pandas.to_datetime(statuses["timestamp"], utc=True).dt.tz_convert(None).to_numpy("datetime64[ns]")
+    window_start, window_end = _utc64(start), _utc64(end)
+
+    ends = numpy.empty_like(begins)
+    ends[:-1] = begins[1:]
+    last_of_socket = numpy.append(sockets[1:] != sockets[:-1], True)
+    ends[last_of_socket] = window_end
+    if max_hold is not None:
+        ends = numpy.minimum(ends, begins + numpy.timedelta64(int(max_hold.total_seconds() * 1e9), "ns"))
+    begins, ends = numpy.maximum(begins, window_start), numpy.minimum(ends, window_end)
+    kept = ends > begins
+    begins, ends = begins[kept], ends[kept]
+    sockets = sockets[kept]
+    categories = statuses["status"].map(STATUS_CATEGORIES).fillna("other").to_numpy()[kept]
+
+    # One segment per interval and hour it overlaps
+    first_hours = begins.astype("datetime64[h]")
+    hours_spanned = (ends - numpy.timedelta64(1, "ns")).astype("datetime64[h]") - first_hours + 1
+    counts = hours_spanned.astype(numpy.int64)
+    interval = numpy.repeat(numpy.arange(len(begins)), counts)
+    offsets = numpy.arange(len(interval)) - numpy.repeat(numpy.cumsum(counts) - counts, counts)
+    hours = (first_hours[interval] + offsets.astype("timedelta64[h]")).astype("datetime64[ns]")
+    segment_begins = numpy.maximum(begins[interval], hours)
+    segment_ends = numpy.minimum(ends[interval], hours + numpy.timedelta64(1, "h"))
+
+    segments = pandas.DataFrame({
+        "station_socket_id": sockets[interval],
+        "hour": hours,
+        "category": categories[interval],
+        "seconds": (segment_ends - segment_begins) / numpy.timedelta64(1, "s"),
+    })
+    return segments.groupby(HOURLY_COLUMNS[:3], as_index=False, sort=False)["seconds"].sum()
+
+
+def socket_totals(hourly: pandas.DataFrame) -> pandas.DataFrame:
+    """
+    Sums hourly durations into seconds per socket, one column per category.
+    """
+    totals = hourly.pivot_table(
+        index="station_socket_id", columns="category", values="seconds", aggfunc="sum", fill_value=0.0
+    )
+    return totals.reindex(columns=CATEGORIES, fill_value=0.0).add_suffix("_seconds")
+
+
+async def load_status_batches(
+    start: datetime.datetime, end: datetime.datetime, batch_sockets: int = ANALYTICS_BATCH_SOCKETS
+) -> AsyncIterator[pandas.DataFrame]:
+    """
+    Loads the statuses of a window in batches of sockets. Each batch holds every status of its sockets
+    in the window and, per socket, the last status before the window, sorted by socket and time.
+    Statuses are read as their small integer codes and named once per batch.
+
+    Example SQL (PostgreSQL):
+        SELECT s.id, last.status_code, last.timestamp FROM station_socket AS s CROSS JOIN LATERAL (
+            SELECT status_code, timestamp FROM station_status WHERE station_socket_id = s.id AND timestamp < $1
+            ORDER BY timestamp DESC LIMIT 1) AS last WHERE s.id BETWEEN $2 AND $3;
+        SELECT station_socket_id, status_code, timestamp FROM station_status
+        WHERE station_socket_id BETWEEN $2 AND $3 AND timestamp >= $1 AND timestamp < $4;
+    """
+    status = StationStatusOrm
+    async with session_factory() as session:
+        socket_ids = (await session.execute(select(StationSocketOrm.id).order_by(StationSocketOrm.id))).scalars().all()
+        names = dict((await session.execute(select(StatusCodeOrm.code, StatusCodeOrm.name))).all())
+        for offset in range(0, len(socket_ids), batch_sockets):
+            first, last = socket_ids[offset], socket_ids[min(offset + batch_sockets, len(socket_ids)) - 1]
+            previous = (
+                select(status.status_code, status.timestamp)
+                .where(status.station_socket_id == StationSocketOrm.id, status.timestamp < start)
+                .order_by(status.timestamp.desc())
+                .limit(1)
+                .lateral()
+            )
+            carried = await session.execute(
+                select(StationSocketOrm.id, previous.c.status_code, previous.c.timestamp)
+                .join(previous, true())
+                .where(StationSocketOrm.id.between(first, last))
+            )
+            window = await session.execute(
+                select(status.station_socket_id, status.status_code, status.timestamp).where(
+                    status.station_socket_id.between(first, last), status.timestamp >= start, status.timestamp < end
+                )
+            )
+            batch = pandas.DataFrame([*carried.all(), *window.all()], columns=STATUS_COLUMNS)
+            batch["status"] = batch["status"].map(names)
+            yield batch.sort_values(["station_socket_id", "timestamp"], kind="stable", ignore_index=True)
+
+
+def default_max_hold() -> datetime.timedelta | None:
+    """
+    Returns how long a status lasts without a newer one under the configured status storage.
+    """
+    if settings.STATUS_STORAGE == "delta" or ANALYTICS_MAX_HOLD <= 0:
+        return None
+    return datetime.timedelta(seconds=ANALYTICS_MAX_HOLD)
+
+
+async def window_durations(
+    start: datetime.datetime,
+    end: datetime.datetime,
+    max_hold: datetime.timedelta | None = None,
+    batch_sockets: int = ANALYTICS_BATCH_SOCKETS,
+) -> pandas.DataFrame:
+    """
+    Computes the hourly durations of an arbitrary window directly from `station_status`.
+
+    Returns:
+        pandas.DataFrame: The output of `hourly_durations` for all sockets.
+    """
+    max_hold = max_hold if max_hold is not None else default_max_hold()
+    parts = [hourly_durations(batch, start, end, max_hold)
+             async for batch in load_status_batches(start, end, batch_sockets)]
+    return pandas.concat(parts, ignore_index=True) if parts else pandas.DataFrame(columns=HOURLY_COLUMNS)
+
+
+def load_tariffs(path: str = TARIFFS_FILE) -> pandas.DataFrame:
+    """
+    Reads the tariff table: a JSON list of {"power", "socket", "price_per_kwh"} entries and optionally
+    "load_factor", the share of the rated power delivered on average while a socket is occupied (default 1).
+    A socket of "*" applies to every socket type of that power without a tariff of its own.
+
+    Returns:
+        pandas.DataFrame: "power", "socket", "price_per_kwh" and "load_factor".
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        tariffs = pandas.DataFrame(json.load(file))
+    if "load_factor" not in tariffs:
+        tariffs["load_factor"] = 1.0
+    tariffs["load_factor"] = tariffs["load_factor"].fillna(1.0)
+    return tariffs[["power", "socket", "price_per_kwh", "load_factor"]]
+
+
+async def load_sockets() -> pandas.DataFrame:
+    """
+    Loads the station and socket attributes revenue is reported with, indexed by socket id.
+    """
+    async with session_factory() as session:
+        result = await session.execute(
+            select(
+                StationSocketOrm.id, StationInfoOrm.number, StationInfoOrm.city, StationInfoOrm.name,
+                StationSocketOrm.charger_port, SocketTypeOrm.name, StationSocketOrm.power,
+            )
+            .join(StationInfoOrm, StationSocketOrm.station_id == StationInfoOrm.id)
+            .join(SocketTypeOrm, StationSocketOrm.socket_type_code == SocketTypeOrm.code)
+        )
+    columns = ["station_socket_id", "number", "city", "name", "charger_port", "socket", "power"]
+    return pandas.DataFrame(result.all(), columns=columns).set_index("station_socket_id")
+
+
+def estimate_revenue(
+    hourly: pandas.DataFrame, sockets: pandas.DataFrame, tariffs: pandas.DataFrame
+) -> pandas.DataFrame:
+    """
+    Prices the occupied time of every socket: energy = occupied hours * power * load factor,
+    revenue = energy * price per kWh. Sockets without a tariff have no revenue.
+
+    Args:
+        hourly: Hourly durations, e.g. from `window_durations` or `OccupancyLedger.durations`.
+        sockets: Socket attributes from `load_sockets`.
+        tariffs: Tariff table from `load_tariffs`.
+
+    Returns:
+        pandas.DataFrame: Per socket its attributes, the seconds per category, "energy_kwh" and "revenue".
+    """
+    report = sockets.join(socket_totals(hourly), how="inner").reset_index()
+    exact = tariffs[tariffs["socket"] != WILDCARD]
+    fallback = tariffs[tariffs["socket"] == WILDCARD].drop(columns="socket")
+    report = report.merge(exact, on=["power", "socket"], how="left")
+    report = report.merge(fallback, on="power", how="left", suffixes=("", "_fallback"))
+    for column in ("price_per_kwh", "load_factor"):
+        report[column] = report[column].fillna(report.pop(f"{column}_fallback"))
+    report["energy_kwh"] = report["occupied_seconds"] / 3600 * report["power"] * report["load_factor"]
+    report["revenue"] = report["energy_kwh"] * report["price_per_kwh"]
+    missing = report.loc[report["price_per_kwh"].isna(), ["power", "socket"]].drop_duplicates()
+    if not missing.empty:
+        logger.warning(f"No tariff for {len(missing)} power/socket combinations: {missing.values.tolist()}")
+    return report
+
+
+class OccupancyLedger:
+    """
+    Hourly durations per socket and status category, kept on disk and extended incrementally.
+
+    Everything before the watermark has been processed; `update` only loads the statuses from the watermark
+    on, plus the last status before it per socket. New hourly rows are appended to a gzip file tagged with
+    the watermark they were computed up to, and the watermark is saved afterwards, so rows of an interrupted
+    update are ignored when the ledger is read again.
+
+    Attributes:
+        directory (str): Directory of the ledger files.
+        watermark (datetime.datetime | None): End of the processed time, aware UTC; None before the first update.
+        hourly (pandas.DataFrame): The hourly durations, see `hourly_durations`.
+    """
+
+    def __init__(self, directory: str = ANALYTICS_DIR, max_hold: datetime.timedelta | None = None):
+        self.directory = directory
+        self.max_hold = max_hold if max_hold is not None else default_max_hold()
+        self.rows_path = os.path.join(directory, "occupancy_hourly.csv.gz")
+        self.watermark_path = os.path.join(directory, "watermark.json")
+        os.makedirs(directory, exist_ok=True)
+        self.watermark: datetime.datetime | None = None
+        if os.path.exists(self.watermark_path):
+            with open(self.watermark_path, "r", encoding="utf-8") as file:
+                self.watermark = datetime.datetime.fromisoformat(json.load(file)["watermark"])
+        self.hourly = self._load()
+
+    def _load(self) -> pandas.DataFrame:
+        if self.watermark is None or not os.path.exists(self.rows_path):
+            return pandas.DataFrame(columns=HOURLY_COLUMNS)
+        rows = pandas.read_csv(self.rows_path, parse_dates=["hour", "until"])
+        rows = rows[rows["until"] <= pandas.Timestamp(self.watermark).tz_convert(None)]
+        return rows.groupby(HOURLY_COLUMNS[:3], as_index=False)["seconds"].sum()
+
+    async def update(self, until: datetime.datetime | None = None, since: datetime.datetime | None = None) -> int:
+        """
+        Processes the statuses from the watermark up to `until`.
+
+        Args:
+            until: End of the update, defaults to `ANALYTICS_SETTLE` seconds ago.
+            since: Start of the first update; defaults to the first stored status.
+
+        Returns:
+            int: The number of hourly rows added.
+        """
+        until = as_utc(until or datetime.datetime.now(datetime.timezone.utc)
+                       - datetime.timedelta(seconds=ANALYTICS_SETTLE))
+        start = self.watermark or (as_utc(since) if since else await self._first_status())
+        if start is None or until <= start:
+            return 0
+        added = await window_durations(start, until, self.max_hold)
+        self._append(added, until)
+        self.watermark = until
+        tmp_path = f"{self.watermark_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump({"watermark": until.isoformat()}, file)
+        os.replace(tmp_path, self.watermark_path)
+        self.hourly = pandas.concat([self.hourly, added], ignore_index=True).groupby(
+            HOURLY_COLUMNS[:3], as_index=False
+        )["seconds"].sum()
+        logger.info(f"Occupancy ledger updated from {start} to {until}: {len(added)} hourly rows")
+        return len(added)
+
+    @staticmethod
+    async def _first_status() -> datetime.datetime | None:
+        async with session_factory() as session:
+            first = await session.scalar(select(StationStatusOrm.timestamp).order_by(StationStatusOrm.timestamp))
+        return as_utc(first) if first is not None else None
+
+    def _append(self, rows: pandas.DataFrame, until: datetime.datetime) -> None:
+        """
+        Appends rows as a new gzip member; a file of several members reads as one.
+        """
+        rows = rows.assign(until=pandas.Timestamp(until).tz_convert(None))
+        header = not os.path.exists(self.rows_path)
+        with gzip.open(self.rows_path, "at", encoding="utf-8", newline="") as file:
+            rows.to_csv(file, index=False, header=header, date_format="%Y-%m-%dT%H:%M:%S")
+
+    def durations(self, start: datetime.datetime, end: datetime.datetime) -> pandas.DataFrame:
+        """
+        Returns the hourly durations of the hours starting in [start, end); a window is resolved to whole hours.
+
+        Raises:
+            ValueError: If the window ends after the watermark.
+        """
+        if self.watermark is None or as_utc(end) > self.watermark:
+            raise ValueError(f"The ledger only covers the time up to {self.watermark}, run an update first")
+        hours = self.hourly["hour"]
+        first_hour = pandas.Timestamp(as_utc(start)).tz_convert(None).floor("h")
+        return self.hourly[(hours >= first_hour) & (hours < pandas.Timestamp(as_utc(end)).tz_convert(None))]
+
+
+async def report(start: datetime.datetime, end: datetime.datetime, exact: bool = False) -> pandas.DataFrame:
+    """
+    Estimates the revenue of every socket in a window, from the ledger after bringing it up to date,
+    or directly from the status series with `exact`.
+    """
+    if exact:
+        hourly = await window_durations(start, end)
+    else:
+        ledger = OccupancyLedger()
+        await ledger.update()
+        hourly = ledger.durations(start, end)
+    return estimate_revenue(hourly, await load_sockets(), load_tariffs())
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Occupancy and revenue analytics.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    update_parser = commands.add_parser("update", help="Extends the occupancy ledger up to now")
+    update_parser.add_argument("--since", type=datetime.datetime.fromisoformat, help="Start of the first update")
+    report_parser = commands.add_parser("report", help="Estimates the revenue of a time window")
+    report_parser.add_argument("--start", type=datetime.datetime.fromisoformat, required=True)
+    report_parser.add_argument("--end", type=datetime.datetime.fromisoformat, required=True)
+    report_parser.add_argument("--exact", action="store_true", help="Compute from the status series, not the ledger")
+    report_parser.add_argument("--output", help="CSV file, stdout by default")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = _parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "update":
+        asyncio.run(OccupancyLedger().update(since=args.since))
+        return
+    revenue = asyncio.run(report(args.start, args.end, args.exact))
+    totals: Dict[str, float] = revenue[["occupied_seconds", "energy_kwh", "revenue"]].sum().to_dict()
+    logger.info(f"{len(revenue)} sockets: {totals}")
+    revenue.to_csv(args.output or sys.stdout, index=False)
+
+
+if __name__ == "__main__":
+    main()
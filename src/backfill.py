@@ -0,0 +1,273 @@
+"""
+Loads archived station pages into the database.
+
+Usage:
+    python -m src.backfill <directory or tarball> [--engine lxml] [--processes 4] [--checkpoint path]
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import os
+import re
+import tarfile
+import tempfile
+import time
+from typing import Iterator, List, NamedTuple
+
+from .database import StationOrmMethod
+from .database.cache import as_utc, status_cache
+from .parser import ParsedRow
+from .parser.pool import ParserPool, parse_rows
+from .parser.station_parser import ParserEngine
+from .scheduler import aligned_tick
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_SUFFIXES = (".html", ".htm")
+# 2024-01-05T12:03:00, 2024-01-05_12-03, 20240105T1203, 20240105_120300, ...
+FILENAME_TIMESTAMP = re.compile(
+    r"(?P<year>\d{4})-?(?P<month>\d{2})-?(?P<day>\d{2})[T_ -]?"
+    r"(?P<hour>\d{2})[-:.]?(?P<minute>\d{2})(?:[-:.]?(?P<second>\d{2}))?"
+)
+BACKFILL_BATCH_SNAPSHOTS = int(os.getenv("BACKFILL_BATCH_SNAPSHOTS", 60))
+
+
+class ArchivedPage(NamedTuple):
+    """
+    A page of the archive and the time it was observed at.
+    """
+    path: str
+    timestamp: datetime.datetime
+
+
+def snapshot_timestamp(name: str, mtime: float) -> datetime.datetime:
+    """
+    Returns the observation time of an archived page: the timestamp in its file name,
+    or its modification time if the name has none. Like live ticks, it is aligned to the minute.
+
+    Args:
+        name (str): File name of the page.
+        mtime (float): Modification time of the file, in epoch seconds.
+
+    Returns:
+        datetime.datetime: The naive local observation time.
+    """
+    match = FILENAME_TIMESTAMP.search(os.path.basename(name))
+    if match:
+        try:
+            timestamp = datetime.datetime(**{key: int(value or 0) for key, value in match.groupdict().items()})
+            return aligned_tick(timestamp)
+        except ValueError:
+            logger.debug(f"No valid timestamp in the name of {name}, using its modification time")
+    return aligned_tick(datetime.datetime.fromtimestamp(mtime))
+
+
+def list_pages(directory: str) -> List[ArchivedPage]:
+    """
+    Lists the pages of a directory and its subdirectories, ordered by observation time.
+
+    Args:
+        directory (str): Path of the directory.
+
+    Returns:
+        List[ArchivedPage]: The pages, oldest first.
+    """
+    pages = []
+    for root, _, names in os.walk(directory):
+        for name in names:
+            if name.endswith(SNAPSHOT_SUFFIXES):
+                path = os.path.join(root, name)
+                pages.append(ArchivedPage(path, snapshot_timestamp(name, os.path.getmtime(path))))
+    return sorted(pages, key=lambda page: page.timestamp)
+
+
+def extract_pages(archive_path: str, directory: str) -> None:
+    """
+    Extracts the pages of a (compressed) tar archive in one pass. Modification times are kept,
+    so pages without a timestamp in their name keep their observation time.
+
+    Args:
+        archive_path (str): Path of the archive.
+        directory (str): Directory to extract the pages to.
+    """
+    with tarfile.open(archive_path) as archive:
+        for member in archive:
+            if member.isfile() and member.name.endswith(SNAPSHOT_SUFFIXES):
+                archive.extract(member, directory, filter="data")
+
+
+def parse_page(path: str, engine: ParserEngine) -> List[ParsedRow]:
+    """
+    Reads and parses an archived page in a worker process.
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        rows, _ = parse_rows(file.read(), engine)
+    return rows
+
+
+class Checkpoint:
+    """
+    Progress of a backfill: the observation time of the last page whose statuses are committed.
+    Pages up to it are skipped when the backfill is run again.
+
+    Attributes:
+        path (str): Path of the JSON checkpoint file.
+        done_until (datetime.datetime | None): Observation time of the last committed page.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done_until: datetime.datetime | None = None
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as file:
+                self.done_until = datetime.datetime.fromisoformat(json.load(file)["done_until"])
+
+    def save(self, timestamp: datetime.datetime) -> None:
+        self.done_until = timestamp
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump({"done_until": timestamp.isoformat()}, file)
+        os.replace(tmp_path, self.path)
+
+
+class Backfill:
+    """
+    Parses archived pages in worker processes and loads their observations in order, one transaction
+    per batch of consecutive pages. Status rows already stored are skipped, so a batch may be loaded twice.
+
+    Attributes:
+        pages (List[ArchivedPage]): The pages to load, oldest first.
+        checkpoint (Checkpoint): Progress, saved after every committed batch.
+        engine (str): Parser engine, "bs4" or "lxml".
+        processes (int): Number of parser processes.
+        batch_snapshots (int): Pages loaded per transaction.
+    """
+
+    def __init__(
+        self,
+        pages: List[ArchivedPage],
+        checkpoint: Checkpoint,
+        engine: ParserEngine = "lxml",
+        processes: int = 0,
+        batch_snapshots: int = BACKFILL_BATCH_SNAPSHOTS,
+        orm: StationOrmMethod | None = None,
+    ):
+        self.pages = pages
+        self.checkpoint = checkpoint
+        self.engine = engine
+        self.processes = processes or os.cpu_count() or 1
+        self.batch_snapshots = batch_snapshots
+        # Bulk mode writes a batch in a few statements and skips the statuses of a batch loaded again
+        self.orm = orm or StationOrmMethod(mode="bulk")
+
+    async def run(self) -> int:
+        """
+        Loads every page after the checkpoint. While a batch is being loaded, the next one is parsed.
+
+        Returns:
+            int: The number of pages loaded.
+
+        Raises:
+            ValueError: If the statuses are stored as deltas and the pages are not newer than the current
+                        statuses; they would be skipped without being stored.
+        """
+        pending = list(self._pending())
+        size = self.batch_snapshots
+        batches = [pending[start:start + size] for start in range(0, len(pending), size)]
+        logger.info(f"Backfilling {len(pending)} of {len(self.pages)} pages with {self.processes} processes")
+        await StationOrmMethod.warm_up()
+        if self.orm.storage == "delta" and pending:
+            self._check_delta(pending[0].timestamp)
+        pool = ParserPool(self.processes)
+        started, loaded = time.perf_counter(), 0
+        try:
+            parsing = self._parse(pool, batches[0]) if batches else None
+            for index, batch in enumerate(batches):
+                parsed = await parsing
+                if index + 1 < len(batches):
+                    parsing = self._parse(pool, batches[index + 1])
+                await self.orm.add_stations([
+                    observation
+                    for page, rows in zip(batch, parsed)
+                    for row in rows
+                    for observation in row.observations(page.timestamp)
+                ])
+                self.checkpoint.save(batch[-1].timestamp)
+                loaded += len(batch)
+                logger.info(f"Loaded {loaded} of {len(pending)} pages, up to {batch[-1].timestamp}, "
+                            f"{loaded / (time.perf_counter() - started):.1f} pages/s")
+        finally:
+            pool.shutdown()
+        return loaded
+
+    @staticmethod
+    def _check_delta(first: datetime.datetime) -> None:
+        """
+        Refuses a backfill into delta storage that reaches back before the current status of a socket.
+        Delta storage only appends status changes after the open intervals, so older pages would be
+        skipped while the checkpoint still advanced.
+        """
+        newest = max((since for _, since in status_cache.statuses.values()), default=None)
+        if newest is not None and as_utc(first) <= newest:
+            raise ValueError(f"Pages from {first} are older than the current statuses, which start up to {newest}; "
+                             f"delta storage cannot insert them. Backfill with STATUS_STORAGE=snapshot into "
+                             f"a snapshot database, or into an empty delta database before it goes live")
+
+    def _parse(self, pool: ParserPool, batch: List[ArchivedPage]) -> asyncio.Future:
+        """
+        Submits the pages of a batch to all workers; the future resolves to their rows in page order.
+        """
+        loop = asyncio.get_running_loop()
+        return asyncio.gather(*(
+            loop.run_in_executor(pool.executor, parse_page, page.path, self.engine) for page in batch
+        ))
+
+    def _pending(self) -> Iterator[ArchivedPage]:
+        """
+        Yields the pages after the checkpoint, one per observation minute.
+        """
+        previous = self.checkpoint.done_until
+        for page in self.pages:
+            if previous is not None and page.timestamp <= previous:
+                continue
+            previous = page.timestamp
+            yield page
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Loads archived station pages into the database.")
+    parser.add_argument("path", help="Directory or tar archive of .html pages")
+    parser.add_argument("--engine", choices=["bs4", "lxml"], default="lxml", help="Parser engine")
+    parser.add_argument("--processes", type=int, default=0, help="Parser processes, defaults to the CPU count")
+    parser.add_argument("--batch", type=int, default=BACKFILL_BATCH_SNAPSHOTS, help="Pages per transaction")
+    parser.add_argument("--checkpoint", help="Checkpoint file, defaults to <path>.checkpoint.json")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    path = os.path.normpath(args.path)
+    checkpoint = Checkpoint(args.checkpoint or f"{path}.checkpoint.json")
+    with tempfile.TemporaryDirectory() as directory:
+        if os.path.isdir(path):
+            directory = path
+        elif tarfile.is_tarfile(path):
+            logger.info(f"Extracting {path}")
+            extract_pages(path, directory)
+        else:
+            raise SystemExit(f"{path} is neither a directory nor a tar archive")
+        backfill = Backfill(
+            list_pages(directory),
+            checkpoint,
+            engine=args.engine,
+            processes=args.processes,
+            batch_snapshots=args.batch,
+        )
+        try:
+            asyncio.run(backfill.run())
+        except ValueError as e:
+            raise SystemExit(str(e))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import asyncio
+import datetime
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, List
+
+from . import metrics
+from .database import StationOrmMethod
+from .fingerprint import FingerprintStore
+from .parser import ParserPool
+from .pipeline import SourcePipeline
+from .sources import Source
+
+logger = logging.getLogger(__name__)
+
+PER_HOST_CONCURRENCY = int(os.getenv("PER_HOST_CONCURRENCY", 4))
+# A source still running after this many seconds is cancelled, so the tick ends before the next one starts
+SOURCE_TIMEOUT = float(os.getenv("SOURCE_TIMEOUT", 55))
+
+
+@dataclass(slots=True)
+class SourceTiming:
+    """
+    Outcome of one source in one tick. Durations are in seconds.
+    """
+    source: str
+    fetch: float = 0.0
+    store: float = 0.0
+    error: str | None = None
+
+    @property
+    def total(self) -> float:
+        return self.fetch + self.store
+
+
+class ScrapeCoordinator:
+    """
+    Scrapes every source of the registry concurrently each tick. Fetches to the same host are limited
+    by a semaphore, while parsing and storing of a page start as soon as it arrives, outside of the limit.
+    A failing or slow source only affects its own result.
+
+    Attributes:
+        pipelines (dict): Source name -> SourcePipeline, kept between ticks.
+        semaphores (dict): Host -> semaphore bounding the concurrent fetches to that host.
+        per_host (int): Number of concurrent fetches allowed per host.
+        timeout (float): Seconds a source may take per tick.
+        pool (ParserPool | None): Processes parsing the pages of all sources; threads are used without it.
+    """
+
+    def __init__(
+        self,
+        sources: List[Source],
+        per_host: int = PER_HOST_CONCURRENCY,
+        timeout: float = SOURCE_TIMEOUT,
+        fingerprints: FingerprintStore | None = None,
+        orm: StationOrmMethod | None = None,
+        pool: ParserPool | None = None,
+    ):
+        fingerprints = fingerprints or FingerprintStore()
+        orm = orm or StationOrmMethod()
+        self.sources = {source.name: source for source in sources}
+        self.pipelines = {
+            source.name: SourcePipeline(
+                source.url,
+                engine=source.engine,
+                fingerprints=fingerprints,
+                orm=orm,
+                incremental=source.incremental,
+                pool=pool,
+            )
+            for source in sources
+        }
+        self.semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.per_host = per_host
+        self.timeout = timeout
+        self.pool = pool
+
+    async def run(self, timestamp: datetime.datetime | None = None) -> List[SourceTiming]:
+        """
+        Runs one tick over all sources. All observations of the tick share one timestamp.
+
+        Args:
+            timestamp (datetime.datetime | None): Timestamp of the observations, defaults to now.
+
+        Returns:
+            List[SourceTiming]: Timing and error of every source.
+        """
+        timestamp = timestamp or datetime.datetime.now()
+        metrics.ticks.inc()
+        started = time.perf_counter()
+        timings = await asyncio.gather(*(self._run_source(name, timestamp) for name in self.pipelines))
+        metrics.tick_seconds.observe(time.perf_counter() - started)
+        failed = [timing.source for timing in timings if timing.error]
+        logger.info(
+            f"Tick {timestamp:%H:%M} done in {time.perf_counter() - started:.2f}s: "
+            f"{len(timings) - len(failed)} of {len(timings)} sources stored"
+            + (f", failed: {', '.join(failed)}" if failed else "")
+        )
+        metrics.registry.log_summary("tick")
+        return timings
+
+    async def _run_source(self, name: str, timestamp: datetime.datetime) -> SourceTiming:
+        """
+        Fetches and stores one source, catching its errors so they do not affect other sources.
+        """
+        timing = SourceTiming(name)
+        try:
+            await asyncio.wait_for(self._scrape(name, timestamp, timing), self.timeout)
+        except asyncio.TimeoutError:
+            timing.error = f"timed out after {self.timeout:.0f}s"
+        except Exception as e:
+            timing.error = repr(e)
+        if timing.error:
+            metrics.source_errors.inc(stage="tick")
+            logger.error(f"Source {name} failed: {timing.error}")
+        logger.debug(f"Source {name}: fetch {timing.fetch:.3f}s, store {timing.store:.3f}s")
+        return timing
+
+    async def _scrape(self, name: str, timestamp: datetime.datetime, timing: SourceTiming) -> None:
+        pipeline = self.pipelines[name]
+        started = time.perf_counter()
+        try:
+            async with self._semaphore(self.sources[name].host):
+                page = await pipeline.fetch()
+        finally:
+            timing.fetch = time.perf_counter() - started
+        if page is None and not pipeline.loader.not_modified:
+            timing.error = "page could not be fetched"
+            return
+
+        started = time.perf_counter()
+        try:
+            await pipeline.store(page, timestamp)
+        finally:
+            timing.store = time.perf_counter() - started
+
+    def _semaphore(self, host: str) -> asyncio.Semaphore:
+        if host not in self.semaphores:
+            self.semaphores[host] = asyncio.Semaphore(self.per_host)
+        return self.semaphores[host]
@@ -1 +1,3 @@
 from .queries import OrmMethods, StationOrmMethod
+from .reads import StatusReads
+from .rollups import OccupancyQueries
@@ -0,0 +1,310 @@
+import datetime
+import logging
+from typing import Any, Dict, Iterable, List, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import (SocketTypeOrm, StationInfoOrm, StationSocketOrm,
+                     StationStatusLatestOrm, StatusCodeOrm)
+
+logger = logging.getLogger(__name__)
+
+# (station_id, charger_port, socket_type_code)
+SocketKey = Tuple[int, int, int]
+
+STATION_ATTRIBUTES = ("city", "address", "name")
+SOCKET_ATTRIBUTES = ("power",)
+
+
+def as_utc(timestamp: datetime.datetime) -> datetime.datetime:
+    """
+    Normalizes a timestamp for comparisons the way the driver stores it in a timestamptz column:
+    aware values are converted to UTC, naive values are taken as local time, as asyncpg does.
+    """
+    return timestamp.astimezone(datetime.timezone.utc)
+
+
+class CodeCache:
+    """
+    In-process copy of a dictionary table, mapping names to their small integer codes.
+    Names not seen before are added to the table on the fly.
+
+    Attributes:
+        model: ORM model of the dictionary, with "code" and "name" columns.
+        codes (dict): name -> code.
+    """
+
+    def __init__(self, model: type[StatusCodeOrm | SocketTypeOrm]):
+        self.model = model
+        self.codes: Dict[str, int] = {}
+
+    async def warm_up(self, session: AsyncSession) -> None:
+        """
+        Loads every known name and code from the database.
+
+        Args:
+            session: The database session to use.
+        """
+        result = await session.execute(select(self.model.name, self.model.code))
+        self.codes = dict(result.all())
+
+    def clear(self) -> None:
+        self.codes.clear()
+
+    async def encode(self, session: AsyncSession, names: Iterable[str | None]) -> Dict[str, int]:
+        """
+        Makes sure every name has a code, inserting the unseen ones within the session's transaction.
+        Concurrent writers may insert the same name, so codes are read back rather than returned.
+
+        Args:
+            session: The database session to use.
+            names: Names to encode; None is left out.
+
+        Returns:
+            The mapping of every known name to its code.
+
+        Example SQL (PostgreSQL):
+            INSERT INTO status_code (name) VALUES ('Занят') ON CONFLICT (name) DO NOTHING;
+            SELECT name, code FROM status_code WHERE name IN ('Занят');
+        """
+        unseen = sorted({name for name in names if name is not None and name not in self.codes})
+        if unseen:
+            table = self.model.__table__
+            await session.execute(
+                insert(table).on_conflict_do_nothing(index_elements=["name"]), [{"name": name} for name in unseen]
+            )
+            result = await session.execute(select(table.c.name, table.c.code).where(table.c.name.in_(unseen)))
+            self.codes.update(result.all())
+            logger.info(f"New {table.name} entries: {unseen}")
+        return self.codes
+
+
+class DimensionKeyCache:
+    """
+    In-process cache of the dimension keys, owned by the database layer. Maps a station number
+    to its `station_info.id` and a `(station_id, charger_port, socket_type_code)` triple to its
+    `station_socket.id`, together with the mutable attributes last written for them, and holds the
+    codes of the status and socket type dictionaries.
+
+    Attributes:
+        stations (dict): number -> (id, (city, address, name)).
+        sockets (dict): (station_id, charger_port, socket_type_code) -> (id, (power,)).
+        status_codes (CodeCache): Status name -> code.
+        socket_types (CodeCache): Socket type name -> code.
+        hits (int): Lookups answered from the cache.
+        misses (int): Lookups of unseen keys or keys with changed attributes.
+        warm (bool): Whether the cache has been loaded from the database.
+    """
+
+    def __init__(self):
+        self.stations: Dict[int, Tuple[int, Tuple[Any, ...]]] = {}
+        self.sockets: Dict[SocketKey, Tuple[int, Tuple[Any, ...]]] = {}
+        self.status_codes = CodeCache(StatusCodeOrm)
+        self.socket_types = CodeCache(SocketTypeOrm)
+        self.hits = 0
+        self.misses = 0
+        self.warm = False
+
+    async def warm_up(self, session: AsyncSession) -> None:
+        """
+        Loads every known station and socket key from the database.
+
+        Args:
+            session: The database session to use.
+        """
+        stations = await session.execute(
+            select(StationInfoOrm.id, StationInfoOrm.number, *(getattr(StationInfoOrm, a) for a in STATION_ATTRIBUTES))
+        )
+        self.stations = {number: (id_, tuple(attrs)) for id_, number, *attrs in stations}
+
+        sockets = await session.execute(
+            select(
+                StationSocketOrm.id,
+                StationSocketOrm.station_id,
+                StationSocketOrm.charger_port,
+                StationSocketOrm.socket_type_code,
+                *(getattr(StationSocketOrm, a) for a in SOCKET_ATTRIBUTES),
+            )
+        )
+        self.sockets = {(station_id, port, socket): (id_, tuple(attrs))
+                        for id_, station_id, port, socket, *attrs in sockets}
+        await self.status_codes.warm_up(session)
+        await self.socket_types.warm_up(session)
+        self.warm = True
+        logger.info(f"Dimension cache warmed up: {len(self.stations)} stations, {len(self.sockets)} sockets")
+
+    def clear(self) -> None:
+        """
+        Forgets every cached key, so the next ingest warms the cache up again.
+        """
+        self.stations.clear()
+        self.sockets.clear()
+        self.status_codes.clear()
+        self.socket_types.clear()
+        self.warm = False
+
+    def station_id(self, info: Dict[str, Any]) -> int | None:
+        """
+        Looks up the id of a station row.
+
+        Args:
+            info: Station attributes including "number".
+
+        Returns:
+            The cached id, or None if the station is unseen or its attributes changed.
+        """
+        return self._lookup(self.stations, info["number"], tuple(info[a] for a in STATION_ATTRIBUTES))
+
+    def socket_id(self, socket: Dict[str, Any]) -> int | None:
+        """
+        Looks up the id of a socket row.
+
+        Args:
+            socket: Socket attributes including "station_id", "charger_port" and "socket_type_code".
+
+        Returns:
+            The cached id, or None if the socket is unseen or its attributes changed.
+        """
+        key = (socket["station_id"], socket["charger_port"], socket["socket_type_code"])
+        return self._lookup(self.sockets, key, tuple(socket[a] for a in SOCKET_ATTRIBUTES))
+
+    def store_stations(self, rows: Iterable[Dict[str, Any]], ids: Dict[Tuple[Any, ...], int]) -> None:
+        """
+        Remembers the ids returned by a station upsert.
+
+        Args:
+            rows: The upserted station rows.
+            ids: Mapping of (number,) to station id.
+        """
+        for row in rows:
+            self.stations[row["number"]] = (ids[(row["number"],)], tuple(row[a] for a in STATION_ATTRIBUTES))
+
+    def store_sockets(self, rows: Iterable[Dict[str, Any]], ids: Dict[Tuple[Any, ...], int]) -> None:
+        """
+        Remembers the ids returned by a socket upsert.
+
+        Args:
+            rows: The upserted socket rows.
+            ids: Mapping of (station_id, charger_port, socket_type_code) to socket id.
+        """
+        for row in rows:
+            key = (row["station_id"], row["charger_port"], row["socket_type_code"])
+            self.sockets[key] = (ids[key], tuple(row[a] for a in SOCKET_ATTRIBUTES))
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the hit/miss counters and the cache size.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stations": len(self.stations),
+            "sockets": len(self.sockets),
+        }
+
+    def _lookup(self, entries: dict, key: Any, attributes: Tuple[Any, ...]) -> int | None:
+        entry = entries.get(key)
+        if entry is not None and entry[1] == attributes:
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        return None
+
+    @staticmethod
+    def missing(rows: List[Dict[str, Any]], lookup) -> List[Dict[str, Any]]:
+        """
+        Selects the rows the cache cannot answer.
+
+        Args:
+            rows: Dimension rows to check.
+            lookup: Either `station_id` or `socket_id` of a cache instance.
+
+        Returns:
+            The rows whose key is unseen or whose attributes changed.
+        """
+        return [row for row in rows if lookup(row) is None]
+
+
+class LastStatusCache:
+    """
+    Last known status code of every socket, mirroring `station_status_latest` and, in the delta
+    storage mode, the open rows (valid_to IS NULL) of `station_status_interval`. Used to detect
+    transitions, so only changed statuses are written to them.
+
+    Attributes:
+        statuses (dict): station_socket_id -> (status_code, since).
+        warm (bool): Whether the cache has been loaded from the database.
+    """
+
+    def __init__(self):
+        self.statuses: Dict[int, Tuple[int, datetime.datetime]] = {}
+        self.warm = False
+
+    async def warm_up(self, session: AsyncSession) -> None:
+        """
+        Loads the current statuses from the database.
+
+        Args:
+            session: The database session to use.
+        """
+        latest = await session.execute(
+            select(
+                StationStatusLatestOrm.station_socket_id,
+                StationStatusLatestOrm.status_code,
+                StationStatusLatestOrm.since,
+            )
+        )
+        self.statuses = {socket_id: (status, as_utc(since)) for socket_id, status, since in latest}
+        self.warm = True
+
+    def clear(self) -> None:
+        """
+        Forgets every known status, so the next ingest warms the cache up again.
+        """
+        self.statuses.clear()
+        self.warm = False
+
+    def transitions(
+        self, rows: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Detects status changes in a batch of status rows and advances the known statuses.
+        Rows older than the interval a socket is currently in are ignored.
+
+        Args:
+            rows: Status rows with "station_socket_id", "status_code" and "timestamp".
+
+        Returns:
+            A tuple of:
+                - the status rows that start a new status,
+                - the open intervals to close, as {"b_socket_id", "b_valid_to"} parameters,
+                - the new intervals; all but the last of a socket within the batch are already closed.
+        """
+        changed, closed, intervals = [], [], []
+        opened: Dict[int, Dict[str, Any]] = {}
+        for row in sorted(rows, key=lambda r: as_utc(r["timestamp"])):
+            socket_id, status, timestamp = row["station_socket_id"], row["status_code"], as_utc(row["timestamp"])
+            known = self.statuses.get(socket_id)
+            if known is not None and (known[0] == status or known[1] >= timestamp):
+                continue
+            if socket_id in opened:
+                opened[socket_id]["valid_to"] = row["timestamp"]
+            elif known is not None:
+                closed.append({"b_socket_id": socket_id, "b_valid_to": row["timestamp"]})
+            interval = {
+                "station_socket_id": socket_id,
+                "status_code": status,
+                "valid_from": row["timestamp"],
+                "valid_to": None,
+            }
+            opened[socket_id] = interval
+            intervals.append(interval)
+            changed.append(row)
+            self.statuses[socket_id] = (status, timestamp)
+        return changed, closed, intervals
+
+
+dimension_cache = DimensionKeyCache()
+status_cache = LastStatusCache()
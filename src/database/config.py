@@ -1,4 +1,5 @@
 import os
+from typing import Literal
 
 from dotenv import load_dotenv
 from pydantic_settings import BaseSettings
@@ -13,6 +14,25 @@ class Settings(BaseSettings):
     DB_PORT: int
     POSTGRES_DB: str
 
+    # "row" upserts every socket separately, "bulk" writes a whole scrape in a fixed number of statements
+    INGEST_MODE: Literal["row", "bulk"] = "bulk"
+    # "insert" writes status rows with batched INSERTs, "copy" streams them with the binary COPY protocol
+    STATUS_WRITER: Literal["insert", "copy"] = "insert"
+    # "snapshot" stores every status of every tick, "delta" only status changes plus validity intervals
+    STATUS_STORAGE: Literal["snapshot", "delta"] = "snapshot"
+    # Whether occupancy queries may read the hourly and daily continuous aggregates of the statuses
+    ROLLUPS_ENABLED: bool = True
+    # Seconds a snapshot status sample stands for, the scrape interval
+    STATUS_SAMPLE_SECONDS: int = 60
+    # Rows fetched per round trip by the streaming reads of src/database/reads.py
+    READ_BATCH_ROWS: int = 1000
+    # Storage of the station_status hypertable, as PostgreSQL intervals: time range of a chunk, age after which
+    # chunks are compressed and age after which raw statuses are dropped ("" keeps them). Set by the migrations,
+    # changed later with `python -m src.database.maintenance apply`.
+    CHUNK_TIME_INTERVAL: str = "1 day"
+    COMPRESS_AFTER: str = "7 days"
+    RETENTION_AFTER: str = ""
+
     @property
     def db_url(self):
         """
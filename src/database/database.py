@@ -1,18 +1,32 @@
 from functools import wraps
 
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
 
+from .. import metrics
 from .config import settings
 
 engine = create_async_engine(
     url=settings.db_url,
     echo=False,
+    # Rows per multi-row INSERT in executemany mode, capped by the driver's bind parameter limit
+    insertmanyvalues_page_size=10000,
 )
 
 session_factory = async_sessionmaker(engine, expire_on_commit=False)
 
 
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _count_statement(*_) -> None:
+    metrics.db_round_trips.inc()
+
+
+@event.listens_for(engine.sync_engine, "commit")
+def _count_commit(*_) -> None:
+    metrics.db_round_trips.inc()
+
+
 async def session_manager(func):
     """
     Decorates an async function to manage an SQLAlchemy session, handling
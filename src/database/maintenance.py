@@ -0,0 +1,258 @@
+"""
+Storage maintenance of the `station_status` hypertable: chunk interval, compression and retention policies,
+and a report of its chunks and compression ratio.
+
+Usage:
+    python -m src.database.maintenance stats [--chunks]
+    python -m src.database.maintenance apply
+    python -m src.database.maintenance compress
+"""
+import argparse
+import asyncio
+import datetime
+import logging
+from typing import Dict, List, NamedTuple
+
+from sqlalchemy import Connection, text
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .database import session_factory
+
+logger = logging.getLogger(__name__)
+
+HYPERTABLE = "station_status"
+# Longest refresh window of the rollups (start offset of station_status_daily); raw chunks must outlive it
+ROLLUP_REFRESH_WINDOW = "4 days"
+# Bounds of the recommended chunk interval
+MIN_CHUNK_INTERVAL = datetime.timedelta(hours=1)
+MAX_CHUNK_INTERVAL = datetime.timedelta(days=7)
+
+
+class ChunkStats(NamedTuple):
+    """
+    Size of a chunk of the hypertable. `before_bytes` and `after_bytes` are set for compressed chunks only.
+    """
+    name: str
+    range_start: datetime.datetime
+    range_end: datetime.datetime
+    is_compressed: bool
+    total_bytes: int
+    before_bytes: int | None
+    after_bytes: int | None
+
+    @property
+    def size(self) -> int:
+        """
+        Bytes the chunk takes on disk.
+        """
+        return self.after_bytes if self.is_compressed and self.after_bytes is not None else self.total_bytes
+
+    @property
+    def uncompressed_size(self) -> int:
+        """
+        Bytes the chunk takes, or took before it was compressed.
+        """
+        return self.before_bytes if self.is_compressed and self.before_bytes is not None else self.total_bytes
+
+
+def check_retention(connection: Connection | Session, retention_after: str) -> None:
+    """
+    Checks that raw chunks outlive the refresh window of the rollups; a refresh over dropped chunks
+    would delete the materialized history. Shared by `apply_policies` and the migrations.
+
+    Raises:
+        ValueError: If the retention would drop chunks the rollups still refresh from.
+    """
+    safe = connection.scalar(
+        text("SELECT CAST(CAST(:after AS text) AS interval) > CAST(CAST(:window AS text) AS interval)"),
+        {"after": retention_after, "window": ROLLUP_REFRESH_WINDOW},
+    )
+    if not safe:
+        raise ValueError(f"Retention of {retention_after} must exceed the rollup refresh window "
+                         f"of {ROLLUP_REFRESH_WINDOW}")
+
+
+async def apply_policies(
+    chunk_interval: str = settings.CHUNK_TIME_INTERVAL,
+    compress_after: str = settings.COMPRESS_AFTER,
+    retention_after: str = settings.RETENTION_AFTER,
+) -> None:
+    """
+    Sets the chunk interval of new chunks and replaces the compression and retention policies of the hypertable.
+    Compression is enabled if it is not yet.
+
+    Args:
+        chunk_interval (str): Time range of a chunk, e.g. "1 day".
+        compress_after (str): Age after which chunks are compressed.
+        retention_after (str): Age after which chunks are dropped, "" to keep them.
+
+    Raises:
+        ValueError: If the retention would drop chunks the rollups still refresh from.
+    """
+    async with session_factory() as session:
+        if retention_after:
+            await session.run_sync(check_retention, retention_after)
+        await session.execute(
+            text("SELECT set_chunk_time_interval(:table, CAST(CAST(:chunk AS text) AS interval))"),
+            {"table": HYPERTABLE, "chunk": chunk_interval},
+        )
+        enabled = await session.scalar(
+            text("SELECT compression_enabled FROM timescaledb_information.hypertables WHERE hypertable_name = :table"),
+            {"table": HYPERTABLE},
+        )
+        if not enabled:
+            await session.execute(text(
+                f"ALTER TABLE {HYPERTABLE} SET (timescaledb.compress, "
+                "timescaledb.compress_segmentby = 'station_socket_id', timescaledb.compress_orderby = 'timestamp DESC')"
+            ))
+        await session.execute(
+            text("SELECT remove_compression_policy(:table, if_exists => true)"), {"table": HYPERTABLE}
+        )
+        await session.execute(
+            text("SELECT add_compression_policy(:table, compress_after => CAST(CAST(:after AS text) AS interval))"),
+            {"table": HYPERTABLE, "after": compress_after},
+        )
+        await session.execute(
+            text("SELECT remove_retention_policy(:table, if_exists => true)"), {"table": HYPERTABLE}
+        )
+        if retention_after:
+            await session.execute(
+                text("SELECT add_retention_policy(:table, drop_after => CAST(CAST(:after AS text) AS interval))"),
+                {"table": HYPERTABLE, "after": retention_after},
+            )
+        await session.commit()
+    logger.info(f"Chunks of {chunk_interval}, compressed after {compress_after}, "
+                f"{f'dropped after {retention_after}' if retention_after else 'kept'}")
+
+
+async def compress_chunks(compress_after: str = settings.COMPRESS_AFTER) -> int:
+    """
+    Compresses the chunks older than `compress_after` now instead of waiting for the policy.
+
+    Returns:
+        int: The number of chunks compressed.
+    """
+    async with session_factory() as session:
+        result = await session.execute(
+            text("SELECT compress_chunk(format('%I.%I', chunk_schema, chunk_name)::regclass) "
+                 "FROM timescaledb_information.chunks WHERE hypertable_name = :table AND NOT is_compressed "
+                 "AND range_end < now() - CAST(CAST(:after AS text) AS interval)"),
+            {"table": HYPERTABLE, "after": compress_after},
+        )
+        compressed = result.all()
+        await session.commit()
+        return len(compressed)
+
+
+async def chunk_stats() -> List[ChunkStats]:
+    """
+    Returns the chunks of the hypertable, oldest first.
+
+    Example SQL (TimescaleDB):
+        SELECT * FROM hypertable_compression_stats('station_status');
+    """
+    stmt = text(
+        """
+        SELECT c.chunk_name, c.range_start, c.range_end, c.is_compressed,
+               pg_total_relation_size(format('%I.%I', c.chunk_schema, c.chunk_name)::regclass),
+               s.before_compression_total_bytes, s.after_compression_total_bytes
+        FROM timescaledb_information.chunks AS c
+        LEFT JOIN chunk_compression_stats(:table) AS s
+            ON s.chunk_schema = c.chunk_schema AND s.chunk_name = c.chunk_name
+        WHERE c.hypertable_name = :table
+        ORDER BY c.range_start
+        """
+    )
+    async with session_factory() as session:
+        result = await session.execute(stmt, {"table": HYPERTABLE})
+        return [ChunkStats(*row) for row in result.all()]
+
+
+async def shared_buffers() -> int:
+    """
+    Returns the shared buffer size of the database server in bytes.
+    """
+    async with session_factory() as session:
+        return await session.scalar(text("SELECT pg_size_bytes(current_setting('shared_buffers'))"))
+
+
+def recommend_chunk_interval(chunks: List[ChunkStats], memory_bytes: int) -> datetime.timedelta | None:
+    """
+    Recommends a chunk interval from the ingest rate of the past chunks: the most recent chunk, the one being
+    written, should fit into `memory_bytes`, usually the shared buffers, together with its indexes.
+
+    Args:
+        chunks (List[ChunkStats]): The chunks, oldest first; the newest may still be filling and is left out.
+        memory_bytes (int): Memory the uncompressed chunk should fit into.
+
+    Returns:
+        datetime.timedelta | None: The interval in whole hours, None without a complete chunk.
+    """
+    complete = chunks[:-1]
+    days = sum((chunk.range_end - chunk.range_start).total_seconds() for chunk in complete) / 86400
+    if not days:
+        return None
+    bytes_per_day = sum(chunk.uncompressed_size for chunk in complete) / days
+    interval = datetime.timedelta(days=memory_bytes / bytes_per_day) if bytes_per_day else MAX_CHUNK_INTERVAL
+    interval = min(max(interval, MIN_CHUNK_INTERVAL), MAX_CHUNK_INTERVAL)
+    return interval - interval % datetime.timedelta(hours=1)
+
+
+def summarize_chunks(chunks: List[ChunkStats]) -> Dict[str, float]:
+    """
+    Returns the totals of the chunks: their number, the bytes on disk and the compression ratio of the compressed ones.
+    """
+    compressed = [chunk for chunk in chunks if chunk.is_compressed and chunk.after_bytes]
+    before = sum(chunk.before_bytes or 0 for chunk in compressed)
+    after = sum(chunk.after_bytes for chunk in compressed)
+    return {
+        "chunks": len(chunks),
+        "compressed_chunks": len(compressed),
+        "total_bytes": sum(chunk.size for chunk in chunks),
+        "before_compression_bytes": before,
+        "after_compression_bytes": after,
+        "compression_ratio": round(before / after, 2) if after else 0.0,
+    }
+
+
+def _megabytes(size: int | None) -> str:
+    return "-" if size is None else f"{size / 2 ** 20:.1f} MB"
+
+
+async def report(show_chunks: bool = False) -> None:
+    """
+    Prints the chunk statistics, the compression ratio and the recommended chunk interval.
+    """
+    chunks = await chunk_stats()
+    if show_chunks:
+        for chunk in chunks:
+            print(f"{chunk.name}\t{chunk.range_start:%Y-%m-%d %H:%M} - {chunk.range_end:%Y-%m-%d %H:%M}\t"
+                  f"{'compressed' if chunk.is_compressed else 'uncompressed'}\t{_megabytes(chunk.size)}\t"
+                  f"{_megabytes(chunk.before_bytes)} -> {_megabytes(chunk.after_bytes)}")
+    for name, value in summarize_chunks(chunks).items():
+        print(f"{name}: {_megabytes(value) if name.endswith('_bytes') else value}")
+    recommended = recommend_chunk_interval(chunks, await shared_buffers())
+    print(f"chunk_time_interval: {settings.CHUNK_TIME_INTERVAL}, recommended: {recommended or 'unknown'}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Maintains the storage of the station_status hypertable.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    stats = commands.add_parser("stats", help="Report chunk statistics and the compression ratio")
+    stats.add_argument("--chunks", action="store_true", help="List every chunk")
+    commands.add_parser("apply", help="Apply CHUNK_TIME_INTERVAL, COMPRESS_AFTER and RETENTION_AFTER")
+    commands.add_parser("compress", help="Compress the chunks older than COMPRESS_AFTER now")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "stats":
+        asyncio.run(report(args.chunks))
+    elif args.command == "apply":
+        asyncio.run(apply_policies())
+    else:
+        logger.info(f"Compressed {asyncio.run(compress_chunks())} chunks")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 import datetime
 from typing import Annotated
 
-from sqlalchemy import DateTime, ForeignKey, text
+from sqlalchemy import DateTime, ForeignKey, SmallInteger, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.schema import Index, PrimaryKeyConstraint, UniqueConstraint
 
@@ -9,6 +9,22 @@ from .database import Base
 
 intpk = Annotated[int, mapped_column(primary_key=True)]
 created_at = Annotated[datetime.datetime, mapped_column(server_default=text("TIMEZONE('utc', now())"))]
+codepk = Annotated[int, mapped_column(SmallInteger, primary_key=True)]
+
+
+# Dictionaries of the socket statuses and types; status and socket rows store their small integer codes
+class StatusCodeOrm(Base):
+    __tablename__ = "status_code"
+
+    code: Mapped[codepk]
+    name: Mapped[str] = mapped_column(unique=True)
+
+
+class SocketTypeOrm(Base):
+    __tablename__ = "socket_type"
+
+    code: Mapped[codepk]
+    name: Mapped[str] = mapped_column(unique=True)
 
 
 class StationInfoOrm(Base):
@@ -27,18 +43,22 @@ class StationInfoOrm(Base):
 class StationSocketOrm(Base):
     __tablename__ = "station_socket"
     __table_args__ = (
-        UniqueConstraint("station_id", "charger_port", "socket", name="station_id_charger_port_socket_unique"),
+        UniqueConstraint(
+            "station_id", "charger_port", "socket_type_code", name="station_id_charger_port_socket_type_unique"
+        ),
     )
 
     id: Mapped[intpk]
     station_id: Mapped[int] = mapped_column(ForeignKey("station_info.id", ondelete="CASCADE"))
     charger_port: Mapped[int]
-    socket: Mapped[str]
+    socket_type_code: Mapped[int] = mapped_column(SmallInteger, ForeignKey("socket_type.code"))
     power: Mapped[int]
     created_at: Mapped[created_at]
 
     station_info: Mapped["StationInfoOrm"] = relationship(back_populates="station_socket")
     station_status: Mapped[list["StationStatusOrm"]] = relationship(back_populates="station_socket")
+    station_status_interval: Mapped[list["StationStatusIntervalOrm"]] = relationship(back_populates="station_socket")
+    station_status_latest: Mapped["StationStatusLatestOrm"] = relationship(back_populates="station_socket")
 
 
 class StationStatusOrm(Base):
@@ -49,7 +69,41 @@ class StationStatusOrm(Base):
     )
 
     station_socket_id: Mapped[int] = mapped_column(ForeignKey("station_socket.id", ondelete="CASCADE"))
-    status: Mapped[str]
+    status_code: Mapped[int] = mapped_column(SmallInteger, ForeignKey("status_code.code"))
     timestamp: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True))
 
     station_socket: Mapped["StationSocketOrm"] = relationship(back_populates="station_status")
+
+
+class StationStatusIntervalOrm(Base):
+    __tablename__ = "station_status_interval"
+    __table_args__ = (
+        PrimaryKeyConstraint("station_socket_id", "valid_from"),
+        Index("station_status_interval_valid_from_idx", "valid_from"),
+        Index(
+            "station_status_interval_open_idx",
+            "station_socket_id",
+            unique=True,
+            postgresql_where=text("valid_to IS NULL"),
+        ),
+    )
+
+    station_socket_id: Mapped[int] = mapped_column(ForeignKey("station_socket.id", ondelete="CASCADE"))
+    status_code: Mapped[int] = mapped_column(SmallInteger, ForeignKey("status_code.code"))
+    valid_from: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True))
+    valid_to: Mapped[datetime.datetime | None] = mapped_column(DateTime(timezone=True))
+
+    station_socket: Mapped["StationSocketOrm"] = relationship(back_populates="station_status_interval")
+
+
+# Current status of every socket and the time it was entered, written only when the status changes
+class StationStatusLatestOrm(Base):
+    __tablename__ = "station_status_latest"
+
+    station_socket_id: Mapped[int] = mapped_column(
+        ForeignKey("station_socket.id", ondelete="CASCADE"), primary_key=True, autoincrement=False
+    )
+    status_code: Mapped[int] = mapped_column(SmallInteger, ForeignKey("status_code.code"))
+    since: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True))
+
+    station_socket: Mapped["StationSocketOrm"] = relationship(back_populates="station_status_latest")
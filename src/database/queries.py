@@ -1,14 +1,31 @@
-from typing import Any, Dict, List, Literal, Tuple, Type, TypeAlias
+import asyncio
+import datetime
+import logging
+from typing import (Any, Dict, List, Literal, Sequence, Set, Tuple, Type,
+                    TypeAlias)
 
-from sqlalchemy import select
+from sqlalchemy import bindparam, literal, or_, select, update
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.sql.elements import BinaryExpression
 
+from .. import metrics
+from ..parser.records import SocketObservation
+from .cache import SocketKey, as_utc, dimension_cache, status_cache
+from .config import settings
 from .database import Base, engine, session_factory
-from .models import StationInfoOrm, StationSocketOrm, StationStatusOrm
+from .models import (SocketTypeOrm, StationInfoOrm, StationSocketOrm,
+                     StationStatusIntervalOrm, StationStatusLatestOrm,
+                     StationStatusOrm, StatusCodeOrm)
+from .writers import StatusWriterType, make_status_writer
+
+logger = logging.getLogger(__name__)
 
 StationOrmType: TypeAlias = Type[StationInfoOrm | StationSocketOrm | StationStatusOrm]
+IngestMode: TypeAlias = Literal["row", "bulk"]
+StatusStorage: TypeAlias = Literal["snapshot", "delta"]
+
+STATION_UNIQUE = ["number"]
+SOCKET_UNIQUE = ["station_id", "charger_port", "socket_type_code"]
 
 
 class OrmMethods:
@@ -58,47 +75,438 @@ class OrmMethods:
 
 
 class StationOrmMethod:
+    # The dimension and status caches are shared by all instances, so bulk ingests of concurrently
+    # scraped sources run one at a time; each of them takes only a few round trips.
+    _ingest_lock = asyncio.Lock()
+
+    def __init__(
+        self,
+        mode: IngestMode | None = None,
+        status_writer: StatusWriterType | None = None,
+        storage: StatusStorage | None = None,
+    ):
+        """
+        Initializes the StationOrmMethod with an ingest mode.
 
-    async def add_stations(self, station_list: List[Dict[str, Dict[str, Any]]]) -> None:
+        Args:
+            mode: "row" writes every socket with its own upsert and lookups, "bulk" writes the whole
+                  scrape with a constant number of set-based statements. Defaults to INGEST_MODE setting.
+            status_writer: Backend of the bulk mode for status rows, "insert" or "copy".
+                           Defaults to STATUS_WRITER setting.
+            storage: "snapshot" stores every status of every tick, "delta" (bulk mode only) stores
+                     a status only when it changes and maintains `station_status_interval`.
+                     Defaults to STATUS_STORAGE setting.
+        """
+        self.mode = mode or settings.INGEST_MODE
+        self.status_writer = make_status_writer(status_writer or settings.STATUS_WRITER)
+        self.storage = storage or settings.STATUS_STORAGE
+
+    async def add_stations(
+        self, station_list: Sequence[SocketObservation], changed_stations: Set[int] | None = None
+    ) -> List[int]:
         """
         Adds or updates station entries in the database. Utilizes upsert operations to ensure that
         station data is inserted or updated based on unique constraints.
 
         Args:
-            station_list: A list of dictionaries describing the station data.
+            station_list: The socket observations of a scrape.
+            changed_stations: Numbers of the stations whose rows changed since the previous scrape,
+                              as reported by an incremental parse; lets the bulk mode skip the
+                              dimension work for the other stations. None treats all as changed.
+
+        Returns:
+            The ids of the sockets in the scrape.
+        """
+        metrics.ingest_observations.inc(len(station_list))
+        with metrics.ingest_seconds.time(mode=self.mode):
+            if self.mode == "bulk":
+                return await self.add_stations_bulk(station_list, changed_stations)
+            return await self._add_stations_rows(station_list)
+
+    async def _add_stations_rows(self, station_list: Sequence[SocketObservation]) -> List[int]:
+        """
+        Writes a scrape socket by socket, each with its own upserts and id lookups.
         """
+        status_rows = []
         async with session_factory() as session:
-            for station in station_list:
-                await self._upsert_data(session, StationInfoOrm, station["info"], ["number"])
-
-                station["socket"]["station_id"] = await self._fetch_id(
-                    session,
-                    StationInfoOrm,
-                    StationInfoOrm.number == station["info"]["number"],
-                )
-                await self._upsert_data(session, StationSocketOrm, station["socket"],
-                                        ["station_id", "charger_port", "socket"])
-
-                station["status"]["station_socket_id"] = await self._fetch_id(
-                    session,
-                    StationSocketOrm,
-                    StationSocketOrm.station_id == station["socket"]["station_id"],
-                    StationSocketOrm.charger_port == station["socket"]["charger_port"],
-                    StationSocketOrm.socket == station["socket"]["socket"],
-                )
-                await self._insert_data(session, StationStatusOrm, station["status"])
+            try:
+                status_codes = await dimension_cache.status_codes.encode(session, (s.status for s in station_list))
+                socket_types = await dimension_cache.socket_types.encode(session, (s.socket for s in station_list))
+                for station in station_list:
+                    info = station.station.info_row()
+                    await self._upsert_data(session, StationInfoOrm, info, STATION_UNIQUE)
+
+                    socket = self._socket_row(station, socket_types)
+                    socket["station_id"] = await self._fetch_id(
+                        session,
+                        StationInfoOrm,
+                        StationInfoOrm.number == info["number"],
+                    )
+                    await self._upsert_data(session, StationSocketOrm, socket, SOCKET_UNIQUE)
+
+                    status = {"status_code": status_codes.get(station.status), "timestamp": station.timestamp}
+                    status["station_socket_id"] = await self._fetch_id(
+                        session,
+                        StationSocketOrm,
+                        StationSocketOrm.station_id == socket["station_id"],
+                        StationSocketOrm.charger_port == socket["charger_port"],
+                        StationSocketOrm.socket_type_code == socket["socket_type_code"],
+                    )
+                    await self._insert_data(session, StationStatusOrm, status)
+                    status_rows.append(status)
+                await self._write_latest(session, status_rows, compare_status=True)
+                await self._commit(session)
+                # The statuses were written without the status cache, which may now be behind
+                status_cache.clear()
+            except Exception:
+                # Codes added during a rolled back transaction do not exist
+                dimension_cache.clear()
+                raise
+            metrics.ingest_status_rows.inc(len(station_list))
+        return list(dict.fromkeys(row["station_socket_id"] for row in status_rows))
+
+    async def add_stations_bulk(
+        self, station_list: Sequence[SocketObservation], changed_stations: Set[int] | None = None
+    ) -> List[int]:
+        """
+        Writes a whole scrape with set-based statements: one multi-row upsert for the stations,
+        one for the sockets (both returning their ids) and one batched insert for the statuses.
+        The number of round trips does not depend on the number of stations on the page.
+
+        Station and socket ids are resolved through the in-process dimension cache, so only unseen
+        keys or keys with changed attributes are upserted and a steady-state tick writes statuses only.
+
+        Args:
+            station_list: The socket observations of a scrape.
+            changed_stations: Numbers of the stations that may have changed, None for all.
+
+        Returns:
+            The ids of the sockets in the scrape.
+        """
+        if not station_list:
+            return []
+        async with self._ingest_lock, session_factory() as session:
+            try:
+                if not dimension_cache.warm:
+                    await dimension_cache.warm_up(session)
+                station_ids = await self._station_ids(session, station_list, changed_stations)
+                socket_ids = await self._socket_ids(session, station_list, station_ids, changed_stations)
+                socket_types = dimension_cache.socket_types.codes
+                status_codes = await dimension_cache.status_codes.encode(session, (s.status for s in station_list))
+                status_rows = [
+                    {
+                        "station_socket_id": socket_ids[
+                            (station_ids[station.station.number], station.charger_port, socket_types[station.socket])
+                        ],
+                        "status_code": status_codes.get(station.status),
+                        "timestamp": station.timestamp,
+                    }
+                    for station in station_list
+                ]
+                changed = await self._write_transitions(session, status_rows)
+                if self.storage == "delta":
+                    status_rows = changed
+                await self.status_writer.write(session, status_rows)
+                await self._commit(session)
+                metrics.ingest_status_rows.inc(len(status_rows))
+            except Exception:
+                # Ids and statuses cached during a rolled back transaction may not exist
+                dimension_cache.clear()
+                status_cache.clear()
+                raise
+        logger.debug(f"Dimension cache: {dimension_cache.stats()}")
+        return list(socket_ids.values())
+
+    async def add_heartbeat(
+        self, socket_ids: List[int], previous: datetime.datetime, timestamp: datetime.datetime
+    ) -> int:
+        """
+        Records that the statuses of the given sockets did not change since the previous tick by copying
+        their status rows from `previous` to `timestamp` on the server, without any dimension work.
+        In delta mode nothing needs to be written.
+
+        Args:
+            socket_ids: Ids of the sockets of the unchanged page.
+            previous: Timestamp of the last stored statuses of these sockets.
+            timestamp: Timestamp of the current tick.
+
+        Returns:
+            The number of status rows written, 0 if there was nothing to copy.
+
+        Example SQL (PostgreSQL):
+            INSERT INTO station_status (station_socket_id, status_code, timestamp)
+            SELECT station_socket_id, status_code, $1 FROM station_status
+            WHERE timestamp = $2 AND station_socket_id = ANY($3) ON CONFLICT DO NOTHING;
+        """
+        if self.storage == "delta":
+            return len(socket_ids)
+        status = StationStatusOrm.__table__
+        copy = select(
+            status.c.station_socket_id, status.c.status_code, literal(timestamp, status.c.timestamp.type)
+        ).where(
+            status.c.timestamp == previous,
+            status.c.station_socket_id.in_(socket_ids),
+        )
+        stmt = (
+            insert(status)
+            .from_select(["station_socket_id", "status_code", "timestamp"], copy)
+            .on_conflict_do_nothing()
+        )
+        async with session_factory() as session:
+            result = await session.execute(stmt)
+            await self._commit(session)
+        metrics.ingest_status_rows.inc(result.rowcount)
+        return result.rowcount
+
+    @staticmethod
+    async def _commit(session: AsyncSession) -> None:
+        with metrics.db_commit_seconds.time():
             await session.commit()
 
+    async def _write_transitions(
+        self, session: AsyncSession, status_rows: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Detects the sockets whose status changed and upserts their new status into `station_status_latest`.
+        In delta mode, also keeps `station_status_interval` up to date: closes the open interval of every
+        socket whose status changed and opens a new one.
+
+        Args:
+            session: The database session to use.
+            status_rows: Status rows of the batch.
+
+        Returns:
+            The status rows that start a new status, the only ones stored in delta mode.
+
+        Example SQL (PostgreSQL):
+            UPDATE station_status_interval SET valid_to = $1 WHERE station_socket_id = $2 AND valid_to IS NULL;
+            INSERT INTO station_status_interval (station_socket_id, status_code, valid_from, valid_to) VALUES (...);
+        """
+        if not status_cache.warm:
+            await status_cache.warm_up(session)
+        changed, closed, intervals = status_cache.transitions(status_rows)
+        await self._write_latest(session, changed)
+        if self.storage != "delta":
+            return changed
+        table = StationStatusIntervalOrm.__table__
+        if closed:
+            stmt = (
+                update(table)
+                .where(table.c.station_socket_id == bindparam("b_socket_id"), table.c.valid_to.is_(None))
+                .values(valid_to=bindparam("b_valid_to"))
+            )
+            await session.execute(stmt, closed)
+        if intervals:
+            await session.execute(insert(table).on_conflict_do_nothing(), intervals)
+        return changed
+
+    @staticmethod
+    async def _write_latest(
+        session: AsyncSession, status_rows: List[Dict[str, Any]], compare_status: bool = False
+    ) -> None:
+        """
+        Upserts the newest of the given statuses of every socket into `station_status_latest`. A stored status
+        is only replaced by one observed after it was entered, so statuses replayed from before that or written
+        concurrently out of order cannot move it back.
+
+        Args:
+            session: The database session to use.
+            status_rows: Status rows that start a new status, or any status rows with `compare_status`.
+            compare_status: Whether to skip statuses equal to the stored one on the server, for rows
+                            not filtered by the status cache.
+
+        Example SQL (PostgreSQL):
+            INSERT INTO station_status_latest (station_socket_id, status_code, since) VALUES ($1, $2, $3), ...
+            ON CONFLICT (station_socket_id) DO UPDATE SET status_code = excluded.status_code, since = excluded.since
+            WHERE station_status_latest.since < excluded.since;
+        """
+        newest: Dict[int, Dict[str, Any]] = {}
+        for row in status_rows:
+            known = newest.get(row["station_socket_id"])
+            if known is None or as_utc(known["timestamp"]) < as_utc(row["timestamp"]):
+                newest[row["station_socket_id"]] = row
+        if not newest:
+            return
+        table = StationStatusLatestOrm.__table__
+        stmt = insert(table)
+        condition = table.c.since < stmt.excluded.since
+        if compare_status:
+            condition &= table.c.status_code != stmt.excluded.status_code
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["station_socket_id"],
+            set_={"status_code": stmt.excluded.status_code, "since": stmt.excluded.since},
+            where=condition,
+        )
+        await session.execute(stmt, [
+            {"station_socket_id": socket_id, "status_code": row["status_code"], "since": row["timestamp"]}
+            for socket_id, row in newest.items()
+        ])
+
+    async def status_at(self, timestamp: datetime.datetime) -> Dict[int, str]:
+        """
+        Returns the status every socket had at the given time, regardless of the storage mode.
+
+        Args:
+            timestamp: The point in time.
+
+        Returns:
+            A mapping of station_socket_id to status.
+
+        Example SQL (PostgreSQL):
+            SELECT DISTINCT ON (s.station_socket_id) s.station_socket_id, c.name FROM station_status AS s
+            JOIN status_code AS c ON c.code = s.status_code
+            WHERE s.timestamp <= $1 ORDER BY s.station_socket_id, s.timestamp DESC;
+        """
+        if self.storage == "delta":
+            interval = StationStatusIntervalOrm
+            stmt = select(interval.station_socket_id, StatusCodeOrm.name).join(
+                StatusCodeOrm, StatusCodeOrm.code == interval.status_code
+            ).where(
+                interval.valid_from <= timestamp,
+                or_(interval.valid_to.is_(None), interval.valid_to > timestamp),
+            )
+        else:
+            stmt = (
+                select(StationStatusOrm.station_socket_id, StatusCodeOrm.name)
+                .join(StatusCodeOrm, StatusCodeOrm.code == StationStatusOrm.status_code)
+                .where(StationStatusOrm.timestamp <= timestamp)
+                .distinct(StationStatusOrm.station_socket_id)
+                .order_by(StationStatusOrm.station_socket_id, StationStatusOrm.timestamp.desc())
+            )
+        async with session_factory() as session:
+            result = await session.execute(stmt)
+            return dict(result.all())
+
     @staticmethod
-    def _conditions(
-        station: Dict[str, Dict[str, Any]], info_type: Literal["info", "socket"]
-    ) -> Tuple[BinaryExpression, ...]:
-        if info_type == "info":
-            return StationInfoOrm.number == station["info"]["number"]
-        return (
-            StationSocketOrm.station_id == station["socket"]["station_id"],
-            StationSocketOrm.socket == station["socket"]["socket"],
+    async def current_board(changed_since: datetime.datetime | None = None) -> List[Dict[str, Any]]:
+        """
+        Returns the current status of every socket with its station, read from `station_status_latest`
+        and the dimension tables only, never from the status history.
+
+        Args:
+            changed_since: Only return the sockets whose status changed after this time, for pollers that
+                           already hold the board. None returns every socket.
+
+        Returns:
+            One dict per socket with "station_socket_id", "number", "city", "address", "name",
+            "charger_port", "socket", "power", "status" and "since", the time the status was entered.
+
+        Example SQL (PostgreSQL):
+            SELECT l.station_socket_id, i.number, ..., t.name AS socket, c.name AS status, l.since
+            FROM station_status_latest AS l JOIN station_socket AS s ON s.id = l.station_socket_id
+            JOIN station_info AS i ON i.id = s.station_id JOIN socket_type AS t ON t.code = s.socket_type_code
+            JOIN status_code AS c ON c.code = l.status_code WHERE l.since > $1;
+        """
+        latest = StationStatusLatestOrm
+        stmt = (
+            select(
+                latest.station_socket_id,
+                StationInfoOrm.number,
+                StationInfoOrm.city,
+                StationInfoOrm.address,
+                StationInfoOrm.name,
+                StationSocketOrm.charger_port,
+                SocketTypeOrm.name.label("socket"),
+                StationSocketOrm.power,
+                StatusCodeOrm.name.label("status"),
+                latest.since,
+            )
+            .join(StationSocketOrm, StationSocketOrm.id == latest.station_socket_id)
+            .join(StationInfoOrm, StationInfoOrm.id == StationSocketOrm.station_id)
+            .join(SocketTypeOrm, SocketTypeOrm.code == StationSocketOrm.socket_type_code)
+            .join(StatusCodeOrm, StatusCodeOrm.code == latest.status_code)
+            .order_by(StationInfoOrm.number, StationSocketOrm.charger_port)
         )
+        if changed_since is not None:
+            stmt = stmt.where(latest.since > changed_since)
+        async with session_factory() as session:
+            result = await session.execute(stmt)
+            return [dict(row) for row in result.mappings()]
+
+    @staticmethod
+    async def warm_up() -> None:
+        """
+        Loads the dimension keys and the current statuses into the in-process caches, typically once at startup.
+        """
+        async with session_factory() as session:
+            await dimension_cache.warm_up(session)
+            await status_cache.warm_up(session)
+
+    async def _station_ids(
+        self,
+        session: AsyncSession,
+        station_list: Sequence[SocketObservation],
+        changed_stations: Set[int] | None = None,
+    ) -> Dict[int, int]:
+        """
+        Resolves station ids, upserting only the stations the dimension cache cannot answer.
+
+        Args:
+            session: The database session to use.
+            station_list: The socket observations of a scrape.
+            changed_stations: Numbers of the stations that may have changed; cached stations
+                              outside of it are not compared at all. None compares every station.
+
+        Returns:
+            A mapping of station number to station id.
+        """
+        headers = {station.station.number: station.station for station in station_list}
+        rows = [
+            header.info_row()
+            for number, header in headers.items()
+            if changed_stations is None or number in changed_stations or number not in dimension_cache.stations
+        ]
+        stale = dimension_cache.missing(rows, dimension_cache.station_id)
+        if stale:
+            ids = await self._upsert_many(session, StationInfoOrm, stale, STATION_UNIQUE)
+            dimension_cache.store_stations(stale, ids)
+        return {number: dimension_cache.stations[number][0] for number in headers}
+
+    async def _socket_ids(
+        self,
+        session: AsyncSession,
+        station_list: Sequence[SocketObservation],
+        station_ids: Dict[int, int],
+        changed_stations: Set[int] | None = None,
+    ) -> Dict[SocketKey, int]:
+        """
+        Resolves socket ids, upserting only the sockets the dimension cache cannot answer.
+
+        Args:
+            session: The database session to use.
+            station_list: The socket observations of a scrape.
+            station_ids: A mapping of station number to station id.
+            changed_stations: Numbers of the stations that may have changed; cached sockets of other
+                              stations are not compared at all. None compares every socket.
+
+        Returns:
+            A mapping of (station_id, charger_port, socket_type_code) to socket id.
+        """
+        socket_types = await dimension_cache.socket_types.encode(session, (s.socket for s in station_list))
+        sockets = {
+            (station_ids[station.station.number], station.charger_port, socket_types[station.socket]): station
+            for station in station_list
+        }
+        rows = [
+            {**self._socket_row(station, socket_types), "station_id": key[0]}
+            for key, station in sockets.items()
+            if changed_stations is None or station.station.number in changed_stations
+            or key not in dimension_cache.sockets
+        ]
+        stale = dimension_cache.missing(rows, dimension_cache.socket_id)
+        if stale:
+            ids = await self._upsert_many(session, StationSocketOrm, stale, SOCKET_UNIQUE)
+            dimension_cache.store_sockets(stale, ids)
+        return {key: dimension_cache.sockets[key][0] for key in sockets}
+
+    @staticmethod
+    def _socket_row(station: SocketObservation, socket_types: Dict[str, int]) -> Dict[str, Any]:
+        """
+        Returns the `station_socket` columns of an observation with its socket type encoded, without the station id.
+        """
+        row = station.socket_row()
+        row["socket_type_code"] = socket_types[row.pop("socket")]
+        return row
 
     @staticmethod
     async def _upsert_data(session: AsyncSession, model: StationOrmType, data: dict, unique: list[str]) -> None:
@@ -124,6 +532,39 @@ class StationOrmMethod:
         )
         await session.execute(stmt)
 
+    @staticmethod
+    async def _upsert_many(
+        session: AsyncSession, model: StationOrmType, rows: List[Dict[str, Any]], unique: List[str]
+    ) -> Dict[Tuple[Any, ...], int]:
+        """
+        Upserts many rows with multi-row INSERT ... ON CONFLICT DO UPDATE statements and collects
+        the ids of all affected rows via RETURNING, so no follow-up SELECT is needed.
+
+        Args:
+            session: The database session to use.
+            model: The ORM model class.
+            rows: Rows with identical keys, deduplicated on the unique attributes.
+            unique: List of attributes that define uniqueness for the upsert operation.
+
+        Returns:
+            A mapping of unique attribute values (as a tuple) to the row ID.
+
+        Example SQL (PostgreSQL):
+            INSERT INTO station_info (number, city) VALUES (1, 'a'), (2, 'b')
+            ON CONFLICT (number) DO UPDATE SET city = EXCLUDED.city
+            RETURNING station_info.id, station_info.number;
+        """
+        if not rows:
+            return {}
+        table = model.__table__
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=unique,
+            set_={k: stmt.excluded[k] for k in rows[0] if k not in unique},
+        ).returning(table.c.id, *(table.c[k] for k in unique))
+        result = await session.execute(stmt, rows)
+        return {tuple(row[1:]): row[0] for row in result}
+
     @staticmethod
     async def _fetch_id(session: AsyncSession, model: StationOrmType, *conditions: bool) -> int:
         """
@@ -143,8 +584,8 @@ class StationOrmMethod:
     @staticmethod
     async def _insert_data(session: AsyncSession, model: StationOrmType, data: dict) -> None:
         """
-        Inserts new data into the database for the specified model. This method only handles
-        insertions and does not check for conflicts with existing data.
+        Inserts new data into the database for the specified model. A row whose primary key is already
+        stored is skipped, so a replayed spool segment or a backfill batch loaded twice does not fail.
 
         Args:
             session: The database session to use.
@@ -152,7 +593,7 @@ class StationOrmMethod:
             data: Dictionary of data to be inserted.
 
         Example SQL (PostgreSQL):
-            INSERT INTO station_status (station_id, status) VALUES (1, 'Active');
+            INSERT INTO station_status (station_socket_id, status_code, timestamp) VALUES (1, 2, '2024-01-01 12:00')
+            ON CONFLICT DO NOTHING;
         """
-        new_status = model(**data)
-        session.add(new_status)
+        await session.execute(insert(model).values(**data).on_conflict_do_nothing())
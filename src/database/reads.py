@@ -0,0 +1,275 @@
+"""
+Read-side queries for charts and reports: the status timeline of a socket, the occupancy of stations and the
+availability by city over a time range, in buckets or downsampled to a maximum number of points.
+
+Results are streamed through server-side cursors, `READ_BATCH_ROWS` rows per round trip, and returned as async
+iterators, so memory stays bounded on long ranges. Bucketed series are built on `OccupancyQueries` and read
+the hourly and daily rollups where the range and the buckets are aligned to them.
+"""
+import datetime
+import logging
+from typing import AsyncIterator, List, NamedTuple, Sequence
+
+from sqlalchemy import ColumnElement, Row, Select, distinct, func, select
+
+from .config import settings
+from .database import session_factory
+from .models import (StationInfoOrm, StationSocketOrm,
+                     StationStatusIntervalOrm, StationStatusOrm, StatusCodeOrm)
+from .rollups import DAY, HOUR, OccupancyQueries
+
+logger = logging.getLogger(__name__)
+
+SECOND = datetime.timedelta(seconds=1)
+# Status of the site -> category; the parser keeps the first word of a status. Other statuses count as "other".
+STATUS_CATEGORIES = {"Занят": "occupied", "Свободен": "free", "Неисправен": "broken", "Недоступен": "broken"}
+OCCUPIED_STATUSES = [status for status, category in STATUS_CATEGORIES.items() if category == "occupied"]
+FREE_STATUSES = [status for status, category in STATUS_CATEGORIES.items() if category == "free"]
+
+
+class StatusPoint(NamedTuple):
+    """
+    A point of a status timeline: the status observed at `timestamp`, or the status that prevailed
+    in the bucket starting at `timestamp` in a bucketed timeline.
+    """
+    timestamp: datetime.datetime
+    status: str
+
+
+class StationOccupancy(NamedTuple):
+    """
+    Occupancy of a station within the bucket starting at `bucket`: the share of the observed socket time
+    its sockets were occupied.
+    """
+    bucket: datetime.datetime
+    number: int
+    sockets: int
+    occupied_seconds: float
+    observed_seconds: float
+
+    @property
+    def occupancy(self) -> float:
+        return self.occupied_seconds / self.observed_seconds if self.observed_seconds else 0.0
+
+
+class CityAvailability(NamedTuple):
+    """
+    Availability of the sockets of a city within the bucket starting at `bucket`: the share of the observed
+    socket time they were free.
+    """
+    bucket: datetime.datetime
+    city: str
+    sockets: int
+    free_seconds: float
+    observed_seconds: float
+
+    @property
+    def availability(self) -> float:
+        return self.free_seconds / self.observed_seconds if self.observed_seconds else 0.0
+
+
+def downsample_bucket(start: datetime.datetime, end: datetime.datetime, max_points: int) -> datetime.timedelta:
+    """
+    Returns the narrowest bucket that splits a range into at most `max_points` buckets. It is rounded up to
+    whole days, hours or seconds, so series of aligned ranges can be read from the rollups.
+
+    Raises:
+        ValueError: If `max_points` is not positive.
+    """
+    if max_points < 1:
+        raise ValueError(f"max_points must be positive, got {max_points}")
+    width = max((end - start) / max_points, SECOND)
+    step = next(step for step in (DAY, HOUR, SECOND) if width >= step)
+    return -(-width // step) * step
+
+
+def resolve_bucket(
+    start: datetime.datetime,
+    end: datetime.datetime,
+    bucket: datetime.timedelta | None,
+    max_points: int | None,
+) -> datetime.timedelta | None:
+    """
+    Returns the bucket of a series: the given one, widened if needed to keep at most `max_points` buckets.
+    None if neither is given.
+    """
+    if max_points is None:
+        return bucket
+    return max(bucket or SECOND, downsample_bucket(start, end, max_points))
+
+
+async def stream_rows(stmt: Select, batch_rows: int | None = None) -> AsyncIterator[Row]:
+    """
+    Yields the rows of a query from a server-side cursor, fetching `batch_rows` rows per round trip.
+    """
+    async with session_factory() as session:
+        result = await session.stream(stmt.execution_options(yield_per=batch_rows or settings.READ_BATCH_ROWS))
+        async for row in result:
+            yield row
+
+
+class StatusReads(OccupancyQueries):
+    """
+    Streams status timelines, station occupancy and city availability. Configured like `OccupancyQueries`.
+    """
+
+    async def status_timeline(
+        self,
+        socket_id: int,
+        start: datetime.datetime,
+        end: datetime.datetime,
+        bucket: datetime.timedelta | None = None,
+        max_points: int | None = None,
+    ) -> AsyncIterator[StatusPoint]:
+        """
+        Yields the statuses of a socket within a range, oldest first.
+
+        Without a bucket, every stored status is yielded: every sample with snapshot storage, every change with
+        delta storage, where the first point is the status the socket entered the range with. With a bucket,
+        or when `max_points` asks for downsampling, one point per bucket holds the status the socket spent
+        the most time in.
+
+        Args:
+            socket_id: The socket.
+            start: Start of the range, inclusive.
+            end: End of the range, exclusive.
+            bucket: Width of the buckets, None for the stored statuses.
+            max_points: Most points to yield; the buckets are widened to stay within it.
+
+        Example SQL (PostgreSQL), hourly buckets with snapshot storage:
+            SELECT DISTINCT ON (bucket) bucket, c.name FROM (
+                SELECT date_bin('1 hour', timestamp, $2) AS bucket, status_code, count(*) AS samples
+                FROM station_status WHERE station_socket_id = $1 AND timestamp >= $2 AND timestamp < $3
+                GROUP BY 1, 2
+            ) AS series JOIN status_code AS c ON c.code = series.status_code ORDER BY bucket, samples DESC;
+        """
+        if start >= end:
+            return
+        bucket = resolve_bucket(start, end, bucket, max_points)
+        if bucket is None:
+            stmt = self._stored_statuses(socket_id, start, end)
+        else:
+            series = self._series(start, end, bucket, [socket_id]).subquery()
+            stmt = (
+                select(series.c.bucket, StatusCodeOrm.name)
+                .join(StatusCodeOrm, StatusCodeOrm.code == series.c.status_code)
+                .distinct(series.c.bucket)
+                .order_by(series.c.bucket, series.c.seconds.desc(), series.c.status_code)
+            )
+        async for timestamp, status in stream_rows(stmt):
+            yield StatusPoint(timestamp, status)
+
+    async def station_occupancy(
+        self,
+        start: datetime.datetime,
+        end: datetime.datetime,
+        bucket: datetime.timedelta | None = None,
+        max_points: int | None = None,
+        numbers: Sequence[int] | None = None,
+    ) -> AsyncIterator[StationOccupancy]:
+        """
+        Yields the occupancy of every station per bucket of a range, ordered by bucket and station number.
+
+        Args:
+            start: Start of the range and of the first bucket, inclusive.
+            end: End of the range, exclusive.
+            bucket: Width of the buckets, None for a single bucket over the whole range.
+            max_points: Most buckets per station; the buckets are widened to stay within it.
+            numbers: Numbers of the stations to include, all if None.
+
+        Example SQL (PostgreSQL), daily buckets of January from the daily rollup:
+            SELECT series.bucket, i.number, count(DISTINCT series.station_socket_id),
+                   sum(series.seconds) FILTER (WHERE c.name IN ('Занят')), sum(series.seconds)
+            FROM (SELECT date_bin('1 day', bucket, '2024-01-01') AS bucket, station_socket_id, status_code,
+                         sum(samples) * 60 AS seconds
+                  FROM station_status_daily WHERE bucket >= '2024-01-01' AND bucket < '2024-02-01' GROUP BY 1, 2, 3
+            ) AS series JOIN status_code AS c ON c.code = series.status_code
+            JOIN station_socket AS s ON s.id = series.station_socket_id JOIN station_info AS i ON i.id = s.station_id
+            GROUP BY 1, 2 ORDER BY 1, 2;
+        """
+        conditions = [] if numbers is None else [StationInfoOrm.number.in_(numbers)]
+        stmt = self._category_series(start, end, bucket, max_points, StationInfoOrm.number, OCCUPIED_STATUSES,
+                                     conditions)
+        if stmt is None:
+            return
+        async for bucket_start, number, sockets, occupied, observed in stream_rows(stmt):
+            yield StationOccupancy(bucket_start, number, sockets, float(occupied), float(observed))
+
+    async def city_availability(
+        self,
+        start: datetime.datetime,
+        end: datetime.datetime,
+        bucket: datetime.timedelta | None = None,
+        max_points: int | None = None,
+        cities: Sequence[str] | None = None,
+    ) -> AsyncIterator[CityAvailability]:
+        """
+        Yields the availability of the sockets of every city per bucket of a range, ordered by bucket and city.
+
+        Args:
+            start: Start of the range and of the first bucket, inclusive.
+            end: End of the range, exclusive.
+            bucket: Width of the buckets, None for a single bucket over the whole range.
+            max_points: Most buckets per city; the buckets are widened to stay within it.
+            cities: Cities to include, all if None.
+
+        Example SQL (PostgreSQL): like `station_occupancy`, grouped by `i.city` and filtered on free statuses.
+        """
+        conditions = [] if cities is None else [StationInfoOrm.city.in_(cities)]
+        stmt = self._category_series(start, end, bucket, max_points, StationInfoOrm.city, FREE_STATUSES, conditions)
+        if stmt is None:
+            return
+        async for bucket_start, city, sockets, free, observed in stream_rows(stmt):
+            yield CityAvailability(bucket_start, city, sockets, float(free), float(observed))
+
+    def _category_series(
+        self,
+        start: datetime.datetime,
+        end: datetime.datetime,
+        bucket: datetime.timedelta | None,
+        max_points: int | None,
+        key: ColumnElement,
+        statuses: Sequence[str],
+        conditions: List[ColumnElement[bool]],
+    ) -> Select | None:
+        """
+        Builds the query of the sockets, the seconds spent in the given statuses and the observed seconds
+        per bucket and station attribute `key`. None for an empty range.
+        """
+        if start >= end:
+            return None
+        bucket = resolve_bucket(start, end, bucket, max_points) or end - start
+        series = self._series(start, end, bucket, None).subquery()
+        matched = func.coalesce(func.sum(series.c.seconds).filter(StatusCodeOrm.name.in_(statuses)), 0)
+        return (
+            select(series.c.bucket, key, func.count(distinct(series.c.station_socket_id)), matched,
+                   func.sum(series.c.seconds))
+            .join(StatusCodeOrm, StatusCodeOrm.code == series.c.status_code)
+            .join(StationSocketOrm, StationSocketOrm.id == series.c.station_socket_id)
+            .join(StationInfoOrm, StationInfoOrm.id == StationSocketOrm.station_id)
+            .where(*conditions)
+            .group_by(series.c.bucket, key)
+            .order_by(series.c.bucket, key)
+        )
+
+    def _stored_statuses(self, socket_id: int, start: datetime.datetime, end: datetime.datetime) -> Select:
+        """
+        Builds the query of the stored statuses of a socket within a range. With delta storage, an interval
+        that began before the range starts at `start`.
+        """
+        if self.storage == "delta":
+            interval = StationStatusIntervalOrm
+            valid_to = func.coalesce(interval.valid_to, func.now())
+            return (
+                select(func.greatest(interval.valid_from, start), StatusCodeOrm.name)
+                .join(StatusCodeOrm, StatusCodeOrm.code == interval.status_code)
+                .where(interval.station_socket_id == socket_id, interval.valid_from < end, valid_to > start)
+                .order_by(interval.valid_from)
+            )
+        status = StationStatusOrm
+        return (
+            select(status.timestamp, StatusCodeOrm.name)
+            .join(StatusCodeOrm, StatusCodeOrm.code == status.status_code)
+            .where(status.station_socket_id == socket_id, status.timestamp >= start, status.timestamp < end)
+            .order_by(status.timestamp)
+        )
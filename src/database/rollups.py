@@ -0,0 +1,337 @@
+"""
+Occupancy queries: how long every socket spent in every status over a time range.
+
+With snapshot storage, the whole hours and days of the range are read from the hourly and daily continuous
+aggregates of the statuses (`station_status_hourly`, `station_status_daily`), and only the partial hours at its
+edges from the raw statuses. Durations are the number of samples times the scrape interval. With delta storage,
+durations are computed from the validity intervals, which are few enough to read directly.
+"""
+import datetime
+import logging
+from typing import List, NamedTuple, Sequence
+
+from sqlalchemy import (BigInteger, DateTime, Interval, Select, column,
+                        extract, func, literal, select, table, union_all)
+
+from .config import settings
+from .database import session_factory
+from .models import StationStatusIntervalOrm, StationStatusOrm, StatusCodeOrm
+from .queries import StatusStorage
+
+logger = logging.getLogger(__name__)
+
+HOUR = datetime.timedelta(hours=1)
+DAY = datetime.timedelta(days=1)
+
+
+def _rollup_view(name: str):
+    return table(
+        name,
+        column("bucket", DateTime(timezone=True)),
+        column("station_socket_id"),
+        column("status_code"),
+        column("samples", BigInteger),
+    )
+
+
+# Source -> (view, width of its buckets); coarsest first
+ROLLUP_VIEWS = {
+    "daily": (_rollup_view("station_status_daily"), DAY),
+    "hourly": (_rollup_view("station_status_hourly"), HOUR),
+}
+
+
+class RangePart(NamedTuple):
+    """
+    A part of a queried range and the source it is read from: "daily", "hourly" or "raw".
+    """
+    source: str
+    start: datetime.datetime
+    end: datetime.datetime
+
+
+class SocketOccupancy(NamedTuple):
+    """
+    Time a socket spent in a status. `samples` counts status rows with snapshot storage
+    and validity intervals with delta storage.
+    """
+    station_socket_id: int
+    status: str
+    samples: int
+    seconds: float
+
+
+class OccupancyBucket(NamedTuple):
+    """
+    Time a socket spent in a status within the bucket starting at `bucket`.
+    """
+    bucket: datetime.datetime
+    station_socket_id: int
+    status: str
+    samples: int
+    seconds: float
+
+
+def floor_time(timestamp: datetime.datetime, step: datetime.timedelta) -> datetime.datetime:
+    """
+    Rounds a time down to a multiple of `step` since the epoch, like `time_bucket` does.
+    """
+    epoch = datetime.datetime(1970, 1, 1, tzinfo=timestamp.tzinfo)
+    return timestamp - (timestamp - epoch) % step
+
+
+def ceil_time(timestamp: datetime.datetime, step: datetime.timedelta) -> datetime.datetime:
+    """
+    Rounds a time up to a multiple of `step` since the epoch.
+    """
+    floor = floor_time(timestamp, step)
+    return floor if floor == timestamp else floor + step
+
+
+def plan_range(start: datetime.datetime, end: datetime.datetime, rollups: bool = True) -> List[RangePart]:
+    """
+    Splits a range into the whole days read from the daily rollup, the whole hours around them read from
+    the hourly rollup and the partial hours at the edges read from the raw statuses.
+
+    Args:
+        start: Start of the range, inclusive.
+        end: End of the range, exclusive.
+        rollups (bool): Whether the rollups may be used; if not, the whole range is read raw.
+
+    Returns:
+        List[RangePart]: The non-empty parts, which together cover the range exactly.
+    """
+    hour_start, hour_end = ceil_time(start, HOUR), floor_time(end, HOUR)
+    if not rollups or hour_start >= hour_end:
+        return [RangePart("raw", start, end)] if start < end else []
+    day_start, day_end = ceil_time(start, DAY), floor_time(end, DAY)
+    if day_start < day_end:
+        parts = [
+            RangePart("hourly", hour_start, day_start),
+            RangePart("daily", day_start, day_end),
+            RangePart("hourly", day_end, hour_end),
+        ]
+    else:
+        parts = [RangePart("hourly", hour_start, hour_end)]
+    parts += [RangePart("raw", start, hour_start), RangePart("raw", hour_end, end)]
+    return [part for part in parts if part.start < part.end]
+
+
+def series_source(start: datetime.datetime, end: datetime.datetime, bucket: datetime.timedelta) -> str:
+    """
+    Returns the coarsest source whose buckets tile the buckets of a series: the width of its buckets divides
+    `bucket`, and the range starts and ends on its bucket boundaries.
+    """
+    for source, (_, width) in ROLLUP_VIEWS.items():
+        aligned = floor_time(start, width) == start and floor_time(end, width) == end
+        if aligned and bucket % width == datetime.timedelta(0):
+            return source
+    return "raw"
+
+
+class OccupancyQueries:
+    """
+    Reads the time spent in every status per socket, from the rollups where the range allows it.
+
+    Attributes:
+        rollups (bool): Whether the continuous aggregates may be read; they exist only on TimescaleDB
+            databases migrated with Alembic, not on tables made by `OrmMethods.create_tables`.
+        storage (str): "snapshot" or "delta", how the statuses are stored.
+        sample_seconds (int): Seconds a snapshot status sample stands for.
+    """
+
+    def __init__(
+        self,
+        rollups: bool | None = None,
+        storage: StatusStorage | None = None,
+        sample_seconds: int | None = None,
+    ):
+        self.rollups = settings.ROLLUPS_ENABLED if rollups is None else rollups
+        self.storage = storage or settings.STATUS_STORAGE
+        self.sample_seconds = sample_seconds or settings.STATUS_SAMPLE_SECONDS
+
+    async def occupancy(
+        self,
+        start: datetime.datetime,
+        end: datetime.datetime,
+        socket_ids: Sequence[int] | None = None,
+    ) -> List[SocketOccupancy]:
+        """
+        Returns the time every socket spent in every status within a range.
+
+        Args:
+            start: Start of the range, inclusive.
+            end: End of the range, exclusive.
+            socket_ids: Sockets to include, all if None.
+
+        Returns:
+            List[SocketOccupancy]: One entry per socket and status seen in the range.
+
+        Example SQL (TimescaleDB), for 2024-01-01 09:30 to 2024-01-03 00:00:
+            SELECT station_socket_id, c.name, sum(samples) FROM (
+                SELECT station_socket_id, status_code, sum(samples) AS samples FROM station_status_daily
+                WHERE bucket >= '2024-01-02' AND bucket < '2024-01-03' GROUP BY 1, 2
+                UNION ALL
+                SELECT station_socket_id, status_code, sum(samples) FROM station_status_hourly
+                WHERE bucket >= '2024-01-01 10:00' AND bucket < '2024-01-02' GROUP BY 1, 2
+                UNION ALL
+                SELECT station_socket_id, status_code, count(*) FROM station_status
+                WHERE timestamp >= '2024-01-01 09:30' AND timestamp < '2024-01-01 10:00' GROUP BY 1, 2
+            ) AS parts JOIN status_code AS c ON c.code = parts.status_code GROUP BY 1, 2;
+        """
+        if self.storage == "delta":
+            stmt = self._interval_totals(start, end, socket_ids)
+        else:
+            parts = plan_range(start, end, self.rollups)
+            if not parts:
+                return []
+            logger.debug(f"Occupancy from {start} to {end} read from {[part.source for part in parts]}")
+            counts = union_all(*(self._counts(part, socket_ids) for part in parts)).subquery()
+            samples = func.sum(counts.c.samples)
+            stmt = (
+                select(counts.c.station_socket_id, StatusCodeOrm.name, samples, samples * self.sample_seconds)
+                .join(StatusCodeOrm, StatusCodeOrm.code == counts.c.status_code)
+                .group_by(counts.c.station_socket_id, StatusCodeOrm.name)
+            )
+        async with session_factory() as session:
+            result = await session.execute(stmt)
+            return [SocketOccupancy(socket_id, status, int(count), float(seconds))
+                    for socket_id, status, count, seconds in result.all()]
+
+    async def occupancy_series(
+        self,
+        start: datetime.datetime,
+        end: datetime.datetime,
+        bucket: datetime.timedelta,
+        socket_ids: Sequence[int] | None = None,
+    ) -> List[OccupancyBucket]:
+        """
+        Returns the time every socket spent in every status per bucket of a range. The buckets start at `start`;
+        the daily or hourly rollup is read when the range and the buckets are aligned to its buckets.
+
+        Args:
+            start: Start of the range and of the first bucket, inclusive.
+            end: End of the range, exclusive; the last bucket may be shorter.
+            bucket: Width of the buckets.
+            socket_ids: Sockets to include, all if None.
+
+        Returns:
+            List[OccupancyBucket]: One entry per bucket, socket and status seen in the bucket, ordered by bucket.
+
+        Example SQL (TimescaleDB), daily buckets of January:
+            SELECT time_bucket('1 day', bucket) AS day, station_socket_id, status_code, sum(samples)
+            FROM station_status_daily WHERE bucket >= '2024-01-01' AND bucket < '2024-02-01'
+            GROUP BY 1, 2, 3 ORDER BY 1;
+        """
+        if start >= end:
+            return []
+        series = self._series(start, end, bucket, socket_ids).subquery()
+        stmt = (
+            select(series.c.bucket, series.c.station_socket_id, StatusCodeOrm.name, series.c.samples,
+                   series.c.seconds)
+            .join(StatusCodeOrm, StatusCodeOrm.code == series.c.status_code)
+            .order_by(series.c.bucket, series.c.station_socket_id)
+        )
+        async with session_factory() as session:
+            result = await session.execute(stmt)
+            return [OccupancyBucket(bucket_start, socket_id, status, int(count), float(seconds))
+                    for bucket_start, socket_id, status, count, seconds in result.all()]
+
+    def _series(
+        self,
+        start: datetime.datetime,
+        end: datetime.datetime,
+        bucket: datetime.timedelta,
+        socket_ids: Sequence[int] | None,
+    ) -> Select:
+        """
+        Builds the query of the time spent per bucket, socket and status code, with the columns "bucket",
+        "station_socket_id", "status_code", "samples" and "seconds", from the source the storage allows.
+        """
+        if self.storage == "delta":
+            return self._interval_series(start, end, bucket, socket_ids)
+        source = series_source(start, end, bucket) if self.rollups else "raw"
+        logger.debug(f"Occupancy series from {start} to {end} per {bucket} read from {source}")
+        counts = self._counts(RangePart(source, start, end), socket_ids, bucket).subquery()
+        return select(
+            counts.c.bucket,
+            counts.c.station_socket_id,
+            counts.c.status_code,
+            counts.c.samples,
+            (counts.c.samples * self.sample_seconds).label("seconds"),
+        )
+
+    @staticmethod
+    def _counts(part: RangePart, socket_ids: Sequence[int] | None, bucket: datetime.timedelta | None = None) -> Select:
+        """
+        Builds the query of the status samples per socket within a part of a range, also per bucket if given.
+        """
+        if part.source == "raw":
+            source = StationStatusOrm.__table__
+            time, samples = source.c.timestamp, func.count()
+        else:
+            source = ROLLUP_VIEWS[part.source][0]
+            time, samples = source.c.bucket, func.sum(source.c.samples)
+        keys = [source.c.station_socket_id, source.c.status_code]
+        if bucket is not None:
+            origin = literal(part.start, DateTime(timezone=True))
+            keys.insert(0, func.date_bin(literal(bucket, Interval), time, origin, type_=DateTime(timezone=True))
+                        .label("bucket"))
+        conditions = [time >= part.start, time < part.end]
+        if socket_ids is not None:
+            conditions.append(source.c.station_socket_id.in_(socket_ids))
+        return select(*keys, samples.label("samples")).where(*conditions).group_by(*keys)
+
+    @staticmethod
+    def _interval_totals(
+        start: datetime.datetime, end: datetime.datetime, socket_ids: Sequence[int] | None
+    ) -> Select:
+        """
+        Builds the query of the time spent per socket and status from the validity intervals overlapping a range.
+        Open intervals last until now.
+        """
+        interval = StationStatusIntervalOrm
+        valid_to = func.coalesce(interval.valid_to, func.now())
+        seconds = extract("epoch", func.least(valid_to, end) - func.greatest(interval.valid_from, start))
+        conditions = [interval.valid_from < end, valid_to > start]
+        if socket_ids is not None:
+            conditions.append(interval.station_socket_id.in_(socket_ids))
+        return (
+            select(interval.station_socket_id, StatusCodeOrm.name, func.count(), func.sum(seconds))
+            .join(StatusCodeOrm, StatusCodeOrm.code == interval.status_code)
+            .where(*conditions)
+            .group_by(interval.station_socket_id, StatusCodeOrm.name)
+        )
+
+    @staticmethod
+    def _interval_series(
+        start: datetime.datetime,
+        end: datetime.datetime,
+        bucket: datetime.timedelta,
+        socket_ids: Sequence[int] | None,
+    ) -> Select:
+        """
+        Builds the query of the time spent per bucket, socket and status code from the validity intervals,
+        joined to the series of bucket starts they overlap.
+        """
+        interval = StationStatusIntervalOrm
+        width = literal(bucket, Interval)
+        buckets = select(
+            func.generate_series(
+                literal(start, DateTime(timezone=True)),
+                literal(end, DateTime(timezone=True)) - literal(datetime.timedelta(microseconds=1), Interval),
+                width,
+                type_=DateTime(timezone=True),
+            ).label("bucket")
+        ).subquery()
+        bucket_end = func.least(buckets.c.bucket + width, end)
+        valid_to = func.coalesce(interval.valid_to, func.now())
+        overlap = func.least(valid_to, bucket_end) - func.greatest(interval.valid_from, buckets.c.bucket)
+        conditions = [] if socket_ids is None else [interval.station_socket_id.in_(socket_ids)]
+        return (
+            select(buckets.c.bucket, interval.station_socket_id, interval.status_code,
+                   func.count().label("samples"), func.sum(extract("epoch", overlap)).label("seconds"))
+            .join(buckets, (interval.valid_from < bucket_end) & (valid_to > buckets.c.bucket))
+            .where(*conditions)
+            .group_by(buckets.c.bucket, interval.station_socket_id, interval.status_code)
+        )
@@ -0,0 +1,121 @@
+import logging
+from typing import Any, Dict, List, Literal, TypeAlias
+
+import asyncpg
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import metrics
+from .models import StationStatusOrm
+
+logger = logging.getLogger(__name__)
+
+StatusWriterType: TypeAlias = Literal["insert", "copy"]
+
+STATUS_TABLE = StationStatusOrm.__tablename__
+STATUS_COLUMNS = ("station_socket_id", "status_code", "timestamp")
+STAGING_TABLE = "station_status_staging"
+
+
+class InsertStatusWriter:
+    """
+    Writes status rows with batched multi-row INSERT ... ON CONFLICT DO NOTHING statements.
+    """
+
+    async def write(self, session: AsyncSession, rows: List[Dict[str, Any]]) -> None:
+        """
+        Writes a batch of status rows within the session's transaction.
+
+        Args:
+            session: The database session to use.
+            rows: Status rows with "station_socket_id", "status_code" and "timestamp".
+        """
+        if rows:
+            await session.execute(insert(StationStatusOrm.__table__).on_conflict_do_nothing(), rows)
+
+
+class CopyStatusWriter:
+    """
+    Streams status rows into `station_status` with asyncpg's binary COPY protocol, going through
+    the raw driver connection of the session. A batch that collides with existing
+    `(station_socket_id, timestamp)` keys is copied into a temporary staging table instead
+    and moved over with INSERT ... SELECT ... ON CONFLICT DO NOTHING.
+
+    The COPY runs as a savepoint of the session's transaction when one is open on the connection,
+    otherwise in a transaction of its own.
+
+    Attributes:
+        deduplicate (bool): Always go through the staging table, e.g. for backfills that expect duplicates.
+    """
+
+    def __init__(self, deduplicate: bool = False):
+        self.deduplicate = deduplicate
+
+    async def write(self, session: AsyncSession, rows: List[Dict[str, Any]]) -> None:
+        """
+        Writes a batch of status rows.
+
+        Args:
+            session: The database session to use.
+            rows: Status rows with "station_socket_id", "status_code" and "timestamp".
+        """
+        if not rows:
+            return
+        records = [tuple(row[column] for column in STATUS_COLUMNS) for row in rows]
+        driver = await self._driver_connection(session)
+        if not self.deduplicate:
+            try:
+                async with driver.transaction():
+                    await driver.copy_records_to_table(STATUS_TABLE, records=records, columns=STATUS_COLUMNS)
+                metrics.db_round_trips.inc()
+                return
+            except asyncpg.UniqueViolationError:
+                logger.info("Status batch has duplicate keys, copying through the staging table")
+        await self._copy_deduplicated(driver, records)
+
+    @staticmethod
+    async def _driver_connection(session: AsyncSession) -> asyncpg.Connection:
+        """
+        Returns the asyncpg connection underlying the session's connection.
+        """
+        connection = await session.connection()
+        raw_connection = await connection.get_raw_connection()
+        return raw_connection.driver_connection
+
+    @staticmethod
+    async def _copy_deduplicated(driver: asyncpg.Connection, records: List[tuple]) -> None:
+        """
+        Copies records into a temporary staging table and inserts them into `station_status`,
+        skipping keys that already exist.
+
+        Example SQL (PostgreSQL):
+            COPY station_status_staging (station_socket_id, status_code, timestamp) FROM STDIN (FORMAT binary);
+            INSERT INTO station_status SELECT ... FROM station_status_staging ON CONFLICT DO NOTHING;
+        """
+        columns = ", ".join(f'"{column}"' for column in STATUS_COLUMNS)
+        async with driver.transaction():
+            await driver.execute(
+                f"CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} "
+                f"(LIKE {STATUS_TABLE} INCLUDING DEFAULTS) ON COMMIT DROP"
+            )
+            await driver.execute(f"TRUNCATE {STAGING_TABLE}")
+            await driver.copy_records_to_table(STAGING_TABLE, records=records, columns=STATUS_COLUMNS)
+            await driver.execute(
+                f"INSERT INTO {STATUS_TABLE} ({columns}) SELECT {columns} FROM {STAGING_TABLE} ON CONFLICT DO NOTHING"
+            )
+        metrics.db_round_trips.inc(4)
+
+
+def make_status_writer(writer: StatusWriterType) -> InsertStatusWriter | CopyStatusWriter:
+    """
+    Creates the status writer backend with the given name.
+
+    Args:
+        writer: "insert" for batched INSERT statements, "copy" for the binary COPY protocol.
+
+    Returns:
+        The status writer instance.
+    """
+    if writer == "copy":
+        return CopyStatusWriter()
+    return InsertStatusWriter()
@@ -0,0 +1,100 @@
+import datetime
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, List
+
+from .parser.markup import normalize_markup, table_body
+
+logger = logging.getLogger(__name__)
+
+
+def page_fingerprint(page_html: str) -> str:
+    """
+    Fingerprints the station table of a page: a hash of the normalized `<tbody>` markup,
+    or of the whole page if it has no table body.
+
+    Args:
+        page_html (str): The HTML content of the page.
+
+    Returns:
+        str: Hex digest of the normalized markup.
+    """
+    body = table_body(page_html)
+    markup = normalize_markup(page_html if body is None else body)
+    return hashlib.blake2b(markup.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class FingerprintStore:
+    """
+    Persists, per source, the fingerprint of the last stored page together with the timestamp it was
+    stored under and the ids of its sockets, so an unchanged page can be recorded as a heartbeat
+    without parsing it, also right after a restart.
+
+    Attributes:
+        path (str): Path of the JSON file holding the state.
+        entries (dict): source -> {"fingerprint", "timestamp", "socket_ids"}.
+    """
+
+    def __init__(self, path: str = os.path.join(os.getenv("STATE_DIR", "data"), "fingerprints.json")):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = self._load()
+
+    def get(self, source: str) -> Dict[str, Any] | None:
+        """
+        Returns the state of the last stored page of the source.
+
+        Args:
+            source (str): Key of the source, e.g. its URL.
+
+        Returns:
+            dict | None: "fingerprint" (str), "timestamp" (datetime) and "socket_ids" (list[int]), or None.
+        """
+        entry = self.entries.get(source)
+        if entry is None:
+            return None
+        return {**entry, "timestamp": datetime.datetime.fromisoformat(entry["timestamp"])}
+
+    def save(self, source: str, fingerprint: str, timestamp: datetime.datetime, socket_ids: List[int]) -> None:
+        """
+        Records the last stored page of the source and writes the state to disk.
+
+        Args:
+            source (str): Key of the source, e.g. its URL.
+            fingerprint (str): Fingerprint of the page.
+            timestamp (datetime.datetime): Timestamp the statuses were stored under.
+            socket_ids (list[int]): Ids of the sockets listed on the page.
+        """
+        self.entries[source] = {
+            "fingerprint": fingerprint,
+            "timestamp": timestamp.isoformat(),
+            "socket_ids": socket_ids,
+        }
+        self._dump()
+
+    def touch(self, source: str, timestamp: datetime.datetime) -> None:
+        """
+        Moves the timestamp of the source's last stored page forward after a heartbeat.
+        """
+        self.entries[source]["timestamp"] = timestamp.isoformat()
+        self._dump()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable fingerprint state {self.path}: {e}")
+            return {}
+
+    def _dump(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(self.entries, file)
+        os.replace(tmp_path, self.path)
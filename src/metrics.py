@@ -0,0 +1,290 @@
+"""
+In-process metrics of the scraper: counters, gauges and histograms, exposed in the Prometheus text format
+on an optional HTTP endpoint and summarized as JSON log lines.
+
+The loader, the parser and the database layer record into the metrics of this module, so the benchmarks
+measure the same numbers as a running scraper.
+"""
+import abc
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Port of the Prometheus endpoint, 0 disables it
+METRICS_PORT = int(os.getenv("METRICS_PORT", 0))
+METRICS_HOST = os.getenv("METRICS_HOST", "0.0.0.0")
+PREFIX = "kzcharge_"
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+
+
+class Metric(abc.ABC):
+    """
+    Base of all metrics: a value per combination of label values.
+
+    Attributes:
+        name (str): Name of the metric without the prefix.
+        help (str): Description shown by the endpoint.
+        labels (tuple): Names of the labels.
+    """
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def _selector(self, key: LabelValues, extra: str = "") -> str:
+        pairs = [f'{name}="{value}"' for name, value in zip(self.labels, key)]
+        if extra:
+            pairs.append(extra)
+        return f"{{{','.join(pairs)}}}" if pairs else ""
+
+    @abc.abstractmethod
+    def samples(self) -> Iterator[Tuple[str, float]]:
+        """
+        Yields the (name with labels, value) pairs of the text format.
+        """
+
+    def summary(self) -> Dict[str, float]:
+        """
+        Returns the values for the JSON summary by name with labels.
+        """
+        return dict(self.samples())
+
+
+class Counter(Metric):
+    """
+    A count that only goes up.
+    """
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, help, labels)
+        self.values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self.values.get(self._key(labels), 0)
+
+    def samples(self) -> Iterator[Tuple[str, float]]:
+        with self.lock:
+            values = list(self.values.items())
+        for key, value in values:
+            yield f"{self.name}{self._selector(key)}", value
+
+
+class Gauge(Counter):
+    """
+    A value that is set, like a lag or a size.
+    """
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        with self.lock:
+            self.values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    """
+    Distribution of observed values, usually durations in seconds, over cumulative buckets.
+
+    Attributes:
+        buckets (tuple): Upper bounds of the buckets; the +Inf bucket is implicit.
+    """
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DURATION_BUCKETS
+    ):
+        super().__init__(name, help, labels)
+        self.buckets = buckets
+        # label values -> [count per bucket..., count of +Inf, sum]
+        self.values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self.lock:
+            counts = self.values.setdefault(key, [0] * (len(self.buckets) + 2))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            counts[-2] += 1
+            counts[-1] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """
+        Observes the duration of the `with` block in seconds, also if it raises.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels: str) -> int:
+        return int(self.values.get(self._key(labels), [0, 0])[-2])
+
+    def samples(self) -> Iterator[Tuple[str, float]]:
+        with self.lock:
+            values = [(key, list(counts)) for key, counts in self.values.items()]
+        for key, counts in values:
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                bucket = f'le="{bound}"'
+                yield f"{self.name}_bucket{self._selector(key, bucket)}", count
+            yield f"{self.name}_count{self._selector(key)}", counts[-2]
+            yield f"{self.name}_sum{self._selector(key)}", counts[-1]
+
+    def summary(self) -> Dict[str, float]:
+        return {name: value for name, value in self.samples() if "_bucket" not in name}
+
+
+def _format(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Registry:
+    """
+    The metrics of the process.
+
+    Attributes:
+        metrics (dict): Name -> metric.
+    """
+
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+        self._logged: Dict[str, float] = {}
+
+    def counter(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self._add(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> Gauge:
+        return self._add(Gauge(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Tuple[str, ...] = (), **kwargs) -> Histogram:
+        return self._add(Histogram(name, help, labels, **kwargs))
+
+    def _add(self, metric: Metric) -> Any:
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """
+        Returns all metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {PREFIX}{metric.name} {metric.help}")
+            lines.append(f"# TYPE {PREFIX}{metric.name} {metric.kind}")
+            lines.extend(f"{PREFIX}{name} {_format(value)}" for name, value in metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> Dict[str, float]:
+        """
+        Returns the current value of every counter and gauge, and the count and sum of every histogram.
+        """
+        return {name: value for metric in self.metrics.values() for name, value in metric.summary().items()}
+
+    def log_summary(self, event: str) -> Dict[str, float]:
+        """
+        Logs what changed since the previous summary as one JSON line: the increase of counters and
+        histograms, and the current value of gauges.
+
+        Args:
+            event (str): What the summary is about, e.g. "tick".
+
+        Returns:
+            dict: The logged values.
+        """
+        current = self.summary()
+        gauges = {name for metric in self.metrics.values() if metric.kind == "gauge" for name in metric.summary()}
+        changes = {
+            name: value if name in gauges else value - self._logged.get(name, 0)
+            for name, value in current.items()
+        }
+        self._logged = current
+        changes = {name: round(value, 6) for name, value in changes.items() if value}
+        logger.info(json.dumps({"event": event, "metrics": changes}, ensure_ascii=False))
+        return changes
+
+
+registry = Registry()
+
+fetch_seconds = registry.histogram("fetch_seconds", "Duration of a page fetch including retries")
+fetch_responses = registry.counter("fetch_responses_total", "HTTP responses by status code", ("code",))
+fetch_errors = registry.counter("fetch_errors_total", "Fetch attempts failed without a response")
+fetch_retries = registry.counter("fetch_retries_total", "Retried fetch attempts")
+fetch_bytes = registry.counter("fetch_bytes_total", "Bytes of downloaded pages")
+parse_seconds = registry.histogram("parse_seconds", "Duration of parsing a page")
+parse_rows = registry.counter("parse_rows_total", "Station rows on parsed pages")
+parse_rows_parsed = registry.counter("parse_rows_parsed_total", "Station rows parsed, not reused from the row cache")
+parse_observations = registry.counter("parse_observations_total", "Socket observations of parsed pages")
+db_round_trips = registry.counter("db_round_trips_total", "Statements and COPY batches sent to the database")
+db_commit_seconds = registry.histogram("db_commit_seconds", "Duration of a database commit")
+ingest_seconds = registry.histogram("ingest_seconds", "Duration of writing a scrape", ("mode",))
+ingest_observations = registry.counter("ingest_observations_total", "Socket observations written")
+ingest_status_rows = registry.counter("ingest_status_rows_total", "Status rows written, heartbeats included")
+ticks = registry.counter("ticks_total", "Ticks started")
+tick_seconds = registry.histogram("tick_seconds", "Duration of a tick over all sources")
+ticks_dropped = registry.counter("ticks_dropped_total", "Ticks replaced by a newer one before dispatch")
+source_ticks_skipped = registry.counter(
+    "source_ticks_skipped_total", "Ticks of a source skipped because its previous fetch was still running"
+)
+source_errors = registry.counter("source_errors_total", "Failed ticks of a source", ("stage",))
+spool_lag_seconds = registry.gauge("spool_lag_seconds", "Age of the oldest snapshot not yet replayed from the spool")
+spool_bytes = registry.gauge("spool_bytes", "Size of the spool segments")
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:  # noqa: N802
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+def start_metrics_server(port: int = METRICS_PORT, host: str = METRICS_HOST) -> ThreadingHTTPServer | None:
+    """
+    Serves the metrics at `/metrics` from a daemon thread.
+
+    Args:
+        port (int): Port to listen on; 0 does not start the server.
+        host (str): Address to listen on.
+
+    Returns:
+        ThreadingHTTPServer | None: The running server, None if it is disabled.
+    """
+    if not port:
+        return None
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+    return server
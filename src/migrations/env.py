@@ -5,7 +5,10 @@ from sqlalchemy import engine_from_config, pool
 
 from src.database.config import settings
 from src.database.database import Base
-from src.database.models import StationInfoOrm, StationSocketOrm, StationStatusOrm  # noqa
+from src.database.models import (SocketTypeOrm, StationInfoOrm,  # noqa
+                                 StationSocketOrm, StationStatusIntervalOrm,
+                                 StationStatusLatestOrm, StationStatusOrm,
+                                 StatusCodeOrm)
 
 config = context.config
 
@@ -0,0 +1,70 @@
+"""status intervals
+
+Revision ID: 4b1e7d2a9c3f
+Revises: 89c2c9cb0fc8
+Create Date: 2026-10-18 13:05:12.418390
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "4b1e7d2a9c3f"
+down_revision: Union[str, None] = "89c2c9cb0fc8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "station_status_interval",
+        sa.Column("station_socket_id", sa.Integer(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("valid_from", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("valid_to", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["station_socket_id"], ["station_socket.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("station_socket_id", "valid_from"),
+    )
+    op.create_index(
+        "station_status_interval_valid_from_idx",
+        "station_status_interval",
+        ["valid_from"],
+        unique=False,
+    )
+    op.create_index(
+        "station_status_interval_open_idx",
+        "station_status_interval",
+        ["station_socket_id"],
+        unique=True,
+        postgresql_where=sa.text("valid_to IS NULL"),
+    )
+    # Status of every socket at a point in time, answered from the intervals
+    op.execute(
+        """
+        CREATE FUNCTION station_status_at(ts timestamptz)
+        RETURNS TABLE (station_socket_id integer, status varchar, valid_from timestamptz)
+        LANGUAGE sql STABLE AS $$
+            SELECT i.station_socket_id, i.status, i.valid_from
+            FROM station_status_interval AS i
+            WHERE i.valid_from <= ts AND (i.valid_to IS NULL OR i.valid_to > ts)
+        $$
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP FUNCTION station_status_at(timestamptz)")
+    op.drop_index(
+        "station_status_interval_open_idx",
+        table_name="station_status_interval",
+    )
+    op.drop_index(
+        "station_status_interval_valid_from_idx",
+        table_name="station_status_interval",
+    )
+    op.drop_table("station_status_interval")
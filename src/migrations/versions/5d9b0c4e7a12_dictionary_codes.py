@@ -0,0 +1,220 @@
+"""dictionary codes
+
+Revision ID: 5d9b0c4e7a12
+Revises: e2f64a8c1d37
+Create Date: 2026-10-18 17:48:36.201954
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+from src.database.config import settings
+
+# revision identifiers, used by Alembic.
+revision: str = "5d9b0c4e7a12"
+down_revision: Union[str, None] = "e2f64a8c1d37"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, text column, code column, dictionary)
+ENCODED_COLUMNS = [
+    ("station_status", "status", "status_code", "status_code"),
+    ("station_status_interval", "status", "status_code", "status_code"),
+    ("station_socket", "socket", "socket_type_code", "socket_type"),
+]
+
+
+def _drop_rollups() -> None:
+    for view in ("station_status_daily", "station_status_hourly"):
+        op.execute(f"SELECT remove_continuous_aggregate_policy('{view}')")
+        op.execute(f"DROP MATERIALIZED VIEW {view}")
+
+
+def _create_rollups(status: str) -> None:
+    """
+    Recreates the rollups of revision c7a3e91d5b20 on the given status
+    column and materializes them.
+    """
+    op.execute(
+        f"""
+        CREATE MATERIALIZED VIEW station_status_hourly
+        WITH (timescaledb.continuous, timescaledb.materialized_only = false)
+        AS
+        SELECT time_bucket(INTERVAL '1 hour', "timestamp") AS bucket,
+               station_socket_id,
+               {status},
+               count(*) AS samples
+        FROM station_status
+        GROUP BY bucket, station_socket_id, {status}
+        WITH NO DATA
+        """
+    )
+    op.execute(
+        f"""
+        CREATE MATERIALIZED VIEW station_status_daily
+        WITH (timescaledb.continuous, timescaledb.materialized_only = false)
+        AS
+        SELECT time_bucket(INTERVAL '1 day', bucket) AS bucket,
+               station_socket_id,
+               {status},
+               sum(samples)::bigint AS samples
+        FROM station_status_hourly
+        GROUP BY 1, station_socket_id, {status}
+        WITH NO DATA
+        """
+    )
+    for view, start, end, schedule in (
+        ("station_status_hourly", "2 days", "1 hour", "30 minutes"),
+        ("station_status_daily", "4 days", "1 day", "1 hour"),
+    ):
+        op.execute(
+            f"CREATE INDEX {view}_socket_idx "
+            f"ON {view} (station_socket_id, bucket)"
+        )
+        op.execute(
+            f"SELECT add_continuous_aggregate_policy('{view}', "
+            f"start_offset => INTERVAL '{start}', "
+            f"end_offset => INTERVAL '{end}', "
+            f"schedule_interval => INTERVAL '{schedule}')"
+        )
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CALL refresh_continuous_aggregate("
+            "'station_status_hourly', NULL, now() - INTERVAL '1 hour')"
+        )
+        op.execute(
+            "CALL refresh_continuous_aggregate("
+            "'station_status_daily', NULL, now() - INTERVAL '1 day')"
+        )
+
+
+def _disable_compression() -> None:
+    # Columns of compressed chunks cannot be rewritten
+    op.execute(
+        "SELECT remove_compression_policy('station_status', if_exists => true)"
+    )
+    op.execute(
+        "SELECT decompress_chunk(chunk, if_compressed => true) "
+        "FROM show_chunks('station_status') AS chunk"
+    )
+    op.execute("ALTER TABLE station_status SET (timescaledb.compress = false)")
+
+
+def _enable_compression() -> None:
+    op.execute(
+        """
+        ALTER TABLE station_status SET (
+            timescaledb.compress,
+            timescaledb.compress_segmentby = 'station_socket_id',
+            timescaledb.compress_orderby = 'timestamp DESC'
+        )
+        """
+    )
+    op.execute(
+        sa.text(
+            "SELECT add_compression_policy('station_status', "
+            "compress_after => CAST(CAST(:after AS text) AS interval))"
+        ).bindparams(after=settings.COMPRESS_AFTER)
+    )
+
+
+def _create_status_at(status: str, join: str) -> None:
+    op.execute(
+        f"""
+        CREATE FUNCTION station_status_at(ts timestamptz)
+        RETURNS TABLE (station_socket_id integer, status varchar, valid_from timestamptz)
+        LANGUAGE sql STABLE AS $$
+            SELECT i.station_socket_id, {status}, i.valid_from
+            FROM station_status_interval AS i {join}
+            WHERE i.valid_from <= ts AND (i.valid_to IS NULL OR i.valid_to > ts)
+        $$
+        """
+    )
+
+
+def upgrade() -> None:
+    for dictionary in ("status_code", "socket_type"):
+        op.create_table(
+            dictionary,
+            sa.Column(
+                "code", sa.SmallInteger(), autoincrement=True, nullable=False
+            ),
+            sa.Column("name", sa.String(), nullable=False),
+            sa.PrimaryKeyConstraint("code"),
+            sa.UniqueConstraint("name"),
+        )
+    _drop_rollups()
+    op.execute("DROP FUNCTION station_status_at(timestamptz)")
+    _disable_compression()
+
+    for table, text_column, code_column, dictionary in ENCODED_COLUMNS:
+        op.execute(
+            f"INSERT INTO {dictionary} (name) SELECT DISTINCT {text_column} "
+            f"FROM {table} ORDER BY 1 ON CONFLICT (name) DO NOTHING"
+        )
+        op.add_column(
+            table, sa.Column(code_column, sa.SmallInteger(), nullable=True)
+        )
+        op.execute(
+            f"UPDATE {table} AS t SET {code_column} = d.code "
+            f"FROM {dictionary} AS d WHERE d.name = t.{text_column}"
+        )
+        op.alter_column(table, code_column, nullable=False)
+        op.create_foreign_key(
+            f"{table}_{code_column}_fkey",
+            table,
+            dictionary,
+            [code_column],
+            ["code"],
+        )
+    op.drop_constraint(
+        "station_id_charger_port_socket_unique", "station_socket"
+    )
+    op.create_unique_constraint(
+        "station_id_charger_port_socket_type_unique",
+        "station_socket",
+        ["station_id", "charger_port", "socket_type_code"],
+    )
+    for table, text_column, _, _ in ENCODED_COLUMNS:
+        op.drop_column(table, text_column)
+
+    _enable_compression()
+    _create_status_at(
+        "c.name", "JOIN status_code AS c ON c.code = i.status_code"
+    )
+    _create_rollups("status_code")
+
+
+def downgrade() -> None:
+    _drop_rollups()
+    op.execute("DROP FUNCTION station_status_at(timestamptz)")
+    _disable_compression()
+
+    for table, text_column, code_column, dictionary in ENCODED_COLUMNS:
+        op.add_column(
+            table, sa.Column(text_column, sa.String(), nullable=True)
+        )
+        op.execute(
+            f"UPDATE {table} AS t SET {text_column} = d.name "
+            f"FROM {dictionary} AS d WHERE d.code = t.{code_column}"
+        )
+        op.alter_column(table, text_column, nullable=False)
+    op.drop_constraint(
+        "station_id_charger_port_socket_type_unique", "station_socket"
+    )
+    op.create_unique_constraint(
+        "station_id_charger_port_socket_unique",
+        "station_socket",
+        ["station_id", "charger_port", "socket"],
+    )
+    for table, _, code_column, _ in ENCODED_COLUMNS:
+        op.drop_column(table, code_column)
+    op.drop_table("socket_type")
+    op.drop_table("status_code")
+
+    _enable_compression()
+    _create_status_at("i.status", "")
+    _create_rollups("status")
@@ -0,0 +1,66 @@
+"""status latest
+
+Revision ID: 8a1f3e5c2b64
+Revises: 5d9b0c4e7a12
+Create Date: 2026-10-18 19:06:51.734820
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8a1f3e5c2b64"
+down_revision: Union[str, None] = "5d9b0c4e7a12"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "station_status_latest",
+        sa.Column(
+            "station_socket_id",
+            sa.Integer(),
+            autoincrement=False,
+            nullable=False,
+        ),
+        sa.Column("status_code", sa.SmallInteger(), nullable=False),
+        sa.Column("since", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["station_socket_id"], ["station_socket.id"], ondelete="CASCADE"
+        ),
+        sa.ForeignKeyConstraint(["status_code"], ["status_code.code"]),
+        sa.PrimaryKeyConstraint("station_socket_id"),
+    )
+    # The last status of every socket, since the first of its rows after
+    # the last row with another status. Works for both storage modes.
+    op.execute(
+        """
+        INSERT INTO station_status_latest (station_socket_id, status_code, since)
+        SELECT last.station_socket_id, last.status_code, coalesce((
+            SELECT min(s."timestamp") FROM station_status AS s
+            WHERE s.station_socket_id = last.station_socket_id
+              AND s."timestamp" > (
+                SELECT max(p."timestamp") FROM station_status AS p
+                WHERE p.station_socket_id = last.station_socket_id
+                  AND p.status_code <> last.status_code
+              )
+        ), (
+            SELECT min(s."timestamp") FROM station_status AS s
+            WHERE s.station_socket_id = last.station_socket_id
+        ))
+        FROM (
+            SELECT DISTINCT ON (station_socket_id)
+                   station_socket_id, status_code, "timestamp"
+            FROM station_status
+            ORDER BY station_socket_id, "timestamp" DESC
+        ) AS last
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("station_status_latest")
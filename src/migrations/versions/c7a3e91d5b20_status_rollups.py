@@ -0,0 +1,102 @@
+"""status rollups
+
+Revision ID: c7a3e91d5b20
+Revises: 4b1e7d2a9c3f
+Create Date: 2026-10-18 15:41:27.905113
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c7a3e91d5b20"
+down_revision: Union[str, None] = "4b1e7d2a9c3f"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Status samples per socket and hour. Durations are derived from the
+    # samples, as window functions are not allowed in continuous aggregates.
+    op.execute(
+        """
+        CREATE MATERIALIZED VIEW station_status_hourly
+        WITH (timescaledb.continuous, timescaledb.materialized_only = false)
+        AS
+        SELECT time_bucket(INTERVAL '1 hour', "timestamp") AS bucket,
+               station_socket_id,
+               status,
+               count(*) AS samples
+        FROM station_status
+        GROUP BY bucket, station_socket_id, status
+        WITH NO DATA
+        """
+    )
+    # Daily rollup on top of the hourly one (TimescaleDB 2.9 or newer)
+    op.execute(
+        """
+        CREATE MATERIALIZED VIEW station_status_daily
+        WITH (timescaledb.continuous, timescaledb.materialized_only = false)
+        AS
+        SELECT time_bucket(INTERVAL '1 day', bucket) AS bucket,
+               station_socket_id,
+               status,
+               sum(samples)::bigint AS samples
+        FROM station_status_hourly
+        GROUP BY 1, station_socket_id, status
+        WITH NO DATA
+        """
+    )
+    op.execute(
+        "CREATE INDEX station_status_hourly_socket_idx "
+        "ON station_status_hourly (station_socket_id, bucket)"
+    )
+    op.execute(
+        "CREATE INDEX station_status_daily_socket_idx "
+        "ON station_status_daily (station_socket_id, bucket)"
+    )
+    # The windows cover statuses replayed late from the spool
+    op.execute(
+        """
+        SELECT add_continuous_aggregate_policy(
+            'station_status_hourly',
+            start_offset => INTERVAL '2 days',
+            end_offset => INTERVAL '1 hour',
+            schedule_interval => INTERVAL '30 minutes'
+        )
+        """
+    )
+    op.execute(
+        """
+        SELECT add_continuous_aggregate_policy(
+            'station_status_daily',
+            start_offset => INTERVAL '4 days',
+            end_offset => INTERVAL '1 day',
+            schedule_interval => INTERVAL '1 hour'
+        )
+        """
+    )
+    # Materializes the existing history once; refreshes cannot run inside
+    # a transaction
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CALL refresh_continuous_aggregate("
+            "'station_status_hourly', NULL, now() - INTERVAL '1 hour')"
+        )
+        op.execute(
+            "CALL refresh_continuous_aggregate("
+            "'station_status_daily', NULL, now() - INTERVAL '1 day')"
+        )
+
+
+def downgrade() -> None:
+    op.execute(
+        "SELECT remove_continuous_aggregate_policy('station_status_daily')"
+    )
+    op.execute(
+        "SELECT remove_continuous_aggregate_policy('station_status_hourly')"
+    )
+    op.execute("DROP MATERIALIZED VIEW station_status_daily")
+    op.execute("DROP MATERIALIZED VIEW station_status_hourly")
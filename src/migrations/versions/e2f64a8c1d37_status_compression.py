@@ -0,0 +1,76 @@
+"""status compression
+
+Revision ID: e2f64a8c1d37
+Revises: c7a3e91d5b20
+Create Date: 2026-10-18 16:22:03.517264
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import context, op
+
+from src.database.config import settings
+from src.database.maintenance import check_retention
+
+# revision identifiers, used by Alembic.
+revision: str = "e2f64a8c1d37"
+down_revision: Union[str, None] = "c7a3e91d5b20"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Applies to chunks created from now on
+    op.execute(
+        sa.text(
+            "SELECT set_chunk_time_interval("
+            "'station_status', CAST(CAST(:chunk AS text) AS interval))"
+        ).bindparams(chunk=settings.CHUNK_TIME_INTERVAL)
+    )
+    # A compressed chunk stores the statuses of a socket together, which
+    # repeat for long stretches and compress well
+    op.execute(
+        """
+        ALTER TABLE station_status SET (
+            timescaledb.compress,
+            timescaledb.compress_segmentby = 'station_socket_id',
+            timescaledb.compress_orderby = 'timestamp DESC'
+        )
+        """
+    )
+    op.execute(
+        sa.text(
+            "SELECT add_compression_policy('station_status', "
+            "compress_after => CAST(CAST(:after AS text) AS interval))"
+        ).bindparams(after=settings.COMPRESS_AFTER)
+    )
+    # Dropping raw chunks keeps the rollups as long as their refresh
+    # windows are shorter than the retention
+    if settings.RETENTION_AFTER:
+        if not context.is_offline_mode():
+            check_retention(op.get_bind(), settings.RETENTION_AFTER)
+        op.execute(
+            sa.text(
+                "SELECT add_retention_policy('station_status', "
+                "drop_after => CAST(CAST(:after AS text) AS interval))"
+            ).bindparams(after=settings.RETENTION_AFTER)
+        )
+
+
+def downgrade() -> None:
+    op.execute(
+        "SELECT remove_retention_policy('station_status', if_exists => true)"
+    )
+    op.execute(
+        "SELECT remove_compression_policy('station_status', if_exists => true)"
+    )
+    op.execute(
+        "SELECT decompress_chunk(chunk, if_compressed => true) "
+        "FROM show_chunks('station_status') AS chunk"
+    )
+    op.execute("ALTER TABLE station_status SET (timescaledb.compress = false)")
+    op.execute(
+        "SELECT set_chunk_time_interval('station_status', INTERVAL '7 days')"
+    )
@@ -1 +1,4 @@
+from .incremental import RowCache
+from .pool import ParserPool, make_parser_pool
+from .records import ParsedRow, SocketObservation, StationHeader
 from .station_parser import StationDataParser
@@ -0,0 +1,115 @@
+from typing import Iterator, List, NamedTuple
+
+import bs4
+import lxml.html
+from lxml import etree
+
+NUMBER_CELL = "text-center d-none d-md-table-cell col-2"
+ADDRESS_CELL = "text-center d-none d-md-table-cell col-4"
+NAME_CELL = "text-center col-4"
+STATUS_CELL = "text-center status col-2"
+
+
+class RowCells(NamedTuple):
+    """
+    Raw text of the cells of one station row.
+    """
+    number: str
+    address: str
+    name: str
+    statuses: List[str]
+
+
+def _has_classes(tag: bs4.Tag, cell_class: str) -> bool:
+    return tag.name == "td" and sorted(tag.get("class", ())) == sorted(cell_class.split())
+
+
+def _cell_text_bs4(station_row: bs4.Tag, cell_class: str) -> str:
+    cell = station_row.find(lambda tag: _has_classes(tag, cell_class))
+    return "" if cell is None else cell.text
+
+
+class Bs4Engine:
+    """
+    Extracts station rows from a BeautifulSoup tree.
+
+    Attributes:
+        soup (bs4.BeautifulSoup): BeautifulSoup object to parse HTML.
+    """
+
+    def __init__(self, page_html: str):
+        self.soup = bs4.BeautifulSoup(page_html, "lxml")
+
+    def rows(self) -> Iterator[RowCells]:
+        """
+        Yields the cells of every row of the first table body. A cell matches if it has exactly the classes
+        of its kind, in any order; a missing cell yields empty text.
+        """
+        for station_row in self.soup.tbody.find_all("tr"):
+            status_cell = station_row.find(lambda tag: _has_classes(tag, STATUS_CELL))
+            yield RowCells(
+                number=_cell_text_bs4(station_row, NUMBER_CELL),
+                address=_cell_text_bs4(station_row, ADDRESS_CELL),
+                name=_cell_text_bs4(station_row, NAME_CELL),
+                statuses=[] if status_cell is None else [span.text for span in status_cell.find_all("span")],
+            )
+
+    def prettify(self) -> str:
+        return self.soup.prettify()
+
+
+def _class_predicate(cell_class: str) -> str:
+    """
+    Builds an XPath predicate matching an element with exactly the given classes in any order, like
+    `_has_classes`: it has every class and as many classes as given.
+    """
+    classes = cell_class.split()
+    padded = "concat(' ', normalize-space(@class), ' ')"
+    spaces = "string-length(normalize-space(@class)) - string-length(translate(normalize-space(@class), ' ', ''))"
+    conditions = [f"contains({padded}, ' {name} ')" for name in classes]
+    conditions.append(f"{spaces} = {len(classes) - 1}")
+    return " and ".join(conditions)
+
+
+def _cell_text(cell_class: str) -> etree.XPath:
+    return etree.XPath(f"string((.//td[{_class_predicate(cell_class)}])[1])", smart_strings=False)
+
+
+class LxmlEngine:
+    """
+    Extracts station rows from an lxml tree with precompiled XPath expressions, without
+    building a BeautifulSoup tree. Returns the same cells as `Bs4Engine`.
+
+    Attributes:
+        tree (lxml.html.HtmlElement): The parsed document.
+    """
+
+    ROWS = etree.XPath("(//tbody)[1]//tr")
+    NUMBER = _cell_text(NUMBER_CELL)
+    ADDRESS = _cell_text(ADDRESS_CELL)
+    NAME = _cell_text(NAME_CELL)
+    STATUSES = etree.XPath(f"(.//td[{_class_predicate(STATUS_CELL)}])[1]//span")
+
+    def __init__(self, page_html: str):
+        self.tree = lxml.html.document_fromstring(page_html)
+
+    def rows(self) -> Iterator[RowCells]:
+        """
+        Yields the cells of every row of the first table body.
+        """
+        for station_row in self.ROWS(self.tree):
+            yield RowCells(
+                number=self.NUMBER(station_row),
+                address=self.ADDRESS(station_row),
+                name=self.NAME(station_row),
+                statuses=[span.text_content() for span in self.STATUSES(station_row)],
+            )
+
+    def prettify(self) -> str:
+        return etree.tostring(self.tree, pretty_print=True, encoding="unicode")
+
+
+ENGINES = {
+    "bs4": Bs4Engine,
+    "lxml": LxmlEngine,
+}
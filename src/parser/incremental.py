@@ -0,0 +1,55 @@
+import hashlib
+from typing import Dict, List, Tuple
+
+from .markup import table_body, table_rows
+from .records import ParsedRow
+
+
+class RowCache:
+    """
+    Parsed rows of the previous scrape of a page, keyed by a hash of each row's raw markup.
+    Kept by the caller between scrapes of the same page.
+
+    Attributes:
+        rows (dict): Row hash -> ParsedRow, holding only the rows of the last scrape.
+    """
+
+    def __init__(self):
+        self.rows: Dict[bytes, ParsedRow] = {}
+
+    @staticmethod
+    def row_hash(markup: str) -> bytes:
+        return hashlib.blake2b(markup.encode("utf-8"), digest_size=16).digest()
+
+    def diff(self, page_html: str) -> Tuple[List[bytes], Dict[bytes, str]] | None:
+        """
+        Splits the station table of the page into rows and finds the rows not parsed before.
+
+        Args:
+            page_html (str): The HTML content of the page.
+
+        Returns:
+            A tuple of the hashes of all rows in page order and the markup of new or changed rows
+            by hash, or None if the page has no table body.
+        """
+        body = table_body(page_html)
+        if body is None:
+            return None
+        markups = table_rows(body)
+        keys = [self.row_hash(markup) for markup in markups]
+        changed = {key: markup for key, markup in zip(keys, markups) if key not in self.rows}
+        return keys, changed
+
+    def update(self, keys: List[bytes], parsed: Dict[bytes, ParsedRow]) -> List[ParsedRow]:
+        """
+        Replaces the cached rows with the rows of the current scrape.
+
+        Args:
+            keys: The hashes of all rows in page order.
+            parsed: Newly parsed rows by hash.
+
+        Returns:
+            The parsed rows of the current scrape in page order.
+        """
+        self.rows = {key: parsed.get(key) or self.rows[key] for key in keys}
+        return [self.rows[key] for key in keys]
@@ -0,0 +1,39 @@
+import re
+
+TBODY = re.compile(r"<tbody\b[^>]*>(.*?)</tbody\s*>", re.IGNORECASE | re.DOTALL)
+WHITESPACE = re.compile(r"\s+")
+TR = re.compile(r"<tr\b.*?</tr\s*>", re.IGNORECASE | re.DOTALL)
+
+
+def table_body(page_html: str) -> str | None:
+    """
+    Returns the raw markup inside the first `<tbody>` of the page without parsing the document.
+
+    Args:
+        page_html (str): The HTML content of the page.
+
+    Returns:
+        str | None: The markup between the `<tbody>` tags, or None if the page has no table body.
+    """
+    match = TBODY.search(page_html)
+    return match.group(1) if match else None
+
+
+def normalize_markup(markup: str) -> str:
+    """
+    Collapses runs of white space, so formatting-only changes do not count as changes.
+    """
+    return WHITESPACE.sub(" ", markup).strip()
+
+
+def table_rows(body: str) -> list[str]:
+    """
+    Splits the markup of a table body into the raw markup of its `<tr>` rows.
+
+    Args:
+        body (str): The markup inside a `<tbody>`.
+
+    Returns:
+        list[str]: The markup of every row, from `<tr` to `</tr>`.
+    """
+    return TR.findall(body)
@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+from .engines import ADDRESS_CELL, ENGINES, NAME_CELL, NUMBER_CELL, STATUS_CELL
+from .records import ParsedRow
+from .station_parser import ParserEngine, StationDataParser
+
+logger = logging.getLogger(__name__)
+
+# Number of parser processes, 0 parses in threads of the main process instead
+PARSE_PROCESSES = int(os.getenv("PARSE_PROCESSES", 0))
+
+WARM_UP_PAGE = (
+    f'<table><tbody><tr><td class="{NUMBER_CELL}">№ 1</td><td class="{ADDRESS_CELL}">г. A, ул. B 1</td>'
+    f'<td class="{NAME_CELL}">C, 22 kWh</td><td class="{STATUS_CELL}"><span>Свободен Type 2</span></td>'
+    "</tr></tbody></table>"
+)
+
+
+def _init_worker() -> None:
+    """
+    Preloads a worker process: imports the engines and runs each of them once, so the first page
+    sent to the worker does not pay for imports, pattern compilation and XPath setup.
+    """
+    for engine in ENGINES:
+        StationDataParser(WARM_UP_PAGE, engine=engine).parse_rows()
+
+
+def parse_rows(page_html: str, engine: ParserEngine) -> Tuple[List[ParsedRow], Dict[str, int]]:
+    """
+    Parses the station rows of a page or table fragment in a worker process.
+
+    Args:
+        page_html (str): The HTML content to parse.
+        engine (str): Parser engine, "bs4" or "lxml".
+
+    Returns:
+        The timestamp-free rows in page order and the number of cells each field pattern failed to match.
+    """
+    parser = StationDataParser(page_html, engine=engine)
+    rows = parser.parse_rows()
+    return rows, parser.misses
+
+
+class ParserPool:
+    """
+    Pool of processes parsing pages off the event loop and on all cores. Only the page markup is sent
+    to a worker and only compact `ParsedRow` records come back; the observations are built by the caller.
+
+    Attributes:
+        processes (int): Number of worker processes.
+        executor (ProcessPoolExecutor): The pool, started on first use.
+    """
+
+    def __init__(self, processes: int = PARSE_PROCESSES):
+        self.processes = processes or os.cpu_count() or 1
+        # Workers are spawned, not forked: the main process runs an event loop and threads
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+
+    async def parse_rows(self, page_html: str, engine: ParserEngine) -> List[ParsedRow]:
+        """
+        Parses the station rows of a page in a worker process.
+
+        Args:
+            page_html (str): The HTML content to parse.
+            engine (str): Parser engine, "bs4" or "lxml".
+
+        Returns:
+            List[ParsedRow]: The rows in page order.
+        """
+        loop = asyncio.get_running_loop()
+        rows, misses = await loop.run_in_executor(self.executor, parse_rows, page_html, engine)
+        if any(misses.values()):
+            logger.warning(f"Cells without data to extract: {misses}")
+        return rows
+
+    def shutdown(self) -> None:
+        """
+        Stops the worker processes.
+        """
+        self.executor.shutdown(cancel_futures=True)
+
+
+def make_parser_pool(processes: int = PARSE_PROCESSES) -> ParserPool | None:
+    """
+    Creates the parser pool, or returns None if pages are parsed in threads (`processes` is 0).
+    """
+    return ParserPool(processes) if processes > 0 else None
@@ -0,0 +1,82 @@
+import datetime
+from dataclasses import dataclass
+from itertools import groupby
+from typing import Any, Dict, Iterable, Iterator, Tuple
+
+
+@dataclass(frozen=True, slots=True)
+class StationHeader:
+    """
+    Attributes shared by all sockets of one station row.
+    """
+    number: int | None
+    city: str | None
+    address: str
+    name: str
+    power: float | None
+
+    def info_row(self) -> Dict[str, Any]:
+        """
+        Returns the `station_info` columns of the station.
+        """
+        return {"number": self.number, "city": self.city, "address": self.address, "name": self.name}
+
+
+@dataclass(frozen=True, slots=True)
+class SocketObservation:
+    """
+    Status of one socket of a station at one point in time. Sockets of the same station
+    share a single `StationHeader` instance.
+    """
+    station: StationHeader
+    charger_port: int
+    socket: str
+    status: str | None
+    timestamp: datetime.datetime
+
+    def socket_row(self) -> Dict[str, Any]:
+        """
+        Returns the `station_socket` columns of the socket, without the station id.
+        """
+        return {"power": self.station.power, "socket": self.socket, "charger_port": self.charger_port}
+
+
+@dataclass(frozen=True, slots=True)
+class ParsedRow:
+    """
+    Timestamp-free result of parsing one station row: the station header and
+    the (status, socket, charger_port) triple of every socket.
+    """
+    station: StationHeader
+    sockets: Tuple[Tuple[str | None, str, int], ...]
+
+    def observations(self, timestamp: datetime.datetime) -> Iterator[SocketObservation]:
+        """
+        Yields the observations of the row at the given time.
+        """
+        for status, socket, charger_port in self.sockets:
+            yield SocketObservation(self.station, charger_port, socket, status, timestamp)
+
+    def to_list(self) -> list:
+        """
+        Returns the row as plain lists, e.g. to serialize it as JSON.
+        """
+        header = self.station
+        return [header.number, header.city, header.address, header.name, header.power, [list(s) for s in self.sockets]]
+
+    @classmethod
+    def from_list(cls, data: list) -> "ParsedRow":
+        """
+        Rebuilds a row from the output of `to_list`.
+        """
+        *header, sockets = data
+        return cls(StationHeader(*header), tuple(tuple(socket) for socket in sockets))
+
+    @classmethod
+    def from_observations(cls, observations: Iterable[SocketObservation]) -> Iterator["ParsedRow"]:
+        """
+        Groups the observations of one timestamp back into rows: consecutive observations
+        sharing a `StationHeader` form a row.
+        """
+        for station, group in groupby(observations, key=lambda observation: observation.station):
+            yield cls(station, tuple((o.status, o.socket, o.charger_port) for o in group))
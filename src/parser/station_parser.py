@@ -1,135 +1,263 @@
-import copy
+import asyncio
 import datetime
 import logging
-from typing import Any, Tuple
+from typing import TYPE_CHECKING, Iterator, Literal, Tuple, TypeAlias
 
-import bs4
+from .. import metrics
+from .engines import ENGINES, Bs4Engine, LxmlEngine, RowCells
+from .incremental import RowCache
+from .records import ParsedRow, SocketObservation, StationHeader
+from .text_processing import extract_field, split_first_word
 
-from .text_processing import TextDataExtractor
+if TYPE_CHECKING:
+    from .pool import ParserPool
 
 logger = logging.getLogger(__name__)
 
+ParserEngine: TypeAlias = Literal["bs4", "lxml"]
+
 
 class StationDataParser:
     """
-    A class to parse and extract data about charging stations from HTML content using BeautifulSoup.
+    A class to parse and extract data about charging stations from HTML content.
 
     Attributes:
-        soup (bs4.BeautifulSoup): BeautifulSoup object to parse HTML.
+        engine (Bs4Engine | LxmlEngine | None): Engine extracting the cells of the station rows of the
+                                                whole page; built by the first full parse in this process.
         status_timestamp (datetime.datetime): Timestamp when the status of the stations was last updated.
+        row_cache (RowCache | None): Rows of the previous scrape, enables incremental mode.
+        changed_stations (set[int]): Numbers of the stations of new or changed rows, set by `parse_data`.
+        misses (dict[str, int]): Cells each field pattern failed to match in the last parse, by field name.
+                                 Kept per parser, so pages parsed concurrently do not mix their counts.
     """
 
-    def __init__(self, page_html: str):
+    def __init__(
+        self,
+        page_html: str,
+        engine: ParserEngine = "bs4",
+        status_timestamp: datetime.datetime | None = None,
+        row_cache: RowCache | None = None,
+    ):
         """
         Initializes the StationDataParser with HTML content.
 
         Args:
             page_html (str): The HTML content to parse.
+            engine (str): "bs4" walks a BeautifulSoup tree, "lxml" runs precompiled XPath
+                          expressions against `lxml.html` directly. Both return the same records.
+            status_timestamp (datetime.datetime | None): Timestamp of the observations, defaults to now.
+            row_cache (RowCache | None): Rows parsed from the previous scrape of the same page. If given,
+                                         only new or changed rows are parsed and the cache is updated.
 
-        Raises:
-            Exception: If an error occurs while initializing the BeautifulSoup object.
+        The page is not parsed until `parse_data` (or `parse_data_async`) is called, which raises
+        if an error occurs while parsing the HTML content.
         """
+        self.page_html = page_html
+        self.engine_name = engine
+        self.row_cache = row_cache
+        self.engine: Bs4Engine | LxmlEngine | None = None
+        self.status_timestamp = status_timestamp or datetime.datetime.now()
+        self.changed_stations: set[int] = set()
+        self.misses: dict[str, int] = {}
+
+    def _create_engine(self, page_html: str) -> Bs4Engine | LxmlEngine:
         try:
-            self.soup = bs4.BeautifulSoup(page_html, "lxml")
+            return ENGINES[self.engine_name](page_html)
         except Exception as e:
-            logger.error(f"Error initializing BeautifulSoup: {e}")
+            logger.error(f"Error initializing {self.engine_name} parser engine: {e}")
             raise
-        self.status_timestamp = datetime.datetime.now()
 
-    def parse_data(self) -> list[dict[str, dict[str, Any]]]:
+    def parse_data(self) -> list[SocketObservation]:
         """
         Parses the HTML content and extracts structured data for each charging station.
 
         Returns:
-            list[dict[str, dict[str, Any]]]: A list of dictionaries where each dictionary represents
-                                             a charging station and contains detailed information organized
-                                             into 'info', 'socket', and 'status' categories.
+            list[SocketObservation]: One record per socket; sockets of the same station share
+                                     their `StationHeader`.
         """
-        stations = self.soup.tbody.find_all("tr")
-        return [station for station_row in stations for station in self._parse_station_row(station_row)]
+        self.misses = {}
+        try:
+            with metrics.parse_seconds.time():
+                rows = self._parse_incremental() if self.row_cache is not None else None
+                if rows is None:
+                    rows = self.parse_rows()
+                    self.changed_stations = {row.station.number for row in rows}
+                return self._observations(rows)
+        finally:
+            self._report_misses()
 
-    def _parse_station_row(self, station_row: bs4.element.Tag):
+    async def parse_data_async(self, pool: "ParserPool | None" = None) -> list[SocketObservation]:
         """
-        Parses a single row of station data and generates a dictionary for each station with its details.
+        Like `parse_data`, but off the event loop: the rows are parsed by a worker of the process pool
+        if one is given, otherwise the whole parse runs in a thread.
 
         Args:
-            station_row (bs4.element.Tag): The HTML tag containing data for a single station.
+            pool (ParserPool | None): Pool of parser processes.
 
-        Yields:
-            dict[str, dict[str, Any]]: A dictionary with detailed station data categorized into 'info',
-                                        'socket', and 'status'.
+        Returns:
+            list[SocketObservation]: One record per socket.
+        """
+        if pool is None:
+            return await asyncio.to_thread(self.parse_data)
+        with metrics.parse_seconds.time():
+            rows = None
+            if self.row_cache is not None:
+                diff = self.row_cache.diff(self.page_html)
+                if diff is not None:
+                    keys, changed = diff
+                    parsed = await pool.parse_rows(self._fragment(changed), self.engine_name) if changed else []
+                    rows = self._merge_incremental(keys, changed, parsed)
+            if rows is None:
+                rows = await pool.parse_rows(self.page_html, self.engine_name)
+                self.changed_stations = {row.station.number for row in rows}
+            return self._observations(rows)
+
+    def parse_rows(self) -> list[ParsedRow]:
+        """
+        Parses every station row of the page without a timestamp.
+
+        Returns:
+            list[ParsedRow]: The rows in page order.
+        """
+        if self.engine is None:
+            self.engine = self._create_engine(self.page_html)
+        self.misses = {}
+        return self._parse_rows(self.engine)
+
+    def _observations(self, rows: list[ParsedRow]) -> list[SocketObservation]:
+        observations = [station for row in rows for station in row.observations(self.status_timestamp)]
+        metrics.parse_rows.inc(len(rows))
+        metrics.parse_rows_parsed.inc(len(self.changed_stations))
+        metrics.parse_observations.inc(len(observations))
+        return observations
+
+    def _parse_rows(self, engine: Bs4Engine | LxmlEngine) -> list[ParsedRow]:
+        return [self._parse_station_row(cells) for cells in engine.rows()]
+
+    def _parse_incremental(self) -> list[ParsedRow] | None:
         """
-        station_ = {"info": {}, "socket": {}, "status": {}}
-        station_["info"]["number"], _ = self._extract_station_id(station_row)
-        station_["info"]["city"], station_["info"]["address"] = self._extract_location_details(station_row)
-        station_["socket"]["power"], station_["info"]["name"] = self._extract_power_and_name(station_row)
-        station_["status"]["timestamp"] = self.status_timestamp
+        Parses only the rows whose markup is not in the row cache and reuses the cached rows for the rest.
 
-        for el in self._extract_status_and_socket_types(station_row):
-            station = copy.deepcopy(station_)
-            station["status"]["status"], station["socket"]["socket"], station["socket"]["charger_port"] = el
-            yield station
+        Returns:
+            list[ParsedRow] | None: The rows of the page in order, or None if the page
+                                    could not be split into rows and has to be parsed as a whole.
+        """
+        diff = self.row_cache.diff(self.page_html)
+        if diff is None:
+            return None
+        keys, changed = diff
+        parsed = self._parse_rows(self._create_engine(self._fragment(changed))) if changed else []
+        return self._merge_incremental(keys, changed, parsed)
+
+    @staticmethod
+    def _fragment(changed: dict[bytes, str]) -> str:
+        return f"<table><tbody>{''.join(changed.values())}</tbody></table>"
+
+    def _merge_incremental(
+        self, keys: list[bytes], changed: dict[bytes, str], parsed: list[ParsedRow]
+    ) -> list[ParsedRow] | None:
+        """
+        Stores the newly parsed rows in the row cache.
+
+        Args:
+            keys (list[bytes]): The hashes of all rows of the page in order.
+            changed (dict[bytes, str]): The markup of the rows that were parsed, by hash.
+            parsed (list[ParsedRow]): The rows parsed from the markup of `changed`, in the same order.
+
+        Returns:
+            list[ParsedRow] | None: The rows of the page in order, or None if the page
+                                    could not be split into rows and has to be parsed as a whole.
+        """
+        if len(parsed) != len(changed):
+            logger.warning("Rows of the page could not be split reliably, parsing the whole page")
+            self.row_cache.rows.clear()
+            return None
+        self.changed_stations = {row.station.number for row in parsed}
+        logger.debug(f"Parsed {len(changed)} of {len(keys)} rows")
+        return self.row_cache.update(keys, dict(zip(changed, parsed)))
+
+    def _report_misses(self) -> None:
+        """
+        Logs how many cells of the page each field pattern failed to match.
+        """
+        if any(self.misses.values()):
+            logger.warning(f"Cells without data to extract: {self.misses}")
+
+    def _parse_station_row(self, station_row: RowCells) -> ParsedRow:
+        """
+        Parses a single row of station data into the station header and the state of each of its sockets.
+
+        Args:
+            station_row (RowCells): The text of the cells of a single station row.
+
+        Returns:
+            ParsedRow: The station and its (status, socket, charger_port) triples.
+        """
+        number, _ = self._extract_station_id(station_row.number, self.misses)
+        city, address = self._extract_location_details(station_row.address, self.misses)
+        power, name = self._extract_power_and_name(station_row.name, self.misses)
+        header = StationHeader(number=number, city=city, address=address, name=name, power=power)
+        return ParsedRow(header, tuple(self._extract_status_and_socket_types(station_row.statuses)))
 
     @staticmethod
-    def _extract_station_id(station_row: bs4.element.Tag) -> Tuple[int, str]:
+    def _extract_station_id(number_: str, misses: dict[str, int] | None = None) -> Tuple[int, str]:
         """
-        Extracts the station number from the given HTML row.
+        Extracts the station number from the text of the number cell.
 
         Args:
-            station_row (bs4.element.Tag): The HTML tag containing the station number.
+            number_ (str): The text containing the station number.
+            misses (dict[str, int] | None): Misses of the current parse, incremented if there is no number.
 
         Returns:
             Tuple[int, str]: A tuple containing the extracted station number and empty string.
         """
-        number_: str = station_row.find("td", class_="text-center d-none d-md-table-cell col-2").text
-        return TextDataExtractor(number_).extract_data(pattern=r"№ (\d+)", data_type=int)
+        return extract_field("station_number", number_, misses)
 
     @staticmethod
-    def _extract_location_details(station_row: bs4.element.Tag) -> Tuple[str, str]:
+    def _extract_location_details(address_: str, misses: dict[str, int] | None = None) -> Tuple[str, str]:
         """
-        Extracts the city and address of the station from the given HTML row.
+        Extracts the city and address of the station from the text of the address cell.
 
         Args:
-            station_row (bs4.element.Tag): The HTML tag containing the address data.
+            address_ (str): The text containing the address data.
+            misses (dict[str, int] | None): Misses of the current parse, incremented if there is no city.
 
         Returns:
             Tuple[str, str]: A tuple containing the city and address of the station.
         """
-        address_: str = station_row.find("td", class_="text-center d-none d-md-table-cell col-4").text
-        return TextDataExtractor(address_).extract_data(pattern=r"г\. ([\w\s-]+),")
+        return extract_field("city", address_, misses)
 
     @staticmethod
-    def _extract_power_and_name(station_row: bs4.element.Tag) -> Tuple[float, str]:
+    def _extract_power_and_name(name_: str, misses: dict[str, int] | None = None) -> Tuple[float, str]:
         """
-        Extracts the name and power specification of the station from the given HTML row.
+        Extracts the name and power specification of the station from the text of the name cell.
 
         Args:
-            station_row (bs4.element.Tag): The HTML tag containing the name and power data.
+            name_ (str): The text containing the name and power data.
+            misses (dict[str, int] | None): Misses of the current parse, incremented if there is no power.
 
         Returns:
             Tuple[float, str]: A tuple containing the power of the station in kWh and the name.
         """
-        name_: str = station_row.find("td", class_="text-center col-4").text
-        return TextDataExtractor(name_).extract_data(pattern=r", (\d+(\.\d+)?) kWh", data_type=float)
+        return extract_field("power", name_, misses)
 
     @staticmethod
-    def _extract_status_and_socket_types(station_row: bs4.element.Tag):
+    def _extract_status_and_socket_types(status_sockets: list[str]) -> Iterator[Tuple[str, str, int]]:
         """
-        Extracts the status and type of sockets available at the station from the given HTML row.
+        Extracts the status and type of sockets available at the station from the texts of the status cell.
 
         Args:
-            station_row (bs4.element.Tag): The HTML tag containing the status data.
+            status_sockets (list[str]): The text of every status element of the row.
 
         Yields:
-            Tuple[str, str]: Each tuple contains the status and the type of socket.
+            Tuple[str, str, int]: Each tuple contains the status, the type of socket and the charger port.
         """
-        status_socket_elements = station_row.find("td", class_="text-center status col-2").find_all("span")
-        for num, status_socket in enumerate(status_socket_elements, 1):
-            status, socket = TextDataExtractor(status_socket.text).split_at_word(word_index=0)
+        for num, status_socket in enumerate(status_sockets, 1):
+            status, socket = split_first_word(status_socket)
             yield status, socket, num
 
     def print_html_structure(self):
         """
-        Prints the prettified HTML content managed by BeautifulSoup. Useful for debugging.
+        Prints the prettified HTML content. Useful for debugging.
         """
-        print(self.soup.prettify())
+        print((self.engine or self._create_engine(self.page_html)).prettify())
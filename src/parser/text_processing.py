@@ -1,9 +1,142 @@
 import logging
 import re
-from typing import Any, Tuple, Type
+from functools import lru_cache
+from typing import Any, Dict, Tuple, Type
 
 logger = logging.getLogger(__name__)
 
+_LINE_BREAKS = str.maketrans("", "", "\n\r")
+
+
+def clean_text(text: str) -> str:
+    """
+    Strips leading and trailing white spaces and removes all newline and carriage return characters.
+    """
+    return text.strip().translate(_LINE_BREAKS)
+
+
+def safe_convert(data_type: Type[Any], data: str) -> Any | None:
+    """
+    Safely converts a string to a specified type, catching and logging conversion errors.
+
+    :param data_type: The type to which the data should be converted.
+    :param data: The string data to convert.
+    :return: The converted data or None if conversion fails.
+    """
+    try:
+        return data_type(data)
+    except (ValueError, TypeError) as e:
+        logger.error(f"Error during conversion: {e}")
+        return None
+
+
+def _extract(regex: re.Pattern, text: str, data_type: Type[Any] | None) -> Tuple[Any, str] | None:
+    """
+    Extracts the first group of the first match and removes every match from the text, scanning
+    the text once: up to the first match with `search`, and the rest with `sub`.
+
+    :return: A tuple of the extracted data and the remaining text, or None if there is no match.
+    """
+    match = regex.search(text)
+    if match is None:
+        return None
+    extracted_data = match.group(1).strip()
+    if data_type:
+        extracted_data = safe_convert(data_type, extracted_data)
+    remainder = text[:match.start()] + regex.sub("", text[match.end():])
+    return extracted_data, remainder.strip()
+
+
+class FieldPattern:
+    """
+    A named, precompiled pattern extracting one field from the raw text of a table cell.
+
+    Attributes:
+        name (str): Name of the field.
+        regex (re.Pattern): Compiled pattern; its first group is the extracted value.
+        data_type (type | None): Type the extracted value is converted to.
+        hits (int): Number of cells the pattern matched.
+        misses (int): Number of cells the pattern failed to match.
+    """
+
+    __slots__ = ("name", "regex", "data_type", "hits", "misses")
+
+    def __init__(self, name: str, pattern: str, data_type: Type[Any] | None = None):
+        self.name = name
+        self.regex = re.compile(pattern)
+        self.data_type = data_type
+        self.hits = 0
+        self.misses = 0
+
+    def extract(self, text: str, misses: Dict[str, int] | None = None) -> Tuple[Any, str]:
+        """
+        Extracts the field from raw cell text.
+
+        :param text: The raw text of the cell.
+        :param misses: Misses of the current parse by field name, counted besides the totals of the pattern.
+        :return: A tuple containing the extracted value (None if the pattern does not match)
+                 and the cleaned text with every match removed.
+        """
+        text = clean_text(text)
+        result = _extract(self.regex, text, self.data_type)
+        if result is None:
+            self.misses += 1
+            if misses is not None:
+                misses[self.name] = misses.get(self.name, 0) + 1
+            logger.debug(f"No {self.name} to extract from {text!r}")
+            return None, text
+        self.hits += 1
+        return result
+
+
+FIELDS: Dict[str, FieldPattern] = {
+    field.name: field
+    for field in (
+        FieldPattern("station_number", r"№ (\d+)", int),
+        FieldPattern("city", r"г\. ([\w\s-]+),"),
+        FieldPattern("power", r", (\d+(\.\d+)?) kWh", float),
+    )
+}
+
+
+def extract_field(name: str, text: str, misses: Dict[str, int] | None = None) -> Tuple[Any, str]:
+    """
+    Extracts a registered field from raw cell text.
+
+    :param name: Name of the field in `FIELDS`.
+    :param text: The raw text of the cell.
+    :param misses: Misses of the current parse by field name, incremented if the field is not found.
+    :return: A tuple containing the extracted value and the remaining text.
+    """
+    return FIELDS[name].extract(text, misses)
+
+
+def split_first_word(text: str) -> Tuple[str | None, str]:
+    """
+    Splits raw cell text into its first word and the remaining words.
+
+    :param text: The raw text of the cell.
+    :return: A tuple containing the first word (None if there are no words) and the remaining words.
+    """
+    text = clean_text(text)
+    words = text.split()
+    if not words:
+        return None, text
+    return words[0], " ".join(words[1:])
+
+
+def extraction_misses() -> Dict[str, int]:
+    """
+    Returns the number of cells every registered field failed to match so far in this process,
+    across all parses.
+    """
+    return {name: field.misses for name, field in FIELDS.items()}
+
+
+@lru_cache(maxsize=64)
+def _compile(pattern: str) -> re.Pattern:
+    return re.compile(pattern)
+
 
 class TextDataExtractor:
     def __init__(self, data: str):
@@ -15,7 +148,7 @@ class TextDataExtractor:
         Cleans the text by stripping leading and trailing white spaces and removing all occurrences
         of newline and carriage return characters from the data.
         """
-        self.data = self.data.strip().replace("\n", "").replace("\r", "")
+        self.data = clean_text(self.data)
 
     def extract_data(self, pattern: str, data_type: Type[Any] | None = None) -> Tuple[Any, str]:
         """
@@ -26,14 +159,12 @@ class TextDataExtractor:
         :param data_type: The type to which the extracted data should be converted, e.g., int or float.
         :return: A tuple containing the converted extracted data and the modified string after data removal.
         """
-        match = re.search(pattern, self.data)
-        if match:
-            extracted_data = match.group(1).strip()
-            if data_type:
-                extracted_data = self.safe_convert(data_type, data=extracted_data)
-            return extracted_data, self.remove_data(pattern=pattern)
-        logger.warning("No data to extract")
-        return None, self.data
+        result = _extract(_compile(pattern), self.data, data_type)
+        if result is None:
+            logger.warning("No data to extract")
+            return None, self.data
+        self.data = result[1]
+        return result
 
     def remove_data(self, pattern: str) -> str:
         """
@@ -42,7 +173,7 @@ class TextDataExtractor:
         :param pattern: The regex pattern to remove data.
         :return: The string after the data has been removed.
         """
-        self.data = re.sub(pattern, "", self.data).strip()
+        self.data = _compile(pattern).sub("", self.data).strip()
         return self.data
 
     def split_at_word(self, word_index: int) -> Tuple[str | None, str]:
@@ -73,9 +204,4 @@ class TextDataExtractor:
         """
         if data is None:
             data = self.data
-
-        try:
-            return data_type(data)
-        except (ValueError, TypeError) as e:
-            logger.error(f"Error during conversion: {e}")
-            return None
+        return safe_convert(data_type, data)
@@ -0,0 +1,194 @@
+import datetime
+import logging
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, List, Set
+
+from .database import StationOrmMethod
+from .fingerprint import FingerprintStore, page_fingerprint
+from .parser import ParserPool, RowCache, SocketObservation, StationDataParser
+from .parser.station_parser import ParserEngine
+from .web_loader import WebPageLoader
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class Snapshot:
+    """
+    A page of a source prepared for writing. A snapshot without observations repeats
+    the previous one under its own timestamp.
+    """
+    timestamp: datetime.datetime
+    # None if the server answered 304 Not Modified
+    fingerprint: str | None = None
+    observations: List[SocketObservation] | None = None
+    changed_stations: Set[int] = field(default_factory=set)
+    # Kept by a repeating snapshot in case there is nothing stored to repeat
+    page: str | None = None
+
+
+class SourcePipeline:
+    """
+    Fetches, parses and stores the station page of one source. Kept between ticks, so conditional
+    requests and page fingerprints can skip the work for an unchanged page.
+
+    Attributes:
+        url (str): URL of the station page.
+        engine (str): Parser engine, "bs4" or "lxml".
+        loader (WebPageLoader): Loader of the page.
+        fingerprints (FingerprintStore): Persisted state of the last stored page.
+        orm (StationOrmMethod): Writer of the parsed observations.
+        row_cache (RowCache | None): Rows of the previous scrape if only changed rows are parsed.
+        prepared_fingerprint (str | None): Fingerprint of the last parsed page, possibly not stored yet.
+        pool (ParserPool | None): Processes parsing the pages; pages are parsed in threads without it.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        engine: ParserEngine = "bs4",
+        fingerprints: FingerprintStore | None = None,
+        orm: StationOrmMethod | None = None,
+        incremental: bool = False,
+        pool: ParserPool | None = None,
+    ):
+        self.url = url
+        self.engine = engine
+        self.loader = WebPageLoader(url)
+        self.fingerprints = fingerprints or FingerprintStore()
+        self.orm = orm or StationOrmMethod()
+        self.row_cache = RowCache() if incremental else None
+        self.pool = pool
+        last = self.fingerprints.get(url)
+        self.prepared_fingerprint: str | None = last["fingerprint"] if last is not None else None
+
+    async def run(self, timestamp: datetime.datetime | None = None) -> None:
+        """
+        Runs one tick: fetches the page and stores its observations.
+
+        Args:
+            timestamp (datetime.datetime | None): Timestamp of the observations, defaults to now.
+        """
+        timestamp = timestamp or datetime.datetime.now()
+        page = await self.fetch()
+        await self.store(page, timestamp)
+
+    async def fetch(self) -> str | None:
+        """
+        Fetches the page of the source.
+
+        Returns:
+            str | None: The page, or None if it could not be fetched or is not modified.
+        """
+        return await self.loader.fetch_page()
+
+    async def store(self, page: str | None, timestamp: datetime.datetime) -> None:
+        """
+        Stores the observations of a fetched page.
+
+        Args:
+            page (str | None): The page returned by `fetch`.
+            timestamp (datetime.datetime): Timestamp of the observations.
+        """
+        snapshot = await self.prepare(page, timestamp, self.loader.not_modified)
+        if snapshot is not None:
+            await self.write([snapshot])
+
+    async def prepare(
+        self, page: str | None, timestamp: datetime.datetime, not_modified: bool = False
+    ) -> Snapshot | None:
+        """
+        Parses a fetched page into a snapshot. If the server answered 304 or the fingerprint of the station
+        table matches the last prepared page, the page is not parsed and the snapshot repeats the previous one.
+        Parsing runs off the event loop, in the parser pool if there is one.
+
+        Args:
+            page (str | None): The page returned by `fetch`.
+            timestamp (datetime.datetime): Timestamp of the observations.
+            not_modified (bool): Whether the server answered 304 Not Modified.
+
+        Returns:
+            Snapshot | None: The snapshot to write, or None if there is nothing to write.
+        """
+        if not_modified:
+            return Snapshot(timestamp) if self.prepared_fingerprint is not None else None
+        if not page:
+            return None
+
+        fingerprint = page_fingerprint(page)
+        if fingerprint == self.prepared_fingerprint:
+            return Snapshot(timestamp, fingerprint, page=page)
+        parser = StationDataParser(page, engine=self.engine, status_timestamp=timestamp, row_cache=self.row_cache)
+        observations = await parser.parse_data_async(self.pool)
+        self.prepared_fingerprint = fingerprint
+        return Snapshot(timestamp, fingerprint, observations, parser.changed_stations)
+
+    async def write(self, snapshots: List[Snapshot]) -> None:
+        """
+        Writes consecutive snapshots of the source with as few statements as possible. Parsed snapshots
+        and the snapshots repeating them are written with a single ingest; only snapshots repeating
+        an already stored page are written as server-side heartbeats.
+
+        Args:
+            snapshots (List[Snapshot]): Snapshots in the order they were prepared.
+        """
+        observations: List[SocketObservation] = []
+        changed_stations: Set[int] = set()
+        previous: List[SocketObservation] | None = None
+        fingerprint, timestamp = None, None
+        try:
+            for snapshot in snapshots:
+                if snapshot.observations is not None:
+                    previous = snapshot.observations
+                    observations.extend(previous)
+                    changed_stations |= snapshot.changed_stations
+                    fingerprint = snapshot.fingerprint
+                elif previous is not None:
+                    observations.extend(replace(observation, timestamp=snapshot.timestamp) for observation in previous)
+                else:
+                    await self._repeat(snapshot)
+                    continue
+                timestamp = snapshot.timestamp
+            if observations:
+                socket_ids = await self.orm.add_stations(observations, changed_stations=changed_stations)
+                self.fingerprints.save(self.url, fingerprint, timestamp, socket_ids)
+                logger.debug(f"Stored {len(observations)} observations of {self.url}")
+        except Exception:
+            # The next page is parsed and compared against the stored state again. Its rows were merged into
+            # the row cache when it was prepared, so they would count as unchanged and their attributes
+            # would never be upserted; the whole next page is parsed instead.
+            self.prepared_fingerprint = None
+            if self.row_cache is not None:
+                self.row_cache.rows.clear()
+            raise
+
+    async def _repeat(self, snapshot: Snapshot) -> None:
+        """
+        Writes a snapshot repeating the last stored page, parsing its page instead if that is not possible.
+        """
+        last = self.fingerprints.get(self.url)
+        if last is not None and snapshot.fingerprint in (None, last["fingerprint"]):
+            if await self._heartbeat(last, snapshot.timestamp):
+                return
+        if snapshot.page is None:
+            logger.warning(f"No stored statuses of {self.url} to repeat")
+            return
+        parser = StationDataParser(snapshot.page, engine=self.engine, status_timestamp=snapshot.timestamp)
+        observations = await parser.parse_data_async(self.pool)
+        socket_ids = await self.orm.add_stations(observations)
+        self.fingerprints.save(self.url, snapshot.fingerprint, snapshot.timestamp, socket_ids)
+
+    async def _heartbeat(self, last: Dict[str, Any], timestamp: datetime.datetime) -> bool:
+        """
+        Records the statuses of the last stored page under the new timestamp.
+
+        Returns:
+            bool: Whether anything could be recorded; if not, the page has to be parsed.
+        """
+        written = await self.orm.add_heartbeat(last["socket_ids"], last["timestamp"], timestamp)
+        if not written:
+            logger.info(f"No previous statuses of {self.url} to repeat, parsing the page")
+            return False
+        self.fingerprints.touch(self.url, timestamp)
+        logger.debug(f"Page of {self.url} unchanged, heartbeat recorded")
+        return True
@@ -1,11 +1,25 @@
+import argparse
+import csv
 import os
 from datetime import datetime
+from typing import Dict, Sequence, Tuple
 
 import pandas
 
+from .parser import SocketObservation
 
-def save_to_csv(data: dict, file_path: str = "test.csv") -> None:
-    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+WIDE_KEY_COLUMNS = ["station_number", "station_address", "station_name", "station_type"]
+INDEX_COLUMNS = ["key_id", "station_number", "station_address", "station_name", "charger_port", "station_type"]
+OBSERVATION_COLUMNS = ["timestamp", "key_id", "station_status"]
+
+SocketCsvKey = Tuple[int | None, str, str, int, str]
+
+
+def save_to_csv(data: dict | Sequence[SocketObservation], file_path: str = "test.csv") -> None:
+    if not isinstance(data, dict):
+        data = _observations_to_columns(data)
+    timestamp = datetime.now().strftime(TIMESTAMP_FORMAT)
     # Переименовываем столбец 'station_status' во временную метку
     data[timestamp] = data['station_status']
     del data['station_status']
@@ -16,6 +30,16 @@ def save_to_csv(data: dict, file_path: str = "test.csv") -> None:
         _create_new_file(data, file_path)
 
 
+def _observations_to_columns(observations: Sequence[SocketObservation]) -> dict:
+    return {
+        "station_number": [observation.station.number for observation in observations],
+        "station_address": [observation.station.address for observation in observations],
+        "station_name": [observation.station.name for observation in observations],
+        "station_type": [observation.socket for observation in observations],
+        "station_status": [observation.status for observation in observations],
+    }
+
+
 def _add_data_to_file(data: dict, file_path: str, timestamp: str):
     new_data_df = pandas.DataFrame(data)
     old_data_df = pandas.read_csv(file_path)
@@ -41,3 +65,98 @@ def _add_data_to_file(data: dict, file_path: str, timestamp: str):
 def _create_new_file(data: dict, file_path: str):
     df = pandas.DataFrame(data)
     df.to_csv(file_path, index=False, encoding='utf-8')
+
+
+class LongCsvWriter:
+    """
+    Incremental CSV export in long format. Instead of one wide file that gains a column per tick and is
+    rewritten every time, it keeps two append-only files in a directory:
+
+    - `stations.csv`, the keyed index: one row per socket with its `key_id`;
+    - `observations.csv`: one (timestamp, key_id, status) row per socket and tick.
+
+    A tick appends its rows and the index rows of new sockets only, so writing it takes the same time
+    however long the history is. `compact` builds the wide layout of `save_to_csv` on demand.
+
+    Attributes:
+        directory (str): Directory of the two files.
+        keys (dict): (number, address, name, charger port, socket) -> key_id of every indexed socket.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.index_path = os.path.join(directory, "stations.csv")
+        self.observations_path = os.path.join(directory, "observations.csv")
+        os.makedirs(directory, exist_ok=True)
+        self.keys: Dict[SocketCsvKey, int] = self._load_keys()
+
+    def _load_keys(self) -> Dict[SocketCsvKey, int]:
+        if not os.path.exists(self.index_path):
+            return {}
+        with open(self.index_path, "r", newline="", encoding="utf-8") as file:
+            # A station without a number is written as an empty cell and keyed with None, as on append
+            return {
+                (int(row["station_number"]) if row["station_number"] else None, row["station_address"],
+                 row["station_name"], int(row["charger_port"]), row["station_type"]): int(row["key_id"])
+                for row in csv.DictReader(file)
+            }
+
+    def append(self, observations: Sequence[SocketObservation]) -> None:
+        """
+        Appends the observations of one tick. Sockets not seen before are added to the index first,
+        so an observation never refers to a key missing from the index, even after a crash.
+
+        Args:
+            observations: The socket observations of a scrape; they are stored under their own timestamps.
+        """
+        new_keys, rows = [], []
+        for observation in observations:
+            station = observation.station
+            key = (station.number, station.address, station.name, observation.charger_port, observation.socket)
+            key_id = self.keys.get(key)
+            if key_id is None:
+                key_id = self.keys[key] = len(self.keys)
+                new_keys.append((key_id, *key))
+            rows.append((observation.timestamp.strftime(TIMESTAMP_FORMAT), key_id, observation.status))
+        if new_keys:
+            self._append_rows(self.index_path, INDEX_COLUMNS, new_keys)
+        self._append_rows(self.observations_path, OBSERVATION_COLUMNS, rows)
+
+    @staticmethod
+    def _append_rows(path: str, header: list, rows: list) -> None:
+        write_header = not os.path.exists(path)
+        with open(path, "a", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            if write_header:
+                writer.writerow(header)
+            writer.writerows(rows)
+
+    def compact(self, file_path: str) -> None:
+        """
+        Writes the wide layout of `save_to_csv`: one row per socket, in the order the sockets were first seen,
+        and one status column per timestamp, oldest first. A socket without an observation at a timestamp
+        has an empty cell there.
+
+        Args:
+            file_path: Path of the wide CSV file.
+        """
+        # Nullable integers, so a station without a number does not turn the other numbers into floats
+        index = pandas.read_csv(self.index_path, index_col="key_id", dtype={"station_number": "Int64"})
+        observations = pandas.read_csv(self.observations_path)
+        statuses = observations.drop_duplicates(["timestamp", "key_id"], keep="last").pivot(
+            index="key_id", columns="timestamp", values="station_status"
+        )
+        wide = index[WIDE_KEY_COLUMNS].join(statuses[sorted(statuses.columns)])
+        wide.to_csv(file_path, index=False, encoding="utf-8")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Builds the wide CSV layout from a long-format CSV export.")
+    parser.add_argument("directory", help="Directory of stations.csv and observations.csv")
+    parser.add_argument("output", help="Wide CSV file to write")
+    args = parser.parse_args()
+    LongCsvWriter(args.directory).compact(args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 import asyncio
+import datetime
 import logging
+from typing import Callable
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
@@ -7,22 +9,55 @@ from apscheduler.triggers.cron import CronTrigger
 scheduler = AsyncIOScheduler()
 logger = logging.getLogger(__name__)
 
+TICK_TRIGGER = CronTrigger(second="0")
+# Seconds a tick may start late; less than the minute between ticks
+TICK_GRACE_SECONDS = 30
 
-async def run_scheduler(job):
+
+def aligned_tick(now: datetime.datetime | None = None) -> datetime.datetime:
+    """
+    Returns the start of the current minute, the timestamp of the tick fired at it. A trigger firing
+    late by less than a minute still yields the minute it was scheduled for, so drift does not
+    accumulate in the stored timestamps.
+    """
+    return (now or datetime.datetime.now()).replace(second=0, microsecond=0)
+
+
+def scheduled_tick(now: datetime.datetime | None = None) -> datetime.datetime:
+    """
+    Returns the tick a job running at `now` was scheduled for. APScheduler does not pass the scheduled time
+    to the job, but it is the only fire time of the trigger within the misfire grace time before `now`,
+    since fire times are further apart; a job running late, or slightly early, still gets its own minute.
+    """
+    now = now or datetime.datetime.now(TICK_TRIGGER.timezone)
+    earliest = now - datetime.timedelta(seconds=TICK_GRACE_SECONDS)
+    scheduled = TICK_TRIGGER.get_next_fire_time(None, earliest)
+    return aligned_tick(scheduled.astimezone(TICK_TRIGGER.timezone).replace(tzinfo=None))
+
+
+async def _enqueue_tick(submit: Callable[[datetime.datetime], None]) -> None:
+    # A coroutine job runs on the event loop; a plain function would run on an executor thread,
+    # where the asyncio queues behind `submit` must not be touched
+    submit(scheduled_tick())
+
+
+async def run_scheduler(submit: Callable[[datetime.datetime], None]):
     """
-    Schedules and starts a job to be executed every minute at the beginning of the minute (when second is 0).
+    Enqueues a tick every minute at the beginning of the minute (when second is 0).
 
     Args:
-    job (coroutine function): The asynchronous function to be scheduled and run every minute.
+    submit (callable): Called with the minute-aligned timestamp of every tick; it only enqueues the tick,
+                       so a slow tick never makes the scheduler skip the next one.
 
     This function adds the job to the scheduler using a cron trigger that fires every minute when the seconds are '0'.
-    It then starts the scheduler to begin job execution. The function runs indefinitely until an interruption (like
-    KeyboardInterrupt or SystemExit) occurs, upon which it logs the shutdown message and exits gracefully.
+    It then starts the scheduler to begin job execution. The function runs indefinitely until it is cancelled or an
+    interruption (like KeyboardInterrupt or SystemExit) occurs, upon which it logs the shutdown message and stops
+    the scheduler.
     """
-    scheduler.add_job(job, CronTrigger(second="0"))
+    scheduler.add_job(_enqueue_tick, TICK_TRIGGER, args=[submit], misfire_grace_time=TICK_GRACE_SECONDS)
     scheduler.start()
     try:
-        await asyncio.sleep(3600)
-    except (KeyboardInterrupt, SystemExit):
+        await asyncio.Event().wait()
+    finally:
         logger.info("Stopping the scheduler ...")
         scheduler.shutdown()
@@ -0,0 +1,83 @@
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+SOURCES_FILE = os.getenv("SOURCES_FILE", "sources.json")
+
+
+@dataclass(frozen=True, slots=True)
+class Source:
+    """
+    One page to scrape every tick.
+    """
+    name: str
+    url: str
+    engine: str = "bs4"
+    incremental: bool = False
+
+    @property
+    def host(self) -> str:
+        return urlsplit(self.url).netloc
+
+
+def _expand(entry: Dict[str, Any], defaults: Dict[str, Any]) -> List[Source]:
+    """
+    Builds the sources of one registry entry. An entry with "pages" is a paginated listing whose
+    URL contains a `{page}` placeholder; it expands into one source per page.
+
+    Args:
+        entry: The registry entry: "url" and optionally "name", "pages", "engine" and "incremental".
+        defaults: Engine and incremental mode of entries that do not set them.
+
+    Returns:
+        The sources of the entry.
+    """
+    options = {**defaults, **{key: entry[key] for key in ("engine", "incremental") if key in entry}}
+    name = entry.get("name") or urlsplit(entry["url"]).netloc
+    pages = entry.get("pages")
+    if not pages:
+        return [Source(name=name, url=entry["url"], **options)]
+    return [
+        Source(name=f"{name}#{page}", url=entry["url"].format(page=page), **options)
+        for page in range(1, int(pages) + 1)
+    ]
+
+
+def load_sources(path: str = SOURCES_FILE) -> List[Source]:
+    """
+    Loads the source registry from a JSON file holding a list of entries, e.g.
+
+        [{"name": "almaty", "url": "https://example.com/almaty"},
+         {"name": "listing", "url": "https://example.com/list?page={page}", "pages": 3, "engine": "lxml"}]
+
+    Without the file a single source is built from the `URL` environment variable.
+
+    Args:
+        path (str): Path of the registry file.
+
+    Returns:
+        List[Source]: The sources to scrape.
+    """
+    defaults = {
+        "engine": os.getenv("PARSER_ENGINE", "bs4"),
+        "incremental": os.getenv("PARSER_INCREMENTAL", "False").lower() == "true",
+    }
+    if not os.path.exists(path):
+        url = os.getenv("URL")
+        if not url:
+            raise ValueError(f"Neither {path} nor the URL environment variable is set")
+        return [Source(name="default", url=url, **defaults)]
+
+    with open(path, encoding="utf-8") as file:
+        entries = json.load(file)
+    sources = [source for entry in entries for source in _expand(entry, defaults)]
+    names = [source.name for source in sources]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Source names in {path} are not unique")
+    logger.info(f"Loaded {len(sources)} sources from {path}")
+    return sources
@@ -0,0 +1,299 @@
+import asyncio
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Literal, Tuple, TypeAlias
+
+from . import metrics
+from .parser import ParsedRow
+from .pipeline import Snapshot, SourcePipeline
+
+logger = logging.getLogger(__name__)
+
+FsyncPolicy: TypeAlias = Literal["always", "interval", "never"]
+
+SPOOL_DIR = os.getenv("SPOOL_DIR", os.path.join(os.getenv("STATE_DIR", "data"), "spool"))
+# "always" syncs every append, "interval" at most every SPOOL_FSYNC_INTERVAL seconds, "never" leaves it to the OS
+SPOOL_FSYNC: FsyncPolicy = os.getenv("SPOOL_FSYNC", "interval")
+SPOOL_FSYNC_INTERVAL = float(os.getenv("SPOOL_FSYNC_INTERVAL", 1))
+SPOOL_SEGMENT_BYTES = int(os.getenv("SPOOL_SEGMENT_BYTES", 8 * 1024 * 1024))
+SPOOL_MAX_BYTES = int(os.getenv("SPOOL_MAX_BYTES", 1024 * 1024 * 1024))
+DRAIN_INTERVAL = float(os.getenv("DRAIN_INTERVAL", 5))
+DRAIN_BATCH_BYTES = int(os.getenv("DRAIN_BATCH_BYTES", 64 * 1024 * 1024))
+
+SEGMENT_SUFFIX = ".log"
+
+
+class SpoolFullError(Exception):
+    """
+    Raised when appending would grow the spool beyond its size limit.
+    """
+
+
+def encode_snapshot(source: str, snapshot: Snapshot) -> bytes:
+    """
+    Serializes a snapshot as one JSON line. Observations are stored grouped by station row, without
+    their timestamp, which is the timestamp of the snapshot. The page of a repeating snapshot is not kept.
+    """
+    entry: Dict[str, Any] = {
+        "source": source,
+        "spooled_at": time.time(),
+        "timestamp": snapshot.timestamp.isoformat(),
+        "fingerprint": snapshot.fingerprint,
+    }
+    if snapshot.observations is not None:
+        entry["changed"] = sorted(snapshot.changed_stations)
+        entry["rows"] = [row.to_list() for row in ParsedRow.from_observations(snapshot.observations)]
+    return json.dumps(entry, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def decode_snapshot(line: bytes) -> Tuple[str, float, Snapshot]:
+    """
+    Rebuilds a snapshot from the output of `encode_snapshot`.
+
+    Returns:
+        The source, the time it was spooled at (epoch seconds) and the snapshot.
+    """
+    entry = json.loads(line)
+    timestamp = datetime.datetime.fromisoformat(entry["timestamp"])
+    snapshot = Snapshot(timestamp, entry["fingerprint"])
+    if "rows" in entry:
+        rows = [ParsedRow.from_list(row) for row in entry["rows"]]
+        snapshot.observations = [observation for row in rows for observation in row.observations(timestamp)]
+        snapshot.changed_stations = set(entry["changed"])
+    return entry["source"], entry["spooled_at"], snapshot
+
+
+class Spool:
+    """
+    Append-only log of snapshots on local disk, split into numbered segment files. Snapshots are appended
+    to the active segment; a full segment is sealed and a new one started. Sealed segments are replayed
+    into the database by `SpoolDrainer` and deleted once committed. Appends do blocking file IO and are
+    run in threads, so the segment files are only touched under a lock.
+
+    Attributes:
+        directory (str): Directory of the segment files.
+        fsync (str): "always", "interval" or "never".
+        fsync_interval (float): Seconds between syncs of the "interval" policy.
+        segment_bytes (int): Size at which the active segment is sealed.
+        max_bytes (int): Size limit of all segments together.
+    """
+
+    def __init__(
+        self,
+        directory: str = SPOOL_DIR,
+        fsync: FsyncPolicy = SPOOL_FSYNC,
+        fsync_interval: float = SPOOL_FSYNC_INTERVAL,
+        segment_bytes: int = SPOOL_SEGMENT_BYTES,
+        max_bytes: int = SPOOL_MAX_BYTES,
+    ):
+        if fsync not in ("always", "interval", "never"):
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+        self.directory = directory
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._file = None
+        self._synced_at = 0.0
+        self._lock = threading.Lock()
+        segments = self.segments()
+        self._sequence = self._number(segments[-1]) + 1 if segments else 0
+        self._size = sum(os.path.getsize(path) for path in segments)
+
+    def append(self, source: str, snapshot: Snapshot) -> None:
+        """
+        Appends a snapshot to the active segment and syncs it according to the fsync policy.
+
+        Raises:
+            SpoolFullError: If the spool has reached its size limit.
+        """
+        line = encode_snapshot(source, snapshot)
+        with self._lock:
+            if self._size + len(line) > self.max_bytes:
+                raise SpoolFullError(f"Spool {self.directory} is full ({self._size} bytes)")
+            if self._file is None:
+                self._file = open(self._path(self._sequence), "ab")
+            self._file.write(line)
+            self._size += len(line)
+            self._flush()
+            if self._file.tell() >= self.segment_bytes:
+                self._seal()
+
+    def seal(self) -> None:
+        """
+        Closes the active segment, so it can be replayed, and starts a new one on the next append.
+        """
+        with self._lock:
+            self._seal()
+
+    def _seal(self) -> None:
+        if self._file is None:
+            return
+        self._file.flush()
+        if self.fsync != "never":
+            os.fsync(self._file.fileno())
+        self._file.close()
+        self._file = None
+        self._sequence += 1
+
+    def segments(self) -> List[str]:
+        """
+        Returns the paths of all segments, oldest first.
+        """
+        names = sorted(name for name in os.listdir(self.directory) if name.endswith(SEGMENT_SUFFIX))
+        return [os.path.join(self.directory, name) for name in names]
+
+    def sealed_segments(self) -> List[str]:
+        """
+        Returns the paths of the segments that are not written to any more, oldest first.
+        """
+        with self._lock:
+            active = self._path(self._sequence) if self._file is not None else None
+            return [path for path in self.segments() if path != active]
+
+    @staticmethod
+    def read(path: str) -> Iterator[Tuple[str, float, Snapshot]]:
+        """
+        Reads the snapshots of a segment. A torn last line, left by a crash during an append, is skipped.
+        """
+        with open(path, "rb") as file:
+            for number, line in enumerate(file, 1):
+                try:
+                    yield decode_snapshot(line)
+                except (ValueError, KeyError, TypeError) as e:
+                    logger.warning(f"Skipping unreadable entry {number} of spool segment {path}: {e}")
+
+    def remove(self, path: str) -> None:
+        """
+        Deletes a replayed segment.
+        """
+        size = os.path.getsize(path)
+        os.remove(path)
+        with self._lock:
+            self._size -= size
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def close(self) -> None:
+        self.seal()
+
+    def _flush(self) -> None:
+        self._file.flush()
+        if self.fsync == "always" or (
+            self.fsync == "interval" and time.monotonic() - self._synced_at >= self.fsync_interval
+        ):
+            os.fsync(self._file.fileno())
+            self._synced_at = time.monotonic()
+
+    def _path(self, sequence: int) -> str:
+        return os.path.join(self.directory, f"{sequence:012d}{SEGMENT_SUFFIX}")
+
+    @staticmethod
+    def _number(path: str) -> int:
+        return int(os.path.basename(path)[:-len(SEGMENT_SUFFIX)])
+
+
+class SpoolDrainer:
+    """
+    Replays the sealed segments of a spool into the database in large batches. The snapshots of
+    a batch are written per source, in order, with one ingest per source, and the segments are
+    deleted only after every write of the batch has been committed. Replaying a segment again
+    after a crash is harmless: status rows conflicting with stored ones are skipped.
+
+    Attributes:
+        spool (Spool): The spool to drain.
+        pipelines (dict): Source name -> SourcePipeline writing the snapshots of the source.
+        interval (float): Seconds between drain rounds when the spool is idle or the database fails.
+        batch_bytes (int): Segment bytes replayed per batch.
+        lag (float): Age in seconds of the oldest snapshot not yet replayed, 0 if the spool is drained.
+    """
+
+    def __init__(
+        self,
+        spool: Spool,
+        pipelines: Dict[str, SourcePipeline],
+        interval: float = DRAIN_INTERVAL,
+        batch_bytes: int = DRAIN_BATCH_BYTES,
+    ):
+        self.spool = spool
+        self.pipelines = pipelines
+        self.interval = interval
+        self.batch_bytes = batch_bytes
+        self.lag = 0.0
+
+    async def run(self) -> None:
+        """
+        Drains the spool until cancelled.
+        """
+        while True:
+            try:
+                drained = await self.drain()
+            except Exception as e:
+                logger.error(f"Replaying the spool failed, retrying in {self.interval:.0f}s: {e!r}")
+                drained = False
+            if not drained:
+                await asyncio.sleep(self.interval)
+
+    async def drain(self) -> bool:
+        """
+        Replays one batch of sealed segments. Once they are all replayed, the active segment is sealed,
+        so a healthy database keeps up with the spool within one drain interval.
+
+        Returns:
+            bool: Whether a batch was replayed; False if the spool was empty.
+
+        Raises:
+            Exception: If a write fails; the segments of the batch are kept and replayed again.
+        """
+        sealed = self.spool.sealed_segments()
+        if not sealed:
+            await asyncio.to_thread(self.spool.seal)
+            sealed = self.spool.sealed_segments()
+        batch, size = [], 0
+        for path in sealed:
+            if batch and size + os.path.getsize(path) > self.batch_bytes:
+                break
+            batch.append(path)
+            size += os.path.getsize(path)
+        metrics.spool_bytes.set(self.spool.size)
+        if not batch:
+            self.lag = 0.0
+            metrics.spool_lag_seconds.set(self.lag)
+            return False
+
+        snapshots, oldest = await asyncio.to_thread(self._read_batch, batch)
+        self.lag = time.time() - oldest if oldest is not None else 0.0
+        metrics.spool_lag_seconds.set(self.lag)
+        logger.info(f"Replaying {len(batch)} spool segments, {size} bytes, lag {self.lag:.1f}s")
+
+        for source, pending in snapshots.items():
+            pipeline = self.pipelines.get(source)
+            if pipeline is None:
+                logger.warning(f"Dropping {len(pending)} spooled snapshots of unknown source {source}")
+                continue
+            await pipeline.write(pending)
+        for path in batch:
+            self.spool.remove(path)
+        return True
+
+    def _read_batch(self, batch: List[str]) -> Tuple[Dict[str, List[Snapshot]], float | None]:
+        """
+        Reads the snapshots of the given segments grouped by source, in order.
+
+        Returns:
+            The snapshots by source and the time the oldest of them was spooled at, None if there are none.
+        """
+        snapshots: Dict[str, List[Snapshot]] = {}
+        oldest = None
+        for path in batch:
+            for source, spooled_at, snapshot in self.spool.read(path):
+                oldest = spooled_at if oldest is None else min(oldest, spooled_at)
+                snapshots.setdefault(source, []).append(snapshot)
+        return snapshots, oldest
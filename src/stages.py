@@ -0,0 +1,202 @@
+import asyncio
+import datetime
+import logging
+import os
+import time
+from typing import Dict, List, Set, Tuple
+
+from . import metrics
+from .coordinator import ScrapeCoordinator
+from .pipeline import Snapshot
+from .sources import Source
+from .spool import Spool, SpoolDrainer
+
+logger = logging.getLogger(__name__)
+
+FETCH_WORKERS = int(os.getenv("FETCH_WORKERS", 8))
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", 2))
+STORE_WORKERS = int(os.getenv("STORE_WORKERS", 1))
+STAGE_QUEUE_SIZE = int(os.getenv("STAGE_QUEUE_SIZE", 32))
+
+FetchJob = Tuple[str, datetime.datetime]
+ParseJob = Tuple[str, datetime.datetime, str | None, bool]
+StoreJob = Tuple[str, Snapshot]
+
+
+class StagedScraper(ScrapeCoordinator):
+    """
+    Runs fetching, parsing and storing as independent stages connected by bounded queues, so a slow
+    database write does not delay the next fetch. Each stage has its own number of workers.
+
+    When a stage falls behind, its full queue blocks the stage before it: pending ticks are replaced by
+    the newest one, jobs of replaced ticks are skipped and the store stage writes all snapshots
+    queued for a source with one ingest. Parse and store queues are sharded by source, so the snapshots
+    of a source are always prepared and written in order.
+
+    With a spool, the store stage only appends the snapshots to it and a drainer replays them into the
+    database, so observations survive a slow or unreachable database.
+
+    Attributes:
+        ticks (asyncio.Queue): The tick waiting to be dispatched; holds at most one.
+        fetch_queue (asyncio.Queue): (source, timestamp) jobs of the fetch stage.
+        parse_queues (list): Per parse worker queue of fetched pages.
+        store_queues (list): Per store worker queue of prepared snapshots.
+        fetching (set): Sources being fetched.
+        latest_tick (datetime.datetime | None): Timestamp of the last submitted tick.
+        spool (Spool | None): Durable log the store stage appends to instead of writing to the database.
+        drainer (SpoolDrainer | None): Replays the spool into the database.
+    """
+
+    def __init__(
+        self,
+        sources: List[Source],
+        fetch_workers: int = FETCH_WORKERS,
+        parse_workers: int = PARSE_WORKERS,
+        store_workers: int = STORE_WORKERS,
+        queue_size: int = STAGE_QUEUE_SIZE,
+        spool: Spool | None = None,
+        **kwargs,
+    ):
+        super().__init__(sources, **kwargs)
+        self.fetch_workers = fetch_workers
+        self.ticks: asyncio.Queue[datetime.datetime] = asyncio.Queue(maxsize=1)
+        self.fetch_queue: asyncio.Queue[FetchJob] = asyncio.Queue(maxsize=queue_size)
+        self.parse_queues: List[asyncio.Queue[ParseJob]] = [asyncio.Queue(maxsize=queue_size)
+                                                            for _ in range(parse_workers)]
+        self.store_queues: List[asyncio.Queue[StoreJob]] = [asyncio.Queue(maxsize=queue_size)
+                                                            for _ in range(store_workers)]
+        self.shards: Dict[str, int] = {name: index for index, name in enumerate(self.pipelines)}
+        self.fetching: Set[str] = set()
+        self.latest_tick: datetime.datetime | None = None
+        self.tasks: List[asyncio.Task] = []
+        self.spool = spool
+        self.drainer = SpoolDrainer(spool, self.pipelines) if spool is not None else None
+
+    def submit(self, timestamp: datetime.datetime) -> None:
+        """
+        Enqueues a tick without waiting. A tick still waiting for dispatch is stale and replaced.
+
+        Args:
+            timestamp (datetime.datetime): Timestamp of the observations of the tick.
+        """
+        metrics.ticks.inc()
+        if self.ticks.full():
+            stale = self.ticks.get_nowait()
+            self.ticks.task_done()
+            metrics.ticks_dropped.inc()
+            logger.warning(f"Tick {stale:%H:%M} dropped, the pipeline is behind")
+        self.ticks.put_nowait(timestamp)
+        self.latest_tick = timestamp
+
+    async def start(self) -> None:
+        """
+        Starts the workers of all stages.
+        """
+        self.tasks = [
+            asyncio.create_task(self._dispatch()),
+            *(asyncio.create_task(self._fetch_worker()) for _ in range(self.fetch_workers)),
+            *(asyncio.create_task(self._parse_worker(queue)) for queue in self.parse_queues),
+            *(asyncio.create_task(self._store_worker(queue)) for queue in self.store_queues),
+        ]
+        if self.drainer is not None:
+            self.tasks.append(asyncio.create_task(self.drainer.run()))
+
+    async def join(self) -> None:
+        """
+        Waits until every submitted tick has been fetched, parsed and stored, or appended to the spool.
+        """
+        await self.ticks.join()
+        await self.fetch_queue.join()
+        for queue in (*self.parse_queues, *self.store_queues):
+            await queue.join()
+
+    async def stop(self) -> None:
+        """
+        Cancels the workers; snapshots not written yet are lost unless they are in the spool.
+        """
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        if self.spool is not None:
+            self.spool.close()
+
+    async def _dispatch(self) -> None:
+        while True:
+            timestamp = await self.ticks.get()
+            # Stages overlap, so the summary covers the work done since the previous tick was dispatched
+            metrics.registry.log_summary("tick")
+            for name in self.pipelines:
+                await self.fetch_queue.put((name, timestamp))
+            self.ticks.task_done()
+
+    async def _fetch_worker(self) -> None:
+        while True:
+            name, timestamp = await self.fetch_queue.get()
+            if timestamp < self.latest_tick or name in self.fetching:
+                metrics.source_ticks_skipped.inc()
+                logger.warning(f"Source {name} is behind, skipping tick {timestamp:%H:%M}")
+                self.fetch_queue.task_done()
+                continue
+            self.fetching.add(name)
+            try:
+                pipeline = self.pipelines[name]
+                started = time.perf_counter()
+                async with self._semaphore(self.sources[name].host):
+                    page = await asyncio.wait_for(pipeline.fetch(), self.timeout)
+                logger.debug(f"Source {name}: fetch {time.perf_counter() - started:.3f}s")
+                job = (name, timestamp, page, pipeline.loader.not_modified)
+                await self.parse_queues[self.shards[name] % len(self.parse_queues)].put(job)
+            except asyncio.TimeoutError:
+                metrics.source_errors.inc(stage="fetch")
+                logger.error(f"Source {name} failed: fetch timed out after {self.timeout:.0f}s")
+            except Exception as e:
+                metrics.source_errors.inc(stage="fetch")
+                logger.error(f"Source {name} failed: {e!r}")
+            finally:
+                self.fetching.discard(name)
+                self.fetch_queue.task_done()
+
+    async def _parse_worker(self, queue: asyncio.Queue[ParseJob]) -> None:
+        while True:
+            name, timestamp, page, not_modified = await queue.get()
+            try:
+                started = time.perf_counter()
+                snapshot = await self.pipelines[name].prepare(page, timestamp, not_modified)
+                logger.debug(f"Source {name}: parse {time.perf_counter() - started:.3f}s")
+                if snapshot is not None:
+                    await self.store_queues[self.shards[name] % len(self.store_queues)].put((name, snapshot))
+            except Exception as e:
+                metrics.source_errors.inc(stage="parse")
+                logger.error(f"Source {name} failed: {e!r}")
+            finally:
+                queue.task_done()
+
+    async def _store_worker(self, queue: asyncio.Queue[StoreJob]) -> None:
+        while True:
+            jobs = [await queue.get()]
+            while not queue.empty():
+                jobs.append(queue.get_nowait())
+            snapshots: Dict[str, List[Snapshot]] = {}
+            for name, snapshot in jobs:
+                snapshots.setdefault(name, []).append(snapshot)
+            if len(jobs) > len(snapshots):
+                logger.info(f"Store stage behind, coalesced {len(jobs)} snapshots into {len(snapshots)} writes")
+            for name, pending in snapshots.items():
+                await self._store(name, pending)
+            for _ in jobs:
+                queue.task_done()
+
+    async def _store(self, name: str, snapshots: List[Snapshot]) -> None:
+        started = time.perf_counter()
+        try:
+            if self.spool is not None:
+                # Appending writes and possibly syncs a file, which must not block fetching and parsing
+                for snapshot in snapshots:
+                    await asyncio.to_thread(self.spool.append, name, snapshot)
+            else:
+                await self.pipelines[name].write(snapshots)
+        except Exception as e:
+            metrics.source_errors.inc(stage="store")
+            logger.error(f"Source {name} failed: {e!r}")
+        logger.debug(f"Source {name}: store {time.perf_counter() - started:.3f}s")
@@ -1,41 +1,97 @@
+import asyncio
 import logging
 import os
+import random
+import time
 
-import requests
+import httpx
+
+from . import metrics
 
 logger = logging.getLogger(__name__)
 
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5))
+READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", 20))
+# Time a fetch may take including retries, leaving the rest of the one-minute tick for parsing and storing
+FETCH_BUDGET = float(os.getenv("FETCH_BUDGET", 40))
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def _create_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+        limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=120),
+        follow_redirects=True,
+    )
+
 
 class WebPageLoader:
-    def __init__(self, url: str):
+    headers = {
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,"
+                  "image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
+        "Accept-Encoding": "gzip, deflate, br",
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                      "(KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36"
+    }
+    _shared_client: httpx.AsyncClient | None = None
+
+    def __init__(self, url: str, client: httpx.AsyncClient | None = None, budget: float = FETCH_BUDGET):
         """
-        Initializes the WebPageLoader with a specific URL.
+        Initializes the WebPageLoader with a specific URL. The loader remembers the validators of the
+        last response, so it should be kept between ticks.
 
         Args:
             url (str): The URL of the web page to be fetched.
+            client (httpx.AsyncClient | None): HTTP client to use; defaults to the process-wide pooled client.
+            budget (float): Seconds a fetch may take including retries.
         """
         self.url = url
         self.debug = os.getenv("DEBUG", False)
+        self.client = client
+        self.budget = budget
+        self.etag: str | None = None
+        self.last_modified: str | None = None
+        self.not_modified = False
+
+    @classmethod
+    def shared_client(cls) -> httpx.AsyncClient:
+        """
+        Returns the process-wide HTTP client, creating it on first use. The client keeps
+        connections alive between ticks, so TCP/TLS handshakes are not repeated every minute.
+        """
+        if cls._shared_client is None or cls._shared_client.is_closed:
+            cls._shared_client = _create_client()
+        return cls._shared_client
+
+    @classmethod
+    async def close_client(cls) -> None:
+        """
+        Closes the process-wide HTTP client and its pooled connections.
+        """
+        if cls._shared_client is not None:
+            await cls._shared_client.aclose()
 
-    def fetch_page(self) -> str:
+    async def fetch_page(self) -> str | None:
         """
         Fetches a web page from the URL specified during the initialization. If in debug mode,
         it reduces the number of requests by caching the result to a local file (index.html).
         Subsequent calls read from this cached file to avoid additional requests.
 
         Returns:
-            str: The content of the web page, either from a live fetch or from the cache.
+            str | None: The content of the web page, either from a live fetch or from the cache.
         """
         file_path = "index.html"
         if self.debug:
             logger.warning("DEBUG mode is active!!!")
             if not os.path.exists(file_path):
-                data = self.load_page()
+                data = await self.load_page()
                 if data:
                     self._write_html(data, file_path)
                 return data
             return self._read_html(file_path)
-        return self.load_page()
+        return await self.load_page()
 
     @staticmethod
     def _write_html(response: str, file_path: str):
@@ -63,25 +119,73 @@ class WebPageLoader:
         with open(file_path, "r", encoding="utf-8") as file:
             return file.read()
 
-    def load_page(self) -> str | None:
+    async def load_page(self) -> str | None:
         """
-        Loads a web page from the internet using HTTP GET. It uses custom headers
-        to simulate a browser request.
+        Loads a web page from the internet using a conditional HTTP GET over the pooled client.
+        Transport errors, timeouts and 429/5xx responses are retried with jittered exponential
+        backoff as long as the retry still fits into the fetch budget.
 
         Returns:
-            str | None: The content of the web page if the request is successful; None otherwise.
-        """
-        headers = {
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,"
-                      "image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-                          "(KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36"
-        }
+            str | None: The content of the web page if the request is successful; None if the request
+                        failed or the page has not been modified since the last fetch (`not_modified` is set).
+        """
+        self.not_modified = False
+        deadline = time.monotonic() + self.budget
+        attempt = 0
+        with metrics.fetch_seconds.time():
+            while True:
+                try:
+                    return await self._get(deadline)
+                except httpx.HTTPError as e:
+                    delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+                    if not self._retryable(e) or time.monotonic() + delay >= deadline:
+                        logger.warning(f"An error occurred during the request: {e!r}")
+                        return None
+                    logger.info(f"Retrying in {delay:.1f}s after an error: {e!r}")
+                    metrics.fetch_retries.inc()
+                    await asyncio.sleep(delay)
+                    attempt += 1
+
+    async def _get(self, deadline: float) -> str | None:
+        """
+        Performs a single conditional GET request, bounded by the remaining fetch budget.
+
+        Raises:
+            httpx.HTTPError: If the request fails or the response has an error status.
+        """
+        remaining = max(deadline - time.monotonic(), 0.1)
+        timeout = httpx.Timeout(min(READ_TIMEOUT, remaining), connect=min(CONNECT_TIMEOUT, remaining))
         try:
-            response = requests.get(self.url, headers=headers)
-            logger.debug(f"Response status code: {response.status_code}")
-            response.raise_for_status()  # Raises HTTPError for bad responses
-            return response.text
-        except requests.RequestException as e:
-            logger.warning(f"An error occurred during the request: {e}")
+            response = await (self.client or self.shared_client()).get(
+                self.url, headers=self._headers(), timeout=timeout
+            )
+        except httpx.TransportError:
+            metrics.fetch_errors.inc()
+            raise
+        logger.debug(f"Response status code: {response.status_code}")
+        metrics.fetch_responses.inc(code=response.status_code)
+        metrics.fetch_bytes.inc(response.num_bytes_downloaded)
+        if response.status_code == httpx.codes.NOT_MODIFIED:
+            self.not_modified = True
             return None
+        response.raise_for_status()  # Raises HTTPStatusError for bad responses
+        self.etag = response.headers.get("ETag")
+        self.last_modified = response.headers.get("Last-Modified")
+        return response.text
+
+    def _headers(self) -> dict[str, str]:
+        """
+        Returns the request headers including the validators of the last response.
+        """
+        headers = dict(self.headers)
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    @staticmethod
+    def _retryable(error: httpx.HTTPError) -> bool:
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code in RETRY_STATUSES
+        return isinstance(error, httpx.TransportError)
@@ -0,0 +1,6 @@
+import os
+
+# Importing `src` loads the database settings; the parser tests never connect
+for name, value in {"POSTGRES_USER": "postgres", "POSTGRES_PASSWORD": "postgres", "DB_HOST": "localhost",
+                    "DB_PORT": "5432", "POSTGRES_DB": "postgres"}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,64 @@
+import datetime
+import pathlib
+
+import pytest
+
+from src.parser import StationDataParser, StationHeader
+
+PAGE = pathlib.Path(__file__).parent / "data" / "station_page.html"
+TIMESTAMP = datetime.datetime(2024, 1, 1, 12, 0)
+
+
+@pytest.fixture(scope="module")
+def page_html() -> str:
+    return PAGE.read_text(encoding="utf-8")
+
+
+def parse(page_html: str, engine: str):
+    return StationDataParser(page_html, engine=engine, status_timestamp=TIMESTAMP).parse_data()
+
+
+def test_engines_return_the_same_observations(page_html):
+    assert parse(page_html, "bs4") == parse(page_html, "lxml")
+
+
+@pytest.mark.parametrize("engine", ["bs4", "lxml"])
+def test_regular_row(page_html, engine):
+    observations = [o for o in parse(page_html, engine) if o.station.number == 101]
+
+    assert [(o.charger_port, o.status, o.socket) for o in observations] == [
+        (1, "Занят", "GB/T"),
+        (2, "Свободен", "Type 2"),
+    ]
+    assert observations[0].station == StationHeader(101, "Алматы", "ул. Абая 1, д. 1", "ТРЦ Мега 1", 22.0)
+    assert observations[0].timestamp == TIMESTAMP
+
+
+@pytest.mark.parametrize("engine", ["bs4", "lxml"])
+def test_extra_whitespace_and_reordered_classes(page_html, engine):
+    observations = [o for o in parse(page_html, engine) if o.station.number == 103]
+
+    assert [(o.status, o.socket) for o in observations] == [("Занят", "CHAdeMO")]
+    assert observations[0].station == StationHeader(103, "Нур-Султан", "ул. Абая 3, д. 1", "ТРЦ Мега 3", 60.0)
+
+
+@pytest.mark.parametrize("engine", ["bs4", "lxml"])
+def test_missing_cells(page_html, engine):
+    rows = StationDataParser(page_html, engine=engine).parse_rows()
+    headers = {row.station.number: row for row in rows}
+
+    assert len(rows) == 5
+    assert headers[104].station == StationHeader(104, None, "", "ТРЦ Мега 4", 22.0)
+    assert headers[104].sockets == ()
+    # Neither the number without its sign nor the name cell with an extra class is extracted
+    assert headers[None].station == StationHeader(None, "Алматы", "ул. Абая 5, д. 1", "", None)
+    assert headers[None].sockets == (("Свободен", "Type 2", 1),)
+
+
+@pytest.mark.parametrize("engine", ["bs4", "lxml"])
+def test_misses_are_counted_per_parse(page_html, engine):
+    parser = StationDataParser(page_html, engine=engine)
+    parser.parse_rows()
+    StationDataParser(page_html, engine=engine).parse_rows()
+
+    assert parser.misses == {"city": 1, "station_number": 1, "power": 1}
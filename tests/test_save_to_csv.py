@@ -0,0 +1,45 @@
+import csv
+import datetime
+
+from src.parser import SocketObservation, StationHeader
+from src.save_to_csv import LongCsvWriter
+
+TIMESTAMP = datetime.datetime(2024, 1, 1, 12, 0)
+
+
+def observations(timestamp: datetime.datetime) -> list[SocketObservation]:
+    numbered = StationHeader(101, "Алматы", "ул. Абая 1, д. 1", "ТРЦ Мега 1", 22.0)
+    unnumbered = StationHeader(None, "Алматы", "ул. Абая 5, д. 1", "ТРЦ Мега 5", 22.0)
+    return [
+        SocketObservation(numbered, 1, "GB/T", "Занят", timestamp),
+        SocketObservation(unnumbered, 1, "Type 2", "Свободен", timestamp),
+    ]
+
+
+def test_restart_keeps_the_keys_of_stations_without_number(tmp_path):
+    LongCsvWriter(str(tmp_path)).append(observations(TIMESTAMP))
+
+    writer = LongCsvWriter(str(tmp_path))
+    writer.append(observations(TIMESTAMP + datetime.timedelta(minutes=1)))
+
+    with open(tmp_path / "stations.csv", newline="", encoding="utf-8") as file:
+        index = list(csv.DictReader(file))
+    with open(tmp_path / "observations.csv", newline="", encoding="utf-8") as file:
+        key_ids = [row["key_id"] for row in csv.DictReader(file)]
+    assert [row["station_number"] for row in index] == ["101", ""]
+    assert key_ids == ["0", "1", "0", "1"]
+
+
+def test_compact_keeps_integer_station_numbers(tmp_path):
+    writer = LongCsvWriter(str(tmp_path))
+    writer.append(observations(TIMESTAMP))
+    writer.append(observations(TIMESTAMP + datetime.timedelta(minutes=1)))
+
+    writer.compact(str(tmp_path / "wide.csv"))
+
+    with open(tmp_path / "wide.csv", newline="", encoding="utf-8") as file:
+        wide = list(csv.reader(file))
+    assert wide[0] == ["station_number", "station_address", "station_name", "station_type",
+                       "2024-01-01 12:00:00", "2024-01-01 12:01:00"]
+    assert wide[1] == ["101", "ул. Абая 1, д. 1", "ТРЦ Мега 1", "GB/T", "Занят", "Занят"]
+    assert wide[2] == ["", "ул. Абая 5, д. 1", "ТРЦ Мега 5", "Type 2", "Свободен", "Свободен"]
@@ -0,0 +1,17 @@
+import datetime
+
+import pytest
+
+from src.scheduler import TICK_TRIGGER, scheduled_tick
+
+
+@pytest.mark.parametrize("offset, minute", [
+    (datetime.timedelta(0), 0),
+    (datetime.timedelta(seconds=29.9), 0),
+    (datetime.timedelta(seconds=59.998), 1),
+    (datetime.timedelta(minutes=1, milliseconds=1), 1),
+])
+def test_scheduled_tick_is_the_minute_the_job_was_scheduled_for(offset, minute):
+    now = datetime.datetime(2024, 1, 1, 12, 0, tzinfo=TICK_TRIGGER.timezone) + offset
+
+    assert scheduled_tick(now) == datetime.datetime(2024, 1, 1, 12, minute)